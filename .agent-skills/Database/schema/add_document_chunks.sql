@@ -0,0 +1,20 @@
+-- Migration: Add document_chunks table for chunk-level document search
+-- Run this to update existing databases
+
+-- Document chunks: passage-level embeddings for long documents
+CREATE TABLE IF NOT EXISTS document_chunks (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    document_id UUID NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    ordinal INT NOT NULL,        -- Position of the chunk within the document
+    start_offset INT NOT NULL,   -- Character span of the chunk in documents.content
+    end_offset INT NOT NULL,
+    content_hash VARCHAR(64) NOT NULL,  -- SHA-256 of the chunk text; unchanged chunks keep their embedding
+    embedding vector(1536)
+);
+
+CREATE INDEX IF NOT EXISTS idx_document_chunks_embedding ON document_chunks 
+    USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+
+CREATE INDEX IF NOT EXISTS idx_document_chunks_document ON document_chunks(document_id, ordinal);
+
+-- Existing documents get their chunks on the next index run with --force
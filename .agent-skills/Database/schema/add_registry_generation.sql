@@ -0,0 +1,61 @@
+-- Migration: Add the registry generation counter (search result cache invalidation)
+-- Run this to update existing databases
+
+-- Registry generation: bumped when a transaction that wrote to the
+-- searchable tables commits, so search result caches (SkillRegistry) in
+-- any process can tell whether their entries are still current
+CREATE SEQUENCE IF NOT EXISTS registry_generation;
+
+-- Once per transaction: the transaction-local flag skips nextval for
+-- every row after the first
+CREATE OR REPLACE FUNCTION bump_registry_generation()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF current_setting('registry.generation_bumped', true) IS DISTINCT FROM 'on' THEN
+        PERFORM set_config('registry.generation_bumped', 'on', true);
+        PERFORM nextval('registry_generation');
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Deferred to commit, so the generation moves as the writes become
+-- visible rather than while they are still in progress
+DROP TRIGGER IF EXISTS skills_generation ON skills;
+CREATE CONSTRAINT TRIGGER skills_generation
+    AFTER INSERT OR UPDATE OR DELETE ON skills
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION bump_registry_generation();
+
+DROP TRIGGER IF EXISTS documents_generation ON documents;
+CREATE CONSTRAINT TRIGGER documents_generation
+    AFTER INSERT OR UPDATE OR DELETE ON documents
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION bump_registry_generation();
+
+DROP TRIGGER IF EXISTS document_chunks_generation ON document_chunks;
+CREATE CONSTRAINT TRIGGER document_chunks_generation
+    AFTER INSERT OR UPDATE OR DELETE ON document_chunks
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION bump_registry_generation();
+
+-- TRUNCATE (snapshot import --replace) has no row triggers and can't be
+-- deferred; it bumps at once without setting the flag, so the rows
+-- imported after it bump again at commit
+CREATE OR REPLACE FUNCTION bump_registry_generation_now()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM nextval('registry_generation');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS registry_truncate_generation ON skills;
+CREATE TRIGGER registry_truncate_generation
+    AFTER TRUNCATE ON skills
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_registry_generation_now();
+
+DROP TRIGGER IF EXISTS registry_truncate_generation ON documents;
+CREATE TRIGGER registry_truncate_generation
+    AFTER TRUNCATE ON documents
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_registry_generation_now();
@@ -0,0 +1,27 @@
+-- Migration: Add full-text search columns for hybrid search
+-- Run this to update existing databases
+--
+-- A tsvector holds at most 1 MB, and an upsert whose content exceeds it
+-- fails, so only the first 500k characters of content are indexed. The
+-- columns are dropped and re-added so databases migrated before that
+-- bound pick it up (generated expressions can't be altered in place).
+
+ALTER TABLE skills DROP COLUMN IF EXISTS search_tsv;
+ALTER TABLE skills
+ADD COLUMN search_tsv tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(description, '')), 'B') ||
+    setweight(to_tsvector('english', left(content, 500000)), 'C')
+) STORED;
+
+ALTER TABLE documents DROP COLUMN IF EXISTS search_tsv;
+ALTER TABLE documents
+ADD COLUMN search_tsv tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(description, '')), 'B') ||
+    setweight(to_tsvector('english', left(content, 500000)), 'C')
+) STORED;
+
+-- Generated columns are filled for existing rows when added
+CREATE INDEX IF NOT EXISTS idx_skills_search_tsv ON skills USING gin (search_tsv);
+CREATE INDEX IF NOT EXISTS idx_documents_search_tsv ON documents USING gin (search_tsv);
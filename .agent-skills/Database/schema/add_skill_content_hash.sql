@@ -0,0 +1,7 @@
+-- Migration: Add content_hash to skills table for change detection
+-- Run this to update existing databases
+
+ALTER TABLE skills
+ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64);
+
+-- Existing skills keep a NULL hash and are re-embedded once on the next index run
@@ -0,0 +1,29 @@
+-- Migration: Index quantized embeddings (halfvec) for smaller, faster ANN indexes
+-- Run this to update existing databases, then set VECTOR_QUANTIZATION=halfvec
+-- Requires pgvector 0.7.0 or later
+
+-- The embedding columns keep their full-precision vectors, which searches
+-- use to re-rank the index's candidates; only the indexes are rebuilt on
+-- 16-bit floats, roughly halving their size.
+DROP INDEX IF EXISTS idx_skills_embedding;
+CREATE INDEX idx_skills_embedding ON skills
+    USING hnsw ((embedding::halfvec(1536)) halfvec_cosine_ops) WITH (m = 16, ef_construction = 64);
+
+DROP INDEX IF EXISTS idx_documents_embedding;
+CREATE INDEX idx_documents_embedding ON documents
+    USING hnsw ((embedding::halfvec(1536)) halfvec_cosine_ops) WITH (m = 16, ef_construction = 64);
+
+DROP INDEX IF EXISTS idx_document_chunks_embedding;
+CREATE INDEX idx_document_chunks_embedding ON document_chunks
+    USING hnsw ((embedding::halfvec(1536)) halfvec_cosine_ops) WITH (m = 16, ef_construction = 64);
+
+-- Binary quantization (1 bit per dimension, ~32x smaller; VECTOR_QUANTIZATION=binary):
+--
+-- CREATE INDEX idx_skills_embedding ON skills
+--     USING hnsw ((binary_quantize(embedding)::bit(1536)) bit_hamming_ops);
+--
+-- (likewise for documents and document_chunks). Raise QUANTIZATION_RERANK
+-- if recall drops; `python -m scripts.benchmark quantization` measures it.
+--
+-- To go back to full-precision indexes:
+--     python scripts/vector_index.py hnsw --quantization none
@@ -14,7 +14,14 @@ CREATE TABLE IF NOT EXISTS skills (
     path VARCHAR(512) NOT NULL,
     version VARCHAR(50) DEFAULT '1.0.0',
     author VARCHAR(255),
+    content_hash VARCHAR(64),  -- SHA-256 of all skill fields, for change detection
     embedding vector(1536),
+    search_tsv tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B') ||
+        -- A tsvector holds at most 1 MB, so very long content is only indexed up to its first 500k characters
+        setweight(to_tsvector('english', left(content, 500000)), 'C')
+    ) STORED,  -- Full-text index for hybrid search
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
@@ -30,10 +37,27 @@ CREATE TABLE IF NOT EXISTS documents (
     doc_type VARCHAR(50) DEFAULT 'reference',  -- 'research', 'blog', 'reference', 'case_study'
     source_url VARCHAR(512) DEFAULT 'No',
     embedding vector(1536),
+    search_tsv tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B') ||
+        -- A tsvector holds at most 1 MB, so very long content is only indexed up to its first 500k characters
+        setweight(to_tsvector('english', left(content, 500000)), 'C')
+    ) STORED,  -- Full-text index for hybrid search
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Document chunks: passage-level embeddings for long documents
+CREATE TABLE IF NOT EXISTS document_chunks (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    document_id UUID NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    ordinal INT NOT NULL,        -- Position of the chunk within the document
+    start_offset INT NOT NULL,   -- Character span of the chunk in documents.content
+    end_offset INT NOT NULL,
+    content_hash VARCHAR(64) NOT NULL,  -- SHA-256 of the chunk text; unchanged chunks keep their embedding
+    embedding vector(1536)
+);
+
 -- Skill sources: Links skills to their source documents
 CREATE TABLE IF NOT EXISTS skill_sources (
     skill_id UUID REFERENCES skills(id) ON DELETE CASCADE,
@@ -64,17 +88,28 @@ CREATE TABLE IF NOT EXISTS skill_references (
 );
 
 -- Indexes for semantic search
+-- HNSW builds incrementally, so it is usable on empty tables. To switch to
+-- ivfflat (sized from row counts after a bulk load), run:
+--   python -m scripts.vector_index ivfflat
 CREATE INDEX IF NOT EXISTS idx_skills_embedding ON skills 
-    USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
+    USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
 
 CREATE INDEX IF NOT EXISTS idx_documents_embedding ON documents 
-    USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
+    USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+
+CREATE INDEX IF NOT EXISTS idx_document_chunks_embedding ON document_chunks 
+    USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+
+-- Full-text indexes for hybrid (lexical + vector) search
+CREATE INDEX IF NOT EXISTS idx_skills_search_tsv ON skills USING gin (search_tsv);
+CREATE INDEX IF NOT EXISTS idx_documents_search_tsv ON documents USING gin (search_tsv);
 
 -- Indexes for common queries
 CREATE INDEX IF NOT EXISTS idx_skills_name ON skills(name);
 CREATE INDEX IF NOT EXISTS idx_skills_updated ON skills(updated_at DESC);
 CREATE INDEX IF NOT EXISTS idx_documents_path ON documents(path);
 CREATE INDEX IF NOT EXISTS idx_documents_hash ON documents(content_hash);
+CREATE INDEX IF NOT EXISTS idx_document_chunks_document ON document_chunks(document_id, ordinal);
 CREATE INDEX IF NOT EXISTS idx_skill_versions_skill ON skill_versions(skill_id, created_at DESC);
 
 -- Function: Update timestamp trigger
@@ -97,6 +132,70 @@ CREATE TRIGGER documents_updated_at
     BEFORE UPDATE ON documents
     FOR EACH ROW EXECUTE FUNCTION update_updated_at();
 
+-- Registry generation: bumped when a transaction that wrote to the
+-- searchable tables commits, so search result caches (SkillRegistry) in
+-- any process can tell whether their entries are still current
+CREATE SEQUENCE IF NOT EXISTS registry_generation;
+
+-- Once per transaction: the transaction-local flag skips nextval for
+-- every row after the first
+CREATE OR REPLACE FUNCTION bump_registry_generation()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF current_setting('registry.generation_bumped', true) IS DISTINCT FROM 'on' THEN
+        PERFORM set_config('registry.generation_bumped', 'on', true);
+        PERFORM nextval('registry_generation');
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Deferred to commit, so the generation moves as the writes become
+-- visible rather than while they are still in progress
+DROP TRIGGER IF EXISTS skills_generation ON skills;
+CREATE CONSTRAINT TRIGGER skills_generation
+    AFTER INSERT OR UPDATE OR DELETE ON skills
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION bump_registry_generation();
+
+DROP TRIGGER IF EXISTS documents_generation ON documents;
+CREATE CONSTRAINT TRIGGER documents_generation
+    AFTER INSERT OR UPDATE OR DELETE ON documents
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION bump_registry_generation();
+
+DROP TRIGGER IF EXISTS document_chunks_generation ON document_chunks;
+CREATE CONSTRAINT TRIGGER document_chunks_generation
+    AFTER INSERT OR UPDATE OR DELETE ON document_chunks
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION bump_registry_generation();
+
+-- TRUNCATE (snapshot import --replace) has no row triggers and can't be
+-- deferred; it bumps at once without setting the flag, so the rows
+-- imported after it bump again at commit
+CREATE OR REPLACE FUNCTION bump_registry_generation_now()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM nextval('registry_generation');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS registry_truncate_generation ON skills;
+CREATE TRIGGER registry_truncate_generation
+    AFTER TRUNCATE ON skills
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_registry_generation_now();
+
+DROP TRIGGER IF EXISTS registry_truncate_generation ON documents;
+CREATE TRIGGER registry_truncate_generation
+    AFTER TRUNCATE ON documents
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_registry_generation_now();
+
+-- The search functions take the nearest rows straight from the ANN index
+-- (ORDER BY distance LIMIT k) and apply the threshold to that candidate set
+-- afterwards. A threshold inside the scan would prevent an index scan.
+-- Twice match_count candidates are fetched, matching SEARCH_OVERFETCH.
+
 -- Function: Semantic search for skills
 CREATE OR REPLACE FUNCTION search_skills(
     query_embedding vector(1536),
@@ -113,15 +212,21 @@ RETURNS TABLE (
 BEGIN
     RETURN QUERY
     SELECT 
-        s.id,
-        s.name,
-        s.description,
-        s.path,
-        1 - (s.embedding <=> query_embedding) AS similarity
-    FROM skills s
-    WHERE s.embedding IS NOT NULL
-      AND 1 - (s.embedding <=> query_embedding) > match_threshold
-    ORDER BY s.embedding <=> query_embedding
+        c.id,
+        c.name,
+        c.description,
+        c.path,
+        1 - c.distance AS similarity
+    FROM (
+        SELECT s.id, s.name, s.description, s.path,
+               s.embedding <=> query_embedding AS distance
+        FROM skills s
+        WHERE s.embedding IS NOT NULL
+        ORDER BY s.embedding <=> query_embedding
+        LIMIT match_count * 2
+    ) c
+    WHERE c.distance < 1 - match_threshold
+    ORDER BY c.distance
     LIMIT match_count;
 END;
 $$ LANGUAGE plpgsql;
@@ -142,15 +247,21 @@ RETURNS TABLE (
 BEGIN
     RETURN QUERY
     SELECT 
-        d.id,
-        d.title,
-        d.path,
-        d.doc_type,
-        1 - (d.embedding <=> query_embedding) AS similarity
-    FROM documents d
-    WHERE d.embedding IS NOT NULL
-      AND 1 - (d.embedding <=> query_embedding) > match_threshold
-    ORDER BY d.embedding <=> query_embedding
+        c.id,
+        c.title,
+        c.path,
+        c.doc_type,
+        1 - c.distance AS similarity
+    FROM (
+        SELECT d.id, d.title, d.path, d.doc_type,
+               d.embedding <=> query_embedding AS distance
+        FROM documents d
+        WHERE d.embedding IS NOT NULL
+        ORDER BY d.embedding <=> query_embedding
+        LIMIT match_count * 2
+    ) c
+    WHERE c.distance < 1 - match_threshold
+    ORDER BY c.distance
     LIMIT match_count;
 END;
 $$ LANGUAGE plpgsql;
@@ -168,13 +279,16 @@ RETURNS TABLE (
 BEGIN
     RETURN QUERY
     SELECT 
-        s.id,
-        s.name,
-        1 - (s.embedding <=> doc_embedding) AS similarity
-    FROM skills s
-    WHERE s.embedding IS NOT NULL
-      AND 1 - (s.embedding <=> doc_embedding) > match_threshold
-    ORDER BY s.embedding <=> doc_embedding;
+        c.id,
+        c.name,
+        1 - c.distance AS similarity
+    FROM (
+        SELECT s.id, s.name, s.embedding <=> doc_embedding AS distance
+        FROM skills s
+        WHERE s.embedding IS NOT NULL
+    ) c
+    WHERE c.distance < 1 - match_threshold
+    ORDER BY c.distance;
 END;
 $$ LANGUAGE plpgsql;
 
@@ -11,9 +11,10 @@ This is the entry point for the agent workflow.
 
 from typing import Dict, List, Optional, Tuple
 from pathlib import Path
+import time
 
 from .registry import (
-    SkillRegistry, 
+    open_registry,
     parse_skill_frontmatter, 
     extract_title_from_markdown
 )
@@ -30,7 +31,7 @@ class AgentKnowledgeInterface:
     """
     
     def __init__(self):
-        self.registry = SkillRegistry()
+        self.registry = open_registry()
     
     def analyze_document(
         self, 
@@ -52,20 +53,81 @@ class AgentKnowledgeInterface:
         # Extract title
         title = extract_title_from_markdown(content)
         
+        # Embed once: the same vector is stored and used to find related skills
+        embedding = self.registry.embed_documents([{"title": title, "content": content}])[0]
+        
         # Index the document
         doc_id = self.registry.upsert_document(
             title=title,
             content=content,
             path=path,
-            doc_type=self._infer_doc_type(path, content)
+            doc_type=self._infer_doc_type(path, content),
+            embedding=embedding
         )
         
         # Find related skills
         related_skills = self.registry.find_related_skills(
             content, 
-            threshold=similarity_threshold
+            threshold=similarity_threshold,
+            embedding=embedding
         )
         
+        return self._recommend(title, doc_id, related_skills)
+    
+    def analyze_documents(
+        self,
+        documents: List[Dict],
+        similarity_threshold: float = 0.7
+    ) -> Dict:
+        """
+        `analyze_document` for many documents ({"content", "path"}) at once.
+        
+        All documents are embedded in one batch, written with one bulk
+        upsert and scored against the skills in one batch lookup.
+        
+        Returns:
+            {
+                "results": [...],      # analyze_document result per document, in order
+                "documents": int,
+                "seconds": float,
+                "items_per_sec": float
+            }
+        """
+        started = time.perf_counter()
+        docs = [
+            {
+                "title": extract_title_from_markdown(d["content"]),
+                "content": d["content"],
+                "path": d["path"],
+                "doc_type": self._infer_doc_type(d["path"], d["content"])
+            }
+            for d in documents
+        ]
+        embeddings = self.registry.embed_documents(docs) if docs else []
+        
+        ids = self.registry.bulk_upsert_documents([
+            dict(doc, embedding=embedding) for doc, embedding in zip(docs, embeddings)
+        ])
+        related = self.registry.find_related_skills_batch(
+            [doc["content"] for doc in docs],
+            threshold=similarity_threshold,
+            embeddings=embeddings
+        )
+        
+        results = [
+            self._recommend(doc["title"], ids[doc["path"]], related_skills)
+            for doc, related_skills in zip(docs, related)
+        ]
+        elapsed = time.perf_counter() - started
+        return {
+            "results": results,
+            "documents": len(results),
+            "seconds": elapsed,
+            "items_per_sec": len(results) / elapsed if elapsed > 0 else 0.0
+        }
+    
+    def _recommend(self, title: str, doc_id: str, related_skills: List[Dict]) -> Dict:
+        """Decide the action for an indexed document from its related skills."""
         # Determine action
         if not related_skills:
             action = "create_skill"
@@ -220,15 +282,7 @@ class AgentKnowledgeInterface:
         Returns:
             {"skills": [...], "documents": [...]}
         """
-        results = {"skills": [], "documents": []}
-        
-        if search_type in ["skills", "all"]:
-            results["skills"] = self.registry.search_skills(query, limit=limit)
-        
-        if search_type in ["docs", "all"]:
-            results["documents"] = self.registry.search_documents(query, limit=limit)
-        
-        return results
+        return self.registry.search(query, search_type=search_type, limit=limit)
     
     def _infer_doc_type(self, path: str, content: str) -> str:
         """Infer document type from path and content."""
@@ -0,0 +1,728 @@
+"""
+Asyncio interface to the Semantic Knowledge Registry.
+
+`AsyncSkillRegistry` mirrors `SkillRegistry` for callers that already run
+an event loop (agent servers, async web handlers): every method has the
+same name, arguments and result shape, but is a coroutine. It talks to
+Postgres through an asyncpg connection pool and embeds through the async
+embedding client, so many searches can be in flight on one thread and a
+slow embedding request never blocks the loop.
+
+    async with await AsyncSkillRegistry.connect() as registry:
+        results = await asyncio.gather(*(
+            registry.search(q, limit=5) for q in queries
+        ))
+
+The search SQL is shared with `SkillRegistry`; only the placeholders are
+rewritten for asyncpg. Requires `asyncpg` (imported on first connect).
+"""
+
+import re
+import uuid
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .config import (
+    DATABASE_URL,
+    DB_POOL_MIN_SIZE,
+    DB_POOL_MAX_SIZE,
+    QUERY_CACHE_SIZE,
+    QUERY_CACHE_TTL,
+    RRF_K,
+    DOCUMENT_CHUNKS_ENABLED,
+    CHUNK_SEARCH_CANDIDATES,
+)
+from .embeddings import agenerate_embedding, agenerate_embeddings_batch, content_hash
+from .memory_cache import LRUCache
+from .registry import (
+    SEARCH_SKILLS_SQL,
+    SEARCH_DOCUMENTS_SQL,
+    RELATED_SKILLS_SQL,
+    SEARCH_DOCUMENT_CHUNKS_SQL,
+    UNIFIED_SKILLS_SQL,
+    UNIFIED_DOCUMENTS_SQL,
+    HYBRID_SKILLS_SQL,
+    HYBRID_DOCUMENTS_SQL,
+    _ann_settings,
+    _candidate_count,
+    _hybrid_candidate_count,
+    document_embedding_text,
+    _is_unchanged,
+    _match_chunks,
+    _skill_hash,
+    _split_search_rows,
+)
+
+
+_NAMED_PARAM = re.compile(r"%\((\w+)\)s")
+
+# psycopg2 inlines parameters as literals; asyncpg binds them with types
+# inferred from the statement, which guesses wrong for expressions such
+# as `1 - $1` (integer). Scalars are cast to the type of their value.
+_PARAM_CASTS = ((bool, "boolean"), (int, "bigint"), (float, "float8"), (str, "text"))
+
+
+def to_asyncpg(query: str, params: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    """
+    Rewrite a psycopg2 query with `%(name)s` placeholders for asyncpg.
+
+    Returns the query with `$n` placeholders and the positional argument
+    list. A name used several times is bound once; parameters the query
+    does not use are ignored.
+    """
+    names: List[str] = []
+
+    def placeholder(match: "re.Match") -> str:
+        name = match.group(1)
+        if name not in names:
+            names.append(name)
+        value = params[name]
+        for py_type, pg_type in _PARAM_CASTS:
+            if isinstance(value, py_type):
+                return f"${names.index(name) + 1}::{pg_type}"
+        return f"${names.index(name) + 1}"
+
+    sql = _NAMED_PARAM.sub(placeholder, query).replace("%%", "%")
+    return sql, [params[name] for name in names]
+
+
+def _record(record) -> Dict:
+    """Convert an asyncpg record to a dict with string IDs, as psycopg2 returns them."""
+    return {
+        key: str(value) if isinstance(value, uuid.UUID) else value
+        for key, value in record.items()
+    }
+
+
+class AsyncSkillRegistry:
+    """
+    Asyncio counterpart of `SkillRegistry`.
+
+    Create it with `await AsyncSkillRegistry.connect()` and close it with
+    `await registry.close()` (or use it as an async context manager).
+    Each call borrows a pooled connection for just its own statements, so
+    concurrent calls run in parallel up to the pool size.
+    """
+
+    def __init__(
+        self,
+        pool,
+        query_cache_size: int = QUERY_CACHE_SIZE,
+        query_cache_ttl: Optional[float] = QUERY_CACHE_TTL
+    ):
+        self._pool = pool
+        self._query_cache = LRUCache(query_cache_size, ttl=query_cache_ttl)
+        # Connection of the enclosing `transaction()` block, per task
+        self._current: ContextVar = ContextVar(f"async_registry_{id(self)}", default=None)
+
+    @classmethod
+    async def connect(
+        cls,
+        database_url: str = DATABASE_URL,
+        min_size: int = DB_POOL_MIN_SIZE,
+        max_size: int = DB_POOL_MAX_SIZE,
+        **kwargs
+    ) -> "AsyncSkillRegistry":
+        """
+        Open a connection pool and verify the database is reachable.
+
+        Keyword arguments are passed to the registry constructor.
+        """
+        import asyncpg
+        from pgvector.asyncpg import register_vector
+
+        try:
+            pool = await asyncpg.create_pool(
+                database_url, min_size=min_size, max_size=max_size, init=register_vector
+            )
+            await pool.fetchval("SELECT 1")
+        except (OSError, asyncpg.PostgresError) as e:
+            raise ConnectionError(
+                f"Could not connect to database. Is it running? Error: {e}"
+            )
+        return cls(pool, **kwargs)
+
+    async def close(self) -> None:
+        """Close every pooled connection."""
+        await self._pool.close()
+
+    async def __aenter__(self) -> "AsyncSkillRegistry":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    @asynccontextmanager
+    async def _connection(self) -> AsyncGenerator:
+        """Yield the enclosing transaction's connection, or a pooled one."""
+        conn = self._current.get()
+        if conn is not None:
+            yield conn
+            return
+        async with self._pool.acquire() as conn:
+            yield conn
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncGenerator[None, None]:
+        """
+        Run every registry call in the block as one transaction.
+
+        Nested blocks join the outer transaction. Calls in the block share
+        one connection, so await them one at a time rather than gathering
+        them.
+        """
+        if self._current.get() is not None:
+            yield
+            return
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                token = self._current.set(conn)
+                try:
+                    yield
+                finally:
+                    self._current.reset(token)
+
+    async def _fetch(self, query: str, *args) -> List[Dict]:
+        async with self._connection() as conn:
+            return [_record(r) for r in await conn.fetch(query, *args)]
+
+    async def _fetchrow(self, query: str, *args) -> Optional[Dict]:
+        async with self._connection() as conn:
+            row = await conn.fetchrow(query, *args)
+        return _record(row) if row is not None else None
+
+    async def _embed_query(self, text: str) -> np.ndarray:
+        """Embed a search query, reusing cached embeddings for repeat queries."""
+        key = " ".join(text.split()).casefold()
+
+        embedding = self._query_cache.get(key)
+        if embedding is None:
+            embedding = await agenerate_embedding(text)
+            embedding.flags.writeable = False  # Shared by every caller of this query
+            self._query_cache.put(key, embedding)
+        return embedding
+
+    def query_cache_stats(self) -> Dict:
+        """Get hit/miss statistics for the query embedding cache."""
+        return self._query_cache.stats()
+
+    async def _vector_query(
+        self,
+        query: str,
+        params: Dict,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        candidates: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Run a similarity query with per-call ANN index settings.
+
+        Same settings as `SkillRegistry._vector_query`. asyncpg sends one
+        statement per call, so when a setting applies the query runs in a
+        short transaction after the `set_config` call.
+        """
+        ef_search, probes = _ann_settings(ef_search, probes, candidates)
+        sql, args = to_asyncpg(query, params)
+
+        settings = []
+        if ef_search is not None:
+            settings.append(("hnsw.ef_search", str(ef_search)))
+        if probes is not None:
+            settings.append(("ivfflat.probes", str(probes)))
+
+        async with self._connection() as conn:
+            if not settings:
+                rows = await conn.fetch(sql, *args)
+            else:
+                async with conn.transaction():
+                    for name, value in settings:
+                        await conn.execute("SELECT set_config($1, $2, true)", name, value)
+                    rows = await conn.fetch(sql, *args)
+        return [_record(r) for r in rows]
+
+    # -------------------------------------------------------------------------
+    # Skills
+    # -------------------------------------------------------------------------
+
+    async def upsert_skill(
+        self,
+        name: str,
+        description: str,
+        content: str,
+        path: str,
+        version: str = "1.0.0",
+        author: Optional[str] = None,
+        generate_embedding_flag: bool = True,
+        force: bool = False
+    ) -> str:
+        """Insert or update a skill. See `SkillRegistry.upsert_skill`."""
+        skill_hash = _skill_hash(name, description, content, path, version, author)
+
+        existing = await self._fetchrow(
+            "SELECT id, content_hash, embedding IS NOT NULL AS has_embedding "
+            "FROM skills WHERE name = $1",
+            name
+        )
+        if not force and existing and _is_unchanged(existing, skill_hash, generate_embedding_flag):
+            return existing["id"]
+
+        embedding = None
+        if generate_embedding_flag:
+            embedding = await agenerate_embedding(f"{name}: {description}\n\n{content[:4000]}")
+
+        async with self._connection() as conn:
+            skill_id = await conn.fetchval(
+                """
+                INSERT INTO skills (name, description, content, path, version, author, content_hash, embedding)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8::vector)
+                ON CONFLICT (name) DO UPDATE SET
+                    description = EXCLUDED.description,
+                    content = EXCLUDED.content,
+                    path = EXCLUDED.path,
+                    version = EXCLUDED.version,
+                    author = EXCLUDED.author,
+                    content_hash = EXCLUDED.content_hash,
+                    embedding = EXCLUDED.embedding
+                RETURNING id
+                """,
+                name, description, content, path, version, author, skill_hash, embedding
+            )
+        return str(skill_id)
+
+    async def get_skill(self, name: str) -> Optional[Dict]:
+        """Get a skill by name."""
+        return await self._fetchrow(
+            "SELECT id, name, description, content, path, version, author, created_at, updated_at "
+            "FROM skills WHERE name = $1",
+            name
+        )
+
+    async def get_skill_by_id(self, skill_id: str) -> Optional[Dict]:
+        """Get a skill by ID."""
+        return await self._fetchrow(
+            "SELECT id, name, description, content, path, version, author, created_at, updated_at "
+            "FROM skills WHERE id = $1::uuid",
+            skill_id
+        )
+
+    async def list_skills(self) -> List[Dict]:
+        """List all skills with basic info."""
+        return await self._fetch(
+            "SELECT id, name, description, version, path, updated_at "
+            "FROM skills ORDER BY name"
+        )
+
+    async def delete_skill(self, name: str) -> bool:
+        """Delete a skill by name."""
+        return await self._fetchrow("DELETE FROM skills WHERE name = $1 RETURNING id", name) is not None
+
+    async def search_skills(
+        self,
+        query: str,
+        threshold: float = 0.7,
+        limit: int = 10,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        mode: str = "vector"
+    ) -> List[Dict]:
+        """Semantic search for skills. See `SkillRegistry.search_skills`."""
+        if mode == "hybrid":
+            results = await self.search(
+                query, "skills", threshold, limit,
+                ef_search=ef_search, probes=probes, mode=mode
+            )
+            return results["skills"]
+
+        candidates = _candidate_count(limit)
+        return await self._vector_query(
+            SEARCH_SKILLS_SQL,
+            {
+                "embedding": await self._embed_query(query),
+                "threshold": threshold,
+                "limit": limit,
+                "candidates": candidates
+            },
+            ef_search=ef_search,
+            probes=probes,
+            candidates=candidates
+        )
+
+    async def find_related_skills(
+        self,
+        content: str,
+        threshold: float = 0.7,
+        limit: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        embedding: Optional[np.ndarray] = None
+    ) -> List[Dict]:
+        """
+        Find skills related to given content (or its precomputed
+        `embedding`). See `SkillRegistry.find_related_skills`.
+        """
+        if embedding is None:
+            embedding = await agenerate_embedding(content[:8000])  # Bypasses the query cache
+        candidates = _candidate_count(limit)
+        return await self._vector_query(
+            RELATED_SKILLS_SQL,
+            {
+                "embedding": embedding,
+                "threshold": threshold,
+                "limit": limit,
+                "candidates": candidates
+            },
+            ef_search=ef_search,
+            probes=probes,
+            candidates=candidates
+        )
+
+    # -------------------------------------------------------------------------
+    # Documents
+    # -------------------------------------------------------------------------
+
+    async def embed_documents(self, documents: List[Dict]) -> np.ndarray:
+        """Embed documents in one batch. See `SkillRegistry.embed_documents`."""
+        return await agenerate_embeddings_batch([
+            document_embedding_text(d["title"], d["content"]) for d in documents
+        ])
+
+    async def upsert_document(
+        self,
+        title: str,
+        content: str,
+        path: str,
+        doc_type: str = "reference",
+        description: str = "",
+        source_url: str = "No",
+        generate_embedding_flag: bool = True,
+        force: bool = False,
+        embedding: Optional[np.ndarray] = None
+    ) -> str:
+        """
+        Insert or update a document. See `SkillRegistry.upsert_document`.
+
+        The document (unless its `embedding` is given) and its changed
+        chunks are embedded in one batch before a connection is taken, so
+        the write transaction never waits on the embedding API.
+        """
+        doc_hash = content_hash(content)
+
+        existing = await self._fetchrow(
+            "SELECT id, content_hash, embedding IS NOT NULL AS has_embedding "
+            "FROM documents WHERE path = $1",
+            path
+        )
+        if not force and existing and _is_unchanged(existing, doc_hash, generate_embedding_flag):
+            return existing["id"]
+
+        # New chunks are keyed by the existing ID, or the path for a new document
+        doc_key = existing["id"] if existing else path
+        kept, new, stale = [], [], []
+        if generate_embedding_flag and DOCUMENT_CHUNKS_ENABLED:
+            stored = await self._fetch(
+                "SELECT id, document_id, content_hash FROM document_chunks WHERE document_id = $1::uuid",
+                existing["id"]
+            ) if existing else []
+            kept, new, stale = _match_chunks(stored, [(doc_key, content)])
+
+        chunk_embeddings = []
+        if not generate_embedding_flag:
+            embedding = None
+        else:
+            texts = [text for *_, text in new]
+            if embedding is None:
+                texts.insert(0, document_embedding_text(title, content))
+            embeddings = list(await agenerate_embeddings_batch(texts)) if texts else []
+            if embedding is None:
+                embedding = embeddings.pop(0)
+            chunk_embeddings = embeddings
+
+        async with self.transaction(), self._connection() as conn:
+            doc_id = await conn.fetchval(
+                """
+                INSERT INTO documents (title, content, path, content_hash, doc_type, description, source_url, embedding)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8::vector)
+                ON CONFLICT (path) DO UPDATE SET
+                    title = EXCLUDED.title,
+                    content = EXCLUDED.content,
+                    content_hash = EXCLUDED.content_hash,
+                    doc_type = EXCLUDED.doc_type,
+                    description = EXCLUDED.description,
+                    source_url = EXCLUDED.source_url,
+                    embedding = EXCLUDED.embedding
+                RETURNING id
+                """,
+                title, content, path, doc_hash, doc_type, description, source_url, embedding
+            )
+            if stale:
+                await conn.execute("DELETE FROM document_chunks WHERE id = ANY($1::uuid[])", stale)
+            if kept:
+                await conn.executemany(
+                    """
+                    UPDATE document_chunks SET ordinal = $2, start_offset = $3, end_offset = $4
+                    WHERE id = $1::uuid
+                      AND (ordinal, start_offset, end_offset) IS DISTINCT FROM ($2, $3, $4)
+                    """,
+                    kept
+                )
+            if new:
+                await conn.executemany(
+                    """
+                    INSERT INTO document_chunks
+                        (document_id, ordinal, start_offset, end_offset, content_hash, embedding)
+                    VALUES ($1, $2, $3, $4, $5, $6::vector)
+                    """,
+                    [
+                        (doc_id, ordinal, start, end, chunk_hash, chunk_embedding)
+                        for (_, ordinal, start, end, chunk_hash, _), chunk_embedding in zip(new, chunk_embeddings)
+                    ]
+                )
+        return str(doc_id)
+
+    async def get_document(self, path: str) -> Optional[Dict]:
+        """Get a document by path."""
+        return await self._fetchrow(
+            "SELECT id, title, content, path, doc_type, content_hash, created_at, updated_at "
+            "FROM documents WHERE path = $1",
+            path
+        )
+
+    async def list_documents(self, doc_type: Optional[str] = None) -> List[Dict]:
+        """List all documents, optionally filtered by type."""
+        if doc_type:
+            return await self._fetch(
+                "SELECT id, title, path, doc_type, updated_at "
+                "FROM documents WHERE doc_type = $1 ORDER BY title",
+                doc_type
+            )
+        return await self._fetch(
+            "SELECT id, title, path, doc_type, updated_at "
+            "FROM documents ORDER BY title"
+        )
+
+    async def delete_document(self, path: str) -> bool:
+        """Delete a document by path."""
+        return await self._fetchrow("DELETE FROM documents WHERE path = $1 RETURNING id", path) is not None
+
+    async def search_documents(
+        self,
+        query: str,
+        threshold: float = 0.7,
+        limit: int = 10,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        mode: str = "vector"
+    ) -> List[Dict]:
+        """Semantic search for documents. See `SkillRegistry.search_documents`."""
+        if mode == "hybrid":
+            results = await self.search(
+                query, "docs", threshold, limit,
+                ef_search=ef_search, probes=probes, mode=mode
+            )
+            return results["documents"]
+
+        candidates = _candidate_count(limit)
+        return await self._vector_query(
+            SEARCH_DOCUMENTS_SQL,
+            {
+                "embedding": await self._embed_query(query),
+                "threshold": threshold,
+                "limit": limit,
+                "candidates": candidates
+            },
+            ef_search=ef_search,
+            probes=probes,
+            candidates=candidates
+        )
+
+    async def search_document_chunks(
+        self,
+        query: str,
+        threshold: float = 0.7,
+        limit: int = 10,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None
+    ) -> List[Dict]:
+        """Semantic search over document chunks. See `SkillRegistry.search_document_chunks`."""
+        candidates = max(_candidate_count(limit), CHUNK_SEARCH_CANDIDATES)
+        return await self._vector_query(
+            SEARCH_DOCUMENT_CHUNKS_SQL,
+            {
+                "embedding": await self._embed_query(query),
+                "threshold": threshold,
+                "limit": limit,
+                "candidates": candidates
+            },
+            ef_search=ef_search,
+            probes=probes,
+            candidates=candidates
+        )
+
+    # -------------------------------------------------------------------------
+    # Unified Search
+    # -------------------------------------------------------------------------
+
+    async def search(
+        self,
+        query: str,
+        search_type: str = "all",
+        threshold: float = 0.7,
+        limit: int = 10,
+        skill_threshold: Optional[float] = None,
+        skill_limit: Optional[int] = None,
+        doc_threshold: Optional[float] = None,
+        doc_limit: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        mode: str = "vector"
+    ) -> Dict[str, List[Dict]]:
+        """Search skills and documents in one round-trip. See `SkillRegistry.search`."""
+        if mode not in ("vector", "hybrid"):
+            raise ValueError(f"Unknown search mode: {mode}")
+
+        skill_limit = limit if skill_limit is None else skill_limit
+        doc_limit = limit if doc_limit is None else doc_limit
+
+        if mode == "hybrid":
+            skill_branch, doc_branch, order = HYBRID_SKILLS_SQL, HYBRID_DOCUMENTS_SQL, "score"
+            params = {
+                "query": query,
+                "rrf_k": RRF_K,
+                "skill_limit": skill_limit,
+                "skill_candidates": _hybrid_candidate_count(skill_limit),
+                "doc_limit": doc_limit,
+                "doc_candidates": _hybrid_candidate_count(doc_limit)
+            }
+        else:
+            skill_branch, doc_branch, order = UNIFIED_SKILLS_SQL, UNIFIED_DOCUMENTS_SQL, "similarity"
+            params = {
+                "skill_threshold": threshold if skill_threshold is None else skill_threshold,
+                "skill_limit": skill_limit,
+                "skill_candidates": _candidate_count(skill_limit),
+                "doc_threshold": threshold if doc_threshold is None else doc_threshold,
+                "doc_limit": doc_limit,
+                "doc_candidates": _candidate_count(doc_limit)
+            }
+
+        branches = []
+        if search_type in ("skills", "all"):
+            branches.append(skill_branch)
+        if search_type in ("docs", "all"):
+            branches.append(doc_branch)
+        if not branches:
+            return {"skills": [], "documents": []}
+
+        params["embedding"] = await self._embed_query(query)
+        rows = await self._vector_query(
+            " UNION ALL ".join(branches) + f" ORDER BY {order} DESC",
+            params,
+            ef_search=ef_search,
+            probes=probes,
+            candidates=max(params["skill_candidates"], params["doc_candidates"])
+        )
+        return _split_search_rows(rows)
+
+    # -------------------------------------------------------------------------
+    # Skill-Document Links
+    # -------------------------------------------------------------------------
+
+    async def link_skill_to_document(
+        self,
+        skill_id: str,
+        document_id: str,
+        relevance: float = 1.0
+    ) -> None:
+        """Link a skill to a source document."""
+        async with self._connection() as conn:
+            await conn.execute(
+                """
+                INSERT INTO skill_sources (skill_id, document_id, relevance)
+                VALUES ($1::uuid, $2::uuid, $3)
+                ON CONFLICT (skill_id, document_id) DO UPDATE SET
+                    relevance = EXCLUDED.relevance
+                WHERE skill_sources.relevance IS DISTINCT FROM EXCLUDED.relevance
+                """,
+                skill_id, document_id, relevance
+            )
+
+    async def get_skill_sources(self, skill_id: str) -> List[Dict]:
+        """Get all source documents for a skill."""
+        return await self._fetch(
+            """
+            SELECT d.id, d.title, d.path, d.doc_type, ss.relevance
+            FROM documents d
+            JOIN skill_sources ss ON d.id = ss.document_id
+            WHERE ss.skill_id = $1::uuid
+            ORDER BY ss.relevance DESC
+            """,
+            skill_id
+        )
+
+    async def get_document_skills(self, document_id: str) -> List[Dict]:
+        """Get all skills that use a document as source."""
+        return await self._fetch(
+            """
+            SELECT s.id, s.name, s.description, ss.relevance
+            FROM skills s
+            JOIN skill_sources ss ON s.id = ss.skill_id
+            WHERE ss.document_id = $1::uuid
+            ORDER BY ss.relevance DESC
+            """,
+            document_id
+        )
+
+    # -------------------------------------------------------------------------
+    # Skill Versions
+    # -------------------------------------------------------------------------
+
+    async def create_skill_version(
+        self,
+        skill_id: str,
+        version: str,
+        content: str,
+        change_summary: Optional[str] = None
+    ) -> str:
+        """Create a version snapshot for a skill."""
+        async with self._connection() as conn:
+            version_id = await conn.fetchval(
+                """
+                INSERT INTO skill_versions (skill_id, version, content, change_summary)
+                VALUES ($1::uuid, $2, $3, $4)
+                RETURNING id
+                """,
+                skill_id, version, content, change_summary
+            )
+        return str(version_id)
+
+    async def get_skill_versions(self, skill_id: str) -> List[Dict]:
+        """Get version history for a skill."""
+        return await self._fetch(
+            """
+            SELECT id, version, change_summary, created_at
+            FROM skill_versions
+            WHERE skill_id = $1::uuid
+            ORDER BY created_at DESC
+            """,
+            skill_id
+        )
+
+    # -------------------------------------------------------------------------
+    # Utilities
+    # -------------------------------------------------------------------------
+
+    async def get_stats(self) -> Dict:
+        """Get registry statistics (one query)."""
+        return await self._fetchrow(
+            """
+            SELECT
+                (SELECT COUNT(*) FROM skills) AS skills,
+                (SELECT COUNT(*) FROM skills WHERE embedding IS NOT NULL) AS skills_with_embedding,
+                (SELECT COUNT(*) FROM documents) AS documents,
+                (SELECT COUNT(*) FROM documents WHERE embedding IS NOT NULL) AS documents_with_embedding,
+                (SELECT COUNT(*) FROM document_chunks) AS document_chunks,
+                (SELECT COUNT(*) FROM skill_sources) AS skill_document_links
+            """
+        )
@@ -0,0 +1,635 @@
+#!/usr/bin/env python3
+"""
+Performance benchmarks for the Semantic Knowledge Registry.
+
+Usage:
+    python -m scripts.benchmark pool                  # Pooled vs fresh connections
+    python -m scripts.benchmark pool --queries 2000
+    python -m scripts.benchmark chunk --size-mb 4     # Chunking multi-MB markdown
+    python -m scripts.benchmark search-sql            # Legacy vs index-friendly search SQL
+    python -m scripts.benchmark search-sql --rows 100000 --index ivfflat
+    python -m scripts.benchmark server                # search.py per lookup vs resident server
+    python -m scripts.benchmark async-search --searches 200   # Threaded sync vs asyncio searches
+    python -m scripts.benchmark quantization --rows 100000    # Full vs halfvec vs binary indexes
+    python -m scripts.benchmark matryoshka --prefixes 128,256,512  # Truncated first-pass indexes
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import numpy as np
+import tiktoken
+from psycopg2.extras import execute_values
+
+from .async_registry import AsyncSkillRegistry
+from .config import (
+    DOCS_DIR,
+    SKILLS_DIR,
+    MAX_TOKENS_PER_CHUNK,
+    EMBEDDING_DIMENSION,
+    DB_POOL_MAX_SIZE,
+    QUANTIZATION_RERANK,
+    HNSW_DEFAULT_EF_SEARCH,
+    HNSW_MAX_EF_SEARCH,
+)
+from .db import get_connection, get_cursor, execute_query, close_pool
+from .embeddings import chunk_text, count_tokens
+from .registry import SEARCH_SKILLS_SQL, SkillRegistry, open_registry, _nearest_sql
+from .search_client import SearchClient, server_available
+from .search_server import SearchServer
+from .vector_index import recommended_lists, index_expression, QUANTIZATIONS
+
+
+def _rate(count: int, seconds: float) -> float:
+    return count / seconds if seconds > 0 else float("inf")
+
+
+def _timed(fn: Callable[[], None], count: int) -> float:
+    """Run `fn` `count` times and return elapsed seconds."""
+    start = time.perf_counter()
+    for _ in range(count):
+        fn()
+    return time.perf_counter() - start
+
+
+# -----------------------------------------------------------------------------
+# Connection pooling
+# -----------------------------------------------------------------------------
+
+def benchmark_pool(queries: int) -> None:
+    """Compare queries/sec for a fresh connection per query vs the pool."""
+    query = "SELECT COUNT(*) AS count FROM skills"
+
+    def fresh():
+        conn = get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(query)
+                cur.fetchall()
+        finally:
+            conn.close()
+
+    def pooled():
+        execute_query(query)
+
+    print(f"Running {queries} queries per mode: {query}")
+
+    fresh_seconds = _timed(fresh, queries)
+    print(f"  Fresh connection: {_rate(queries, fresh_seconds):10.1f} queries/sec")
+
+    close_pool()
+    pooled()  # Warm the pool so connection setup is not measured
+    pooled_seconds = _timed(pooled, queries)
+    print(f"  Pooled:           {_rate(queries, pooled_seconds):10.1f} queries/sec")
+
+    print(f"  Speedup:          {fresh_seconds / pooled_seconds:10.1f}x")
+
+
+# -----------------------------------------------------------------------------
+# Chunking
+# -----------------------------------------------------------------------------
+
+def _legacy_chunk_text(text: str, max_tokens: int = MAX_TOKENS_PER_CHUNK) -> List[str]:
+    """The previous paragraph chunker: re-tokenizes every paragraph, no overlap."""
+    def legacy_count(t):
+        return len(tiktoken.get_encoding("cl100k_base").encode_ordinary(t))
+
+    if legacy_count(text) <= max_tokens:
+        return [text]
+
+    chunks = []
+    current_chunk = []
+    current_tokens = 0
+    for para in text.split("\n\n"):
+        para_tokens = legacy_count(para)
+        if current_tokens + para_tokens > max_tokens:
+            if current_chunk:
+                chunks.append("\n\n".join(current_chunk))
+            current_chunk = [para]
+            current_tokens = para_tokens
+        else:
+            current_chunk.append(para)
+            current_tokens += para_tokens
+    if current_chunk:
+        chunks.append("\n\n".join(current_chunk))
+    return chunks
+
+
+def _markdown_corpus(size_mb: float) -> str:
+    """Build a markdown document of roughly `size_mb` from the repo's own files."""
+    files = list(DOCS_DIR.rglob("*.md")) + list(SKILLS_DIR.rglob("*.md"))
+    base = "\n\n".join(f.read_text() for f in files)
+    if not base:
+        raise FileNotFoundError(f"No markdown found under {DOCS_DIR} or {SKILLS_DIR}")
+    target = int(size_mb * 1024 * 1024)
+    return (base * (target // len(base) + 1))[:target]
+
+
+def benchmark_chunking(size_mb: float) -> None:
+    """Compare the legacy paragraph chunker with the token-offset chunker."""
+    text = _markdown_corpus(size_mb)
+    count_tokens("warm up")  # Load the encoding outside the timed region
+
+    print(f"Chunking {len(text) / 1024 / 1024:.1f} MB of markdown "
+          f"(max {MAX_TOKENS_PER_CHUNK} tokens per chunk)")
+
+    for label, chunker in [("Legacy paragraphs", _legacy_chunk_text), ("Token offsets", chunk_text)]:
+        start = time.perf_counter()
+        chunks = chunker(text)
+        elapsed = time.perf_counter() - start
+        largest = max(count_tokens(c) for c in chunks)
+        print(f"  {label:18s} {elapsed:8.3f}s  {len(text) / 1024 / 1024 / elapsed:6.1f} MB/s  "
+              f"{len(chunks)} chunks, largest {largest} tokens")
+
+
+# -----------------------------------------------------------------------------
+# Search SQL
+# -----------------------------------------------------------------------------
+
+_BENCH_TABLE = "benchmark_skills"
+
+# The search query as it was before the top-k-then-threshold rewrite
+_LEGACY_SEARCH_SQL = """
+    SELECT id, name, description, path,
+           1 - (embedding <=> %(embedding)s::vector) AS similarity
+    FROM skills
+    WHERE embedding IS NOT NULL
+      AND 1 - (embedding <=> %(embedding)s::vector) > %(threshold)s
+    ORDER BY embedding <=> %(embedding)s::vector
+    LIMIT %(limit)s
+"""
+
+
+def _random_unit_vectors(rng: np.random.Generator, count: int, dim: int) -> np.ndarray:
+    vectors = rng.standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _clustered_unit_vectors(rng: np.random.Generator, centers: np.ndarray, count: int) -> np.ndarray:
+    """Unit vectors scattered around random `centers`, like topical embeddings."""
+    picked = centers[rng.integers(0, len(centers), count)]
+    noise = rng.standard_normal(picked.shape).astype(np.float32) / np.sqrt(centers.shape[1])
+    vectors = picked + noise
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _populate_bench_table(
+    rows: int,
+    dim: int,
+    index: Optional[str],
+    rng: np.random.Generator,
+    centers: Optional[np.ndarray] = None
+) -> None:
+    """
+    Create the synthetic table, fill it, and build its vector index.
+
+    Vectors are uniformly random, or clustered around `centers`; with no
+    `index` the table is left unindexed.
+    """
+    with get_cursor() as cur:
+        cur.execute(f"DROP TABLE IF EXISTS {_BENCH_TABLE}")
+        cur.execute(
+            f"""
+            CREATE TABLE {_BENCH_TABLE} (
+                id SERIAL PRIMARY KEY,
+                name TEXT NOT NULL,
+                description TEXT,
+                path TEXT NOT NULL,
+                embedding vector({dim})
+            )
+            """
+        )
+
+    for start in range(0, rows, 5000):
+        count = min(5000, rows - start)
+        if centers is None:
+            vectors = _random_unit_vectors(rng, count, dim)
+        else:
+            vectors = _clustered_unit_vectors(rng, centers, count)
+        with get_cursor() as cur:
+            execute_values(
+                cur,
+                f"INSERT INTO {_BENCH_TABLE} (name, description, path, embedding) VALUES %s",
+                [
+                    (f"skill-{start + i}", "Synthetic benchmark row", f"skills/{start + i}", vectors[i])
+                    for i in range(count)
+                ],
+                page_size=1000
+            )
+
+    with get_cursor() as cur:
+        if index is None:
+            pass
+        elif index == "hnsw":
+            cur.execute(
+                f"CREATE INDEX ON {_BENCH_TABLE} USING hnsw (embedding vector_cosine_ops)"
+            )
+        else:
+            cur.execute(
+                f"CREATE INDEX ON {_BENCH_TABLE} USING ivfflat (embedding vector_cosine_ops) "
+                f"WITH (lists = {recommended_lists(rows)})"
+            )
+        cur.execute(f"ANALYZE {_BENCH_TABLE}")
+
+
+def benchmark_search_sql(rows: int, dim: int, queries: int, index: str) -> None:
+    """Compare latency of the legacy and index-friendly search SQL."""
+    rng = np.random.default_rng(0)
+    print(f"Loading {rows} random {dim}-d vectors into {_BENCH_TABLE} ({index} index)...")
+    start = time.perf_counter()
+    _populate_bench_table(rows, dim, index, rng)
+    print(f"  Loaded and indexed in {time.perf_counter() - start:.1f}s")
+
+    probes = _random_unit_vectors(rng, queries, dim)
+    # Random vectors are near-orthogonal, so a low threshold keeps rows in the result
+    base = {"threshold": 0.0, "limit": 10, "candidates": 20}
+
+    try:
+        print(f"Running {queries} queries per variant (limit {base['limit']}):")
+        for label, query in [("Legacy", _LEGACY_SEARCH_SQL), ("Top-k then threshold", SEARCH_SKILLS_SQL)]:
+            query = query.replace("FROM skills", f"FROM {_BENCH_TABLE}")
+            latencies = []
+            with get_cursor(commit=False) as cur:
+                for vector in probes:
+                    params = dict(base, embedding=vector)
+                    started = time.perf_counter()
+                    cur.execute(query, params)
+                    cur.fetchall()
+                    latencies.append((time.perf_counter() - started) * 1000)
+                cur.execute("EXPLAIN " + query, dict(base, embedding=probes[0]))
+                plan = " ".join(row["QUERY PLAN"] for row in cur.fetchall())
+            uses_index = "Index Scan" in plan
+            print(f"  {label:22s} p50 {statistics.median(latencies):8.2f} ms  "
+                  f"mean {statistics.mean(latencies):8.2f} ms  "
+                  f"{'index scan' if uses_index else 'sequential scan'}")
+    finally:
+        with get_cursor() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS {_BENCH_TABLE}")
+
+
+def _index_size(cur) -> int:
+    cur.execute(
+        "SELECT COALESCE(SUM(pg_relation_size(indexrelid)), 0) AS bytes FROM pg_index "
+        "WHERE indrelid = %s::regclass AND NOT indisprimary",
+        (_BENCH_TABLE,)
+    )
+    return cur.fetchone()["bytes"]
+
+
+def _exact_neighbours(probes: np.ndarray, limit: int) -> List[set]:
+    """Exact top `limit` ids per probe; run before the table is indexed."""
+    exact_sql = f"SELECT id FROM ({_nearest_sql(_BENCH_TABLE, 'id', 'limit', 'none', truncate=0)}) AS nearest"
+    truth = []
+    latencies = []
+    with get_cursor(commit=False) as cur:
+        for vector in probes:
+            started = time.perf_counter()
+            cur.execute(exact_sql, {"embedding": vector, "limit": limit})
+            truth.append({r["id"] for r in cur.fetchall()})
+            latencies.append((time.perf_counter() - started) * 1000)
+    print(f"  {'exact scan':14s} {_percentiles(latencies)}  recall 1.000  index       -")
+    return truth
+
+
+def _measure_index(
+    label: str,
+    quantization: str,
+    truncate: int,
+    dim: int,
+    rerank: int,
+    probes: np.ndarray,
+    truth: List[set],
+    limit: int
+) -> None:
+    """
+    Build one HNSW index on the bench table and search it like the registry.
+
+    Prints p50/p99 latency, recall@limit against `truth`, index size and
+    build time.
+    """
+    expression, opclass = index_expression(quantization, dim, truncate)
+    with get_cursor() as cur:
+        cur.execute(f"DROP INDEX IF EXISTS {_BENCH_TABLE}_embedding")
+        started = time.perf_counter()
+        cur.execute(
+            f"CREATE INDEX {_BENCH_TABLE}_embedding ON {_BENCH_TABLE} "
+            f"USING hnsw ({expression} {opclass})"
+        )
+        build_seconds = time.perf_counter() - started
+        cur.execute(f"ANALYZE {_BENCH_TABLE}")
+        size = _index_size(cur)
+
+    nearest = _nearest_sql(_BENCH_TABLE, "id", "limit", quantization, rerank, dim, truncate)
+    query = f"SELECT id FROM ({nearest}) AS nearest"
+    shortlist = limit if quantization == "none" and not truncate else limit * rerank
+    hits = 0
+    latencies = []
+    with get_cursor(commit=False) as cur:
+        ef_search = min(max(shortlist, HNSW_DEFAULT_EF_SEARCH), HNSW_MAX_EF_SEARCH)
+        cur.execute("SELECT set_config('hnsw.ef_search', %s, true)", (str(ef_search),))
+        for vector, expected in zip(probes, truth):
+            started = time.perf_counter()
+            cur.execute(query, {"embedding": vector, "limit": limit})
+            found = {r["id"] for r in cur.fetchall()}
+            latencies.append((time.perf_counter() - started) * 1000)
+            hits += len(found & expected)
+        cur.execute("EXPLAIN " + query, {"embedding": probes[0], "limit": limit})
+        plan = " ".join(row["QUERY PLAN"] for row in cur.fetchall())
+
+    rows = _bench_rows()
+    recall = hits / max(sum(len(t) for t in truth), 1)
+    print(f"  {label:14s} {_percentiles(latencies)}  recall {recall:.3f}  "
+          f"index {size / 1e6:7.1f} MB ({size / rows:6.0f} B/row, built in {build_seconds:.1f}s)"
+          f"{'' if 'Index Scan' in plan else '  [sequential scan]'}")
+
+
+def _bench_rows() -> int:
+    return execute_query(f"SELECT COUNT(*) AS count FROM {_BENCH_TABLE}")[0]["count"] or 1
+
+
+def benchmark_quantization(rows: int, dim: int, queries: int, rerank: int, limit: int = 10) -> None:
+    """
+    Compare HNSW indexes on full, halfvec and binary-quantized vectors.
+
+    Ground truth is the exact top `limit` per query, computed before any
+    index exists. Each quantized index is searched the way the registry
+    does it (shortlist of `limit * rerank` from the index, re-ranked on
+    the full vectors), so recall@limit reflects what searches return.
+    """
+    rng = np.random.default_rng(0)
+    centers = _random_unit_vectors(rng, max(rows // 100, 1), dim)
+    print(f"Loading {rows} clustered {dim}-d vectors into {_BENCH_TABLE}...")
+    _populate_bench_table(rows, dim, None, rng, centers=centers)
+    probes = _clustered_unit_vectors(rng, centers, queries)
+
+    try:
+        print(f"Running {queries} queries per index (recall@{limit}, re-rank x{rerank}):")
+        truth = _exact_neighbours(probes, limit)
+        for quantization in QUANTIZATIONS:
+            _measure_index(quantization, quantization, 0, dim, rerank, probes, truth, limit)
+    finally:
+        with get_cursor() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS {_BENCH_TABLE}")
+
+
+def _matryoshka_centers(rng: np.random.Generator, count: int, dim: int) -> np.ndarray:
+    """
+    Cluster centers whose variance decays along the dimensions, the way
+    Matryoshka training concentrates information in the leading ones.
+    """
+    profile = 1 / np.sqrt(1 + np.arange(dim, dtype=np.float32) / 32)
+    centers = _random_unit_vectors(rng, count, dim) * profile
+    return centers / np.linalg.norm(centers, axis=1, keepdims=True)
+
+
+def benchmark_matryoshka(
+    rows: int,
+    dim: int,
+    queries: int,
+    prefixes: List[int],
+    rerank: int,
+    source: Optional[str] = None,
+    limit: int = 10
+) -> None:
+    """
+    Recall and latency of first-pass indexes on truncated embeddings.
+
+    For each prefix length, an HNSW index over the first N dimensions
+    supplies `limit * rerank` candidates that are re-ranked on the full
+    vectors, as searches do with VECTOR_INDEX_DIMENSION=N. With `source`,
+    the registry's own embeddings from that table are used (queries are
+    stored embeddings plus a little noise) instead of synthetic vectors.
+    """
+    rng = np.random.default_rng(0)
+    if source:
+        dim = EMBEDDING_DIMENSION
+        _populate_bench_table(0, dim, None, rng)
+        with get_cursor() as cur:
+            cur.execute(
+                f"INSERT INTO {_BENCH_TABLE} (name, description, path, embedding) "
+                f"SELECT id::text, '', '', embedding FROM {source} WHERE embedding IS NOT NULL"
+            )
+            cur.execute(
+                f"SELECT embedding FROM {source} WHERE embedding IS NOT NULL ORDER BY random() LIMIT %s",
+                (queries,)
+            )
+            sampled = np.array([r["embedding"] for r in cur.fetchall()], dtype=np.float32)
+        if len(sampled) == 0:
+            print(f"No embeddings in {source}")
+            return
+        probes = sampled + rng.standard_normal(sampled.shape).astype(np.float32) * (0.5 / np.sqrt(dim))
+        probes /= np.linalg.norm(probes, axis=1, keepdims=True)
+        print(f"Loaded {_bench_rows()} embeddings from {source}")
+    else:
+        centers = _matryoshka_centers(rng, max(rows // 100, 1), dim)
+        print(f"Loading {rows} synthetic {dim}-d vectors with a decaying spectrum into {_BENCH_TABLE}...")
+        _populate_bench_table(rows, dim, None, rng, centers=centers)
+        probes = _clustered_unit_vectors(rng, centers, queries)
+
+    try:
+        print(f"Running {len(probes)} queries per index (recall@{limit}, re-rank x{rerank}):")
+        truth = _exact_neighbours(probes, limit)
+        _measure_index(f"full {dim}-d", "none", 0, dim, rerank, probes, truth, limit)
+        for prefix in sorted(p for p in prefixes if p < dim):
+            _measure_index(f"first {prefix}-d", "none", prefix, dim, rerank, probes, truth, limit)
+    finally:
+        with get_cursor() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS {_BENCH_TABLE}")
+
+
+# -----------------------------------------------------------------------------
+# Resident search server
+# -----------------------------------------------------------------------------
+
+def _percentiles(latencies: List[float]) -> str:
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return f"p50 {statistics.median(ordered):8.1f} ms  p99 {p99:8.1f} ms"
+
+
+def benchmark_search_server(queries: int, processes: int) -> None:
+    """Compare a fresh search.py process per lookup with a resident server."""
+    query = "how to design tools for agents"
+    command = [sys.executable, "-m", "scripts.search", query, "--json", "--limit", "5"]
+    cwd = Path(__file__).parent.parent
+
+    def run_process(extra_args: List[str], env: dict) -> float:
+        started = time.perf_counter()
+        subprocess.run(command + extra_args, cwd=cwd, env=env, stdout=subprocess.DEVNULL, check=True)
+        return (time.perf_counter() - started) * 1000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        socket_path = Path(tmp) / "search.sock"
+        env = dict(os.environ, SEARCH_SOCKET_PATH=str(socket_path))
+
+        print(f"Running {processes} search.py processes without a server...")
+        standalone = [run_process(["--no-server"], env) for _ in range(processes)]
+
+        server = SearchServer(open_registry(), socket_path=socket_path)
+        thread = threading.Thread(target=asyncio.run, args=(server.serve(),), daemon=True)
+        thread.start()
+        try:
+            while not server_available(socket_path):
+                time.sleep(0.05)
+
+            print(f"Running {processes} search.py processes against the server...")
+            via_server = [run_process([], env) for _ in range(processes)]
+
+            print(f"Running {queries} client calls (new connection each)...")
+            calls = []
+            for _ in range(queries):
+                started = time.perf_counter()
+                with SearchClient(socket_path) as client:
+                    client.call("search", query=query, limit=5)
+                calls.append((time.perf_counter() - started) * 1000)
+        finally:
+            server.stop()
+            thread.join()
+
+    print(f"  search.py, no server     {_percentiles(standalone)}")
+    print(f"  search.py, via server    {_percentiles(via_server)}")
+    print(f"  Client call              {_percentiles(calls)}")
+
+
+# -----------------------------------------------------------------------------
+# Async registry
+# -----------------------------------------------------------------------------
+
+_BENCH_TOPICS = [
+    "tool design for agents", "context window management", "database indexing",
+    "prompt caching", "error handling", "retrieval evaluation", "vector search",
+    "memory systems", "multi-agent coordination", "test automation",
+]
+
+
+def benchmark_async_search(searches: int, concurrency: int) -> None:
+    """
+    Compare N searches run sequentially, on a thread pool, and as asyncio tasks.
+
+    Every query is distinct, across modes too, so each search embeds its
+    query (no query or embedding cache hits) and the embedding request is
+    part of the measured latency.
+    """
+    def make_queries(mode: str) -> List[str]:
+        return [f"{_BENCH_TOPICS[i % len(_BENCH_TOPICS)]} ({mode} {i})" for i in range(searches)]
+
+    def timed_search(query: str) -> float:
+        started = time.perf_counter()
+        registry.search(query, limit=5)
+        return (time.perf_counter() - started) * 1000
+
+    registry = SkillRegistry(query_cache_size=0)
+
+    print(f"Running {searches} searches sequentially...")
+    started = time.perf_counter()
+    sequential = [timed_search(q) for q in make_queries("sequential")]
+    sequential_seconds = time.perf_counter() - started
+
+    print(f"Running {searches} searches on {concurrency} threads...")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        threaded = list(executor.map(timed_search, make_queries("threads")))
+    threaded_seconds = time.perf_counter() - started
+
+    async def run_async():
+        async with await AsyncSkillRegistry.connect(max_size=concurrency, query_cache_size=0) as async_registry:
+            async def timed(query: str) -> float:
+                started = time.perf_counter()
+                await async_registry.search(query, limit=5)
+                return (time.perf_counter() - started) * 1000
+
+            started = time.perf_counter()
+            latencies = await asyncio.gather(*(timed(q) for q in make_queries("asyncio")))
+            return latencies, time.perf_counter() - started
+
+    print(f"Running {searches} concurrent asyncio searches (pool of {concurrency})...")
+    concurrent, async_seconds = asyncio.run(run_async())
+
+    print(f"  Sequential   {_percentiles(sequential)}  {_rate(searches, sequential_seconds):8.1f} searches/s")
+    print(f"  Threads      {_percentiles(threaded)}  {_rate(searches, threaded_seconds):8.1f} searches/s")
+    print(f"  asyncio      {_percentiles(concurrent)}  {_rate(searches, async_seconds):8.1f} searches/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Performance benchmarks for the Semantic Knowledge Registry"
+    )
+    subparsers = parser.add_subparsers(dest="benchmark", help="Benchmark to run")
+
+    pool_parser = subparsers.add_parser("pool", help="Pooled vs fresh connections")
+    pool_parser.add_argument("--queries", type=int, default=500, help="Queries per mode")
+
+    chunk_parser = subparsers.add_parser("chunk", help="Chunking of large markdown files")
+    chunk_parser.add_argument("--size-mb", type=float, default=4.0, help="Document size in MB")
+
+    search_parser = subparsers.add_parser("search-sql", help="Legacy vs index-friendly search SQL")
+    search_parser.add_argument("--rows", type=int, default=100_000, help="Synthetic rows to load")
+    search_parser.add_argument("--dim", type=int, default=EMBEDDING_DIMENSION, help="Vector dimension")
+    search_parser.add_argument("--queries", type=int, default=200, help="Queries per variant")
+    search_parser.add_argument("--index", choices=["hnsw", "ivfflat"], default="hnsw",
+                               help="Vector index to build")
+
+    server_parser = subparsers.add_parser("server", help="search.py per lookup vs resident server")
+    server_parser.add_argument("--queries", type=int, default=200, help="Client calls to time")
+    server_parser.add_argument("--processes", type=int, default=10, help="search.py runs per mode")
+
+    async_parser = subparsers.add_parser("async-search", help="Threaded sync vs asyncio searches")
+    async_parser.add_argument("--searches", type=int, default=200, help="Searches per mode")
+    async_parser.add_argument("--concurrency", type=int, default=DB_POOL_MAX_SIZE,
+                              help="Threads / async pool connections")
+
+    quant_parser = subparsers.add_parser("quantization", help="Full vs halfvec vs binary vector indexes")
+    quant_parser.add_argument("--rows", type=int, default=100_000, help="Synthetic rows to load")
+    quant_parser.add_argument("--dim", type=int, default=EMBEDDING_DIMENSION, help="Vector dimension")
+    quant_parser.add_argument("--queries", type=int, default=200, help="Queries per index")
+    quant_parser.add_argument("--rerank", type=int, default=QUANTIZATION_RERANK,
+                              help="Quantized candidates per re-ranked result")
+
+    matryoshka_parser = subparsers.add_parser("matryoshka", help="Truncated-dimension first-pass indexes")
+    matryoshka_parser.add_argument("--rows", type=int, default=100_000, help="Synthetic rows to load")
+    matryoshka_parser.add_argument("--dim", type=int, default=EMBEDDING_DIMENSION, help="Vector dimension")
+    matryoshka_parser.add_argument("--queries", type=int, default=200, help="Queries per index")
+    matryoshka_parser.add_argument("--prefixes", default="128,256,512",
+                                   help="Comma-separated index dimensions to compare")
+    matryoshka_parser.add_argument("--rerank", type=int, default=QUANTIZATION_RERANK,
+                                   help="Index candidates per re-ranked result")
+    matryoshka_parser.add_argument("--source", choices=["skills", "documents", "document_chunks"],
+                                   help="Use this registry table's embeddings instead of synthetic vectors")
+
+    args = parser.parse_args()
+
+    if not args.benchmark:
+        parser.print_help()
+        return 1
+
+    if args.benchmark == "pool":
+        benchmark_pool(args.queries)
+    elif args.benchmark == "chunk":
+        benchmark_chunking(args.size_mb)
+    elif args.benchmark == "search-sql":
+        benchmark_search_sql(args.rows, args.dim, args.queries, args.index)
+    elif args.benchmark == "server":
+        benchmark_search_server(args.queries, args.processes)
+    elif args.benchmark == "async-search":
+        benchmark_async_search(args.searches, args.concurrency)
+    elif args.benchmark == "quantization":
+        benchmark_quantization(args.rows, args.dim, args.queries, args.rerank)
+    elif args.benchmark == "matryoshka":
+        prefixes = [int(p) for p in args.prefixes.split(",") if p.strip()]
+        benchmark_matryoshka(args.rows, args.dim, args.queries, prefixes, args.rerank, source=args.source)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,36 +1,296 @@
 """Database connection and utilities."""
 
+import atexit
+import threading
+import time
 from contextlib import contextmanager
-from typing import Generator, Optional, Any
+from typing import Callable, Generator, Hashable, Optional, Any
 import psycopg2
 from psycopg2.extras import RealDictCursor
+from psycopg2.pool import ThreadedConnectionPool, PoolError
 from pgvector.psycopg2 import register_vector
 
-from .config import DATABASE_URL
+from .config import (
+    DATABASE_URL,
+    DB_POOL_MIN_SIZE,
+    DB_POOL_MAX_SIZE,
+    DB_POOL_HEALTH_CHECK_INTERVAL,
+    DB_POOL_TIMEOUT,
+)
+
+
+class VectorConnectionPool(ThreadedConnectionPool):
+    """
+    Thread-safe connection pool whose connections have pgvector registered.
+
+    When every connection is checked out, `checkout` waits for one to be
+    released (up to DB_POOL_TIMEOUT seconds) instead of failing at once.
+    """
+
+    def __init__(self, minconn: int, maxconn: int, *args, **kwargs):
+        self._last_used = {}
+        self._slots = threading.BoundedSemaphore(maxconn)
+        super().__init__(minconn, maxconn, *args, **kwargs)
+
+    def _connect(self, key=None):
+        conn = super()._connect(key)
+        register_vector(conn)
+        # register_vector runs a lookup query; don't leave the transaction open
+        conn.rollback()
+        self._last_used[id(conn)] = time.monotonic()
+        return conn
+
+    def checkout(self, timeout: float = DB_POOL_TIMEOUT):
+        """
+        Check out a healthy connection, waiting up to `timeout` seconds
+        for one to be free. Raises PoolError if none is.
+
+        Connections that are closed, or that fail a `SELECT 1` probe after
+        sitting idle longer than the health check interval, are discarded
+        and replaced.
+        """
+        if not self._slots.acquire(timeout=timeout):
+            raise PoolError(f"connection pool exhausted: no connection free after {timeout}s")
+        try:
+            while True:
+                conn = self.getconn()
+                if self._is_healthy(conn):
+                    return conn
+                self.putconn(conn, close=True)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, conn, discard: bool = False) -> None:
+        """Return a checked-out connection to the pool, closing it if `discard` is set."""
+        try:
+            if discard or conn.closed:
+                self.putconn(conn, close=True)
+            else:
+                self._last_used[id(conn)] = time.monotonic()
+                self.putconn(conn)
+        finally:
+            self._slots.release()
+
+    def _putconn(self, conn, key=None, close=False):
+        super()._putconn(conn, key, close)
+        # The pool closes surplus connections as well as discarded ones
+        if conn.closed:
+            self._last_used.pop(id(conn), None)
+
+    def _closeall(self):
+        super()._closeall()
+        self._last_used.clear()
+
+    def _is_healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+
+        idle = time.monotonic() - self._last_used.get(id(conn), 0.0)
+        if idle < DB_POOL_HEALTH_CHECK_INTERVAL:
+            return True
+
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            return False
+
+
+_pool: Optional[VectorConnectionPool] = None
+_pool_lock = threading.Lock()
+_local = threading.local()
+
+
+def get_pool() -> VectorConnectionPool:
+    """Get the process-wide connection pool, creating it on first use."""
+    global _pool
+    if _pool is None or _pool.closed:
+        with _pool_lock:
+            if _pool is None or _pool.closed:
+                _pool = VectorConnectionPool(
+                    DB_POOL_MIN_SIZE,
+                    DB_POOL_MAX_SIZE,
+                    DATABASE_URL
+                )
+    return _pool
+
+
+def close_pool() -> None:
+    """Close all pooled connections."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and not _pool.closed:
+            _pool.closeall()
+        _pool = None
+
+
+atexit.register(close_pool)
 
 
 def get_connection():
-    """Get a database connection with pgvector support."""
+    """
+    Get a new, unpooled database connection with pgvector support.
+
+    The caller owns the connection and must close it. Prefer
+    `pooled_connection()` / `get_cursor()` for regular queries.
+    """
     conn = psycopg2.connect(DATABASE_URL)
     register_vector(conn)
     return conn
 
 
 @contextmanager
-def get_cursor(commit: bool = True) -> Generator[RealDictCursor, None, None]:
-    """Context manager for database operations."""
-    conn = get_connection()
+def pooled_connection() -> Generator[Any, None, None]:
+    """
+    Check out a pooled connection for the current thread.
+
+    Nested calls on the same thread reuse the connection that is already
+    checked out, so the outermost block owns the transaction: it commits
+    or rolls back, and returns the connection to the pool. A bare
+    `pooled_connection()` owner never commits; the pool rolls back
+    whatever is left open.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        _local.depth += 1
+        try:
+            yield conn
+        finally:
+            _local.depth -= 1
+        return
+
+    pool = get_pool()
+    conn = pool.checkout()
+    _local.conn = conn
+    _local.depth = 1
+    _local.commits = False
+    _local.on_commit = {}
+    discard = False
     try:
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        yield cursor
-        if commit:
-            conn.commit()
-    except Exception:
-        conn.rollback()
+        yield conn
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        discard = True
         raise
     finally:
-        cursor.close()
-        conn.close()
+        _local.conn = None
+        _local.depth = 0
+        _local.on_commit = {}
+        pool.release(conn, discard=discard)
+
+
+@contextmanager
+def get_cursor(commit: Optional[bool] = None) -> Generator[RealDictCursor, None, None]:
+    """
+    Context manager for database operations.
+
+    The outermost block commits on exit (roll back with `commit=False`);
+    nested blocks join its transaction. Asking a nested block to commit
+    when the enclosing one will roll back raises RuntimeError rather
+    than silently losing the writes.
+    """
+    with pooled_connection() as conn:
+        outermost = _local.depth == 1
+        if outermost:
+            _local.commits = commit is not False
+        elif commit and not _local.commits:
+            raise RuntimeError(
+                "get_cursor(commit=True) nested in a block that rolls back; "
+                "its writes would be lost"
+            )
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        try:
+            yield cursor
+            if outermost:
+                if commit is not False:
+                    conn.commit()
+                    _run_commit_hooks()
+                else:
+                    conn.rollback()
+                    _local.on_commit = {}
+        except Exception:
+            if outermost:
+                _local.on_commit = {}
+                if not conn.closed:
+                    conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+
+@contextmanager
+def transaction() -> Generator[RealDictCursor, None, None]:
+    """
+    Run everything in the block as one transaction.
+
+    Registry calls made inside the block reuse this thread's connection,
+    so their writes commit together when the block exits, or roll back
+    together if it raises.
+    """
+    with get_cursor(commit=True) as cur:
+        yield cur
+
+
+def commit() -> None:
+    """
+    Commit the work done so far in the enclosing `transaction()` block.
+
+    The block carries on in a new transaction on the same connection.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        raise RuntimeError("commit() called outside a transaction() block")
+    conn.commit()
+    _run_commit_hooks()
+
+
+def on_commit(key: Hashable, callback: Callable[[], None]) -> None:
+    """
+    Run `callback` once the current transaction commits.
+
+    Callbacks are registered once per `key` and transaction, and are
+    dropped if the transaction (or the savepoint they were registered
+    in) rolls back. Outside a transaction the callback runs at once.
+    """
+    if getattr(_local, "conn", None) is None:
+        callback()
+    else:
+        _local.on_commit.setdefault(key, callback)
+
+
+def pending_commit(key: Optional[Hashable] = None) -> bool:
+    """Whether this thread's open transaction has an `on_commit` callback (for `key`, or any)."""
+    hooks = getattr(_local, "on_commit", None) or {}
+    return bool(hooks) if key is None else key in hooks
+
+
+def _run_commit_hooks() -> None:
+    hooks, _local.on_commit = _local.on_commit, {}
+    for callback in hooks.values():
+        callback()
+
+
+@contextmanager
+def savepoint() -> Generator[None, None, None]:
+    """
+    Make the block's writes undoable on their own.
+
+    If the block raises, its writes are rolled back to the savepoint and
+    the enclosing transaction stays usable; otherwise they are kept.
+    """
+    with get_cursor() as cur:
+        cur.execute("SAVEPOINT registry_unit")
+        hooks = dict(_local.on_commit)
+        try:
+            yield
+        except Exception:
+            _local.on_commit = hooks
+            if not cur.connection.closed:
+                cur.execute("ROLLBACK TO SAVEPOINT registry_unit")
+            raise
+        cur.execute("RELEASE SAVEPOINT registry_unit")
 
 
 def execute_query(
@@ -50,5 +310,3 @@ def execute_many(query: str, params_list: list) -> None:
     """Execute a query with multiple parameter sets."""
     with get_cursor() as cur:
         cur.executemany(query, params_list)
-
-
@@ -0,0 +1,1234 @@
+"""
+Embedded registry backend: SQLite metadata + memory-mapped vectors.
+
+For single-machine use without a Postgres server. Selected with a SQLite
+database URL:
+
+    DATABASE_URL=sqlite:///.cache/registry.db      # relative path
+    DATABASE_URL=sqlite:////var/lib/registry.db    # absolute path
+
+Skill and document metadata live in the SQLite file. Embeddings live next
+to it in one float32 matrix file per table (`registry.skills.f32`,
+`registry.documents.f32`), opened with `np.memmap`, so start-up only reads
+the row-to-id mapping and the OS pages vectors in on first search.
+Searches are exact: one matrix-vector product plus an `argpartition`
+top-k over every live row.
+
+Each process keeps its own row mapping and reloads it when another
+process has committed (SQLite's `PRAGMA data_version`), so readers such
+as the search server see an indexing run's writes. Only one process
+should write to an embedded registry at a time.
+"""
+
+import json
+import re
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Generator, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .config import (
+    EMBEDDING_DIMENSION,
+    QUERY_CACHE_SIZE,
+    QUERY_CACHE_TTL,
+    DOCUMENT_CHUNKS_ENABLED,
+    CHUNK_SEARCH_CANDIDATES,
+    SEARCH_OVERFETCH,
+    HYBRID_CANDIDATES,
+    RRF_K,
+    INDEX_COMMIT_INTERVAL,
+)
+from .embeddings import generate_embedding, generate_embeddings_batch, content_hash, chunk_spans
+from .memory_cache import LRUCache
+from .registry import RegistrySession, document_embedding_text, _skill_hash, _is_unchanged
+
+
+SQLITE_URL_PREFIX = "sqlite:///"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS skills (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    description TEXT,
+    content TEXT NOT NULL,
+    path TEXT NOT NULL,
+    version TEXT DEFAULT '1.0.0',
+    author TEXT,
+    content_hash TEXT,
+    vector_row INTEGER,  -- Row in registry.skills.f32, NULL without embedding
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS documents (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    description TEXT,
+    content TEXT NOT NULL,
+    path TEXT NOT NULL UNIQUE,
+    content_hash TEXT NOT NULL,
+    doc_type TEXT DEFAULT 'reference',
+    source_url TEXT DEFAULT 'No',
+    vector_row INTEGER,  -- Row in registry.documents.f32, NULL without embedding
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS document_chunks (
+    id TEXT PRIMARY KEY,
+    document_id TEXT NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    ordinal INTEGER NOT NULL,
+    start_offset INTEGER NOT NULL,
+    end_offset INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    vector_row INTEGER  -- Row in registry.document_chunks.f32
+);
+
+CREATE TABLE IF NOT EXISTS skill_sources (
+    skill_id TEXT REFERENCES skills(id) ON DELETE CASCADE,
+    document_id TEXT REFERENCES documents(id) ON DELETE CASCADE,
+    relevance REAL DEFAULT 1.0 CHECK (relevance >= 0 AND relevance <= 1),
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (skill_id, document_id)
+);
+
+CREATE TABLE IF NOT EXISTS skill_versions (
+    id TEXT PRIMARY KEY,
+    skill_id TEXT REFERENCES skills(id) ON DELETE CASCADE,
+    version TEXT NOT NULL,
+    content TEXT NOT NULL,
+    change_summary TEXT,
+    created_at TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_documents_hash ON documents(content_hash);
+CREATE INDEX IF NOT EXISTS idx_document_chunks_document ON document_chunks(document_id, ordinal);
+CREATE INDEX IF NOT EXISTS idx_skill_versions_skill ON skill_versions(skill_id, created_at DESC);
+"""
+
+# FTS5 indexes for hybrid search, kept in sync with their tables by triggers
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5(
+    {columns}, content='{table}', content_rowid='rowid', tokenize='porter'
+);
+
+CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN
+    INSERT INTO {table}_fts (rowid, {columns}) VALUES (new.rowid, {new});
+END;
+
+CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN
+    INSERT INTO {table}_fts ({table}_fts, rowid, {columns}) VALUES ('delete', old.rowid, {old});
+END;
+
+CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE ON {table} BEGIN
+    INSERT INTO {table}_fts ({table}_fts, rowid, {columns}) VALUES ('delete', old.rowid, {old});
+    INSERT INTO {table}_fts (rowid, {columns}) VALUES (new.rowid, {new});
+END;
+"""
+
+_FTS_COLUMNS = {
+    "skills": ["name", "description", "content"],
+    "documents": ["title", "description", "content"],
+}
+
+_FTS_TOKEN = re.compile(r"\w+")
+
+_TIMESTAMP_FIELDS = ("created_at", "updated_at")
+
+
+def sqlite_path_from_url(url: str) -> Optional[Path]:
+    """Get the database file for a `sqlite:///` URL, or None for other URLs."""
+    if not url.startswith(SQLITE_URL_PREFIX):
+        return None
+    return Path(url[len(SQLITE_URL_PREFIX):])
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _fts_query(text: str) -> Optional[str]:
+    """Quote each word so user text can't be parsed as FTS5 syntax."""
+    tokens = _FTS_TOKEN.findall(text)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"' for token in tokens)
+
+
+def _to_dict(row: sqlite3.Row) -> Dict:
+    """Convert a row, parsing timestamps like psycopg2 would."""
+    result = dict(row)
+    for field in _TIMESTAMP_FIELDS:
+        if result.get(field):
+            result[field] = datetime.fromisoformat(result[field])
+    return result
+
+
+class VectorStore:
+    """
+    A growable, memory-mapped float32 matrix with one row per item.
+
+    Vectors are stored L2-normalized, so a dot product is the cosine
+    similarity. Updates write a new row and free the old one on
+    `commit()`, so a rolled-back transaction never leaves a committed
+    item pointing at overwritten data.
+    """
+
+    def __init__(self, path: Path, dimension: int):
+        self.path = Path(path)
+        self.dimension = dimension
+        self._row_bytes = dimension * 4
+        self._matrix: Optional[np.memmap] = None
+        self._capacity = 0
+        self._row_of: Dict[str, int] = {}
+        self._ids = np.empty(0, dtype=object)
+        self._live = np.zeros(0, dtype=bool)
+        self._free: List[int] = []
+        self._pending_free: List[int] = []
+
+        if not self.path.exists():
+            self.path.touch()
+        size = self.path.stat().st_size
+        if size % self._row_bytes:
+            raise ValueError(
+                f"{self.path} does not hold {dimension}-dimensional vectors; "
+                f"was it built with a different EMBEDDING_DIMENSION?"
+            )
+        self._map(size // self._row_bytes)
+
+    def _map(self, capacity: int) -> None:
+        if capacity > self._capacity:
+            with open(self.path, "r+b") as f:
+                f.truncate(capacity * self._row_bytes)
+            self._ids = np.concatenate([self._ids, np.empty(capacity - self._capacity, dtype=object)])
+            self._live = np.concatenate([self._live, np.zeros(capacity - self._capacity, dtype=bool)])
+            self._free.extend(range(capacity - 1, self._capacity - 1, -1))
+        self._capacity = capacity
+        self._matrix = (
+            np.memmap(self.path, dtype=np.float32, mode="r+", shape=(capacity, self.dimension))
+            if capacity else None
+        )
+
+    def load(self, rows: Iterable[Tuple[str, int]], keep_pending: bool = False) -> None:
+        """
+        Set the live (id, row) pairs, as recorded in SQLite.
+
+        With `keep_pending` (after rolling back to a savepoint), rows freed
+        earlier in the open transaction stay reserved until `commit()`,
+        since a full rollback would make them live again.
+        """
+        pending = self._pending_free if keep_pending else []
+        capacity = self.path.stat().st_size // self._row_bytes
+        if capacity > self._capacity:
+            # Grown by another process
+            self._map(capacity)
+        self._ids[:] = None
+        self._live[:] = False
+        self._row_of = {}
+        for item_id, row in rows:
+            if row >= self._capacity:
+                raise ValueError(f"{self.path} is missing row {row} for {item_id}")
+            self._ids[row] = item_id
+            self._live[row] = True
+            self._row_of[item_id] = row
+        self._pending_free = [r for r in pending if not self._live[r]]
+        reserved = set(self._pending_free)
+        self._free = [
+            r for r in range(self._capacity - 1, -1, -1)
+            if not self._live[r] and r not in reserved
+        ]
+
+    def put(self, item_id: str, vector: np.ndarray) -> int:
+        """Store a vector for an item and return its new row."""
+        if not self._free:
+            self._map(max(64, self._capacity * 2))
+        row = self._free.pop()
+
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        self._matrix[row] = vector / norm if norm > 0 else vector
+
+        self.remove(item_id)
+        self._ids[row] = item_id
+        self._live[row] = True
+        self._row_of[item_id] = row
+        return row
+
+    def remove(self, item_id: str) -> None:
+        """Drop an item's vector; its row is reused after `commit()`."""
+        row = self._row_of.pop(item_id, None)
+        if row is not None:
+            self._ids[row] = None
+            self._live[row] = False
+            self._pending_free.append(row)
+
+    def commit(self) -> None:
+        """Flush vectors to disk and release rows freed since the last commit."""
+        if self._matrix is not None:
+            self._matrix.flush()
+        self._free.extend(self._pending_free)
+        self._pending_free = []
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def top_k(
+        self,
+        query: np.ndarray,
+        threshold: float,
+        limit: Optional[int] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Exact cosine search.
+
+        Returns (id, similarity) pairs above `threshold`, best first, at
+        most `limit` of them (all matches if None).
+        """
+        if not self._row_of:
+            return []
+
+        query = np.asarray(query, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+
+        rows = np.flatnonzero(self._live)
+        scores = self._matrix[rows] @ query
+
+        if limit is not None and limit < len(rows):
+            top = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            top = np.arange(len(rows))
+        top = top[scores[top] > threshold]
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        return [(self._ids[rows[i]], float(scores[i])) for i in top]
+
+
+class EmbeddedSkillRegistry:
+    """
+    `SkillRegistry` with the same public methods, backed by SQLite and
+    memory-mapped vectors instead of Postgres.
+
+    `ef_search` / `probes` are accepted for compatibility and ignored:
+    search is exact.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        query_cache_size: int = QUERY_CACHE_SIZE,
+        query_cache_ttl: Optional[float] = QUERY_CACHE_TTL,
+        dimension: int = EMBEDDING_DIMENSION
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._query_cache = LRUCache(query_cache_size, ttl=query_cache_ttl)
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._data_version = None
+
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(_SCHEMA)
+        self._create_fts()
+        self._check_dimension(dimension)
+
+        stem = self.path.with_suffix("")
+        self._vectors = {
+            "skills": VectorStore(Path(f"{stem}.skills.f32"), dimension),
+            "documents": VectorStore(Path(f"{stem}.documents.f32"), dimension),
+            "document_chunks": VectorStore(Path(f"{stem}.document_chunks.f32"), dimension),
+        }
+        self._load_vectors()
+
+    def _create_fts(self) -> None:
+        for table, columns in _FTS_COLUMNS.items():
+            exists = self._conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = ?", (f"{table}_fts",)
+            ).fetchone()
+            self._conn.executescript(_FTS_SCHEMA.format(
+                table=table,
+                columns=", ".join(columns),
+                new=", ".join(f"new.{c}" for c in columns),
+                old=", ".join(f"old.{c}" for c in columns)
+            ))
+            if not exists:
+                # Index rows written before full-text search was added
+                self._conn.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+        self._conn.commit()
+    
+    def _check_dimension(self, dimension: int) -> None:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'dimension'").fetchone()
+        if row is None:
+            self._conn.execute("INSERT INTO meta (key, value) VALUES ('dimension', ?)", (str(dimension),))
+            self._conn.commit()
+        elif int(row["value"]) != dimension:
+            raise ValueError(
+                f"{self.path} stores {row['value']}-dimensional embeddings, "
+                f"but EMBEDDING_DIMENSION is {dimension}"
+            )
+
+    def _load_vectors(self, keep_pending: bool = False) -> None:
+        self._data_version = self._read_data_version()
+        for table, store in self._vectors.items():
+            store.load(
+                (
+                    (r["id"], r["vector_row"])
+                    for r in self._conn.execute(
+                        f"SELECT id, vector_row FROM {table} WHERE vector_row IS NOT NULL"
+                    )
+                ),
+                keep_pending=keep_pending
+            )
+
+    def _read_data_version(self) -> int:
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _refresh_vectors(self) -> Optional[int]:
+        """
+        Reload the row mappings if another process has committed since
+        they were loaded. Returns the data version they match, or None
+        inside this registry's own transaction (which sees only its writes).
+        """
+        if self._conn.in_transaction:
+            return None
+        version = self._read_data_version()
+        if version != self._data_version:
+            self._load_vectors()
+        return version
+
+    def _top_k(
+        self,
+        table: str,
+        embedding: np.ndarray,
+        threshold: float,
+        limit: Optional[int] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        `VectorStore.top_k` against the latest committed rows.
+
+        A writer reuses rows freed by its earlier commits, so a search that
+        overlaps another process's commit is repeated with fresh mappings
+        rather than scoring IDs against vectors they no longer own.
+        """
+        with self._lock:
+            while True:
+                version = self._refresh_vectors()
+                matches = self._vectors[table].top_k(embedding, threshold, limit)
+                if version is None or version == self._read_data_version():
+                    return matches
+
+    @contextmanager
+    def transaction(self) -> Generator[None, None, None]:
+        """
+        Run everything in the block as one transaction.
+
+        Nested calls join the outer transaction; the outermost block commits,
+        or rolls back if it raises.
+        """
+        with self._lock:
+            if self._depth == 0:
+                self._refresh_vectors()
+            self._depth += 1
+            try:
+                yield
+                if self._depth == 1:
+                    self._commit()
+            except Exception:
+                if self._depth == 1:
+                    self._conn.rollback()
+                    self._load_vectors()
+                raise
+            finally:
+                self._depth -= 1
+
+    def session(self, commit_every: int = INDEX_COMMIT_INTERVAL) -> RegistrySession:
+        """Open a unit of work for a batch of writes; see `RegistrySession`."""
+        return RegistrySession(self, commit_every)
+
+    @contextmanager
+    def _savepoint(self) -> Generator[None, None, None]:
+        with self._lock:
+            if not self._conn.in_transaction:
+                self._refresh_vectors()
+                # A savepoint outside a transaction would commit on release
+                self._conn.execute("BEGIN")
+            self._conn.execute("SAVEPOINT registry_unit")
+            try:
+                yield
+            except Exception:
+                self._conn.execute("ROLLBACK TO SAVEPOINT registry_unit")
+                self._conn.execute("RELEASE SAVEPOINT registry_unit")
+                self._load_vectors(keep_pending=True)
+                raise
+            self._conn.execute("RELEASE SAVEPOINT registry_unit")
+
+    def _commit(self) -> None:
+        for store in self._vectors.values():
+            store.commit()
+        self._conn.commit()
+
+    def _query(self, sql: str, params: Sequence = ()) -> List[Dict]:
+        with self._lock:
+            return [_to_dict(r) for r in self._conn.execute(sql, params).fetchall()]
+
+    def _embed_query(self, text: str) -> np.ndarray:
+        """Embed a search query, reusing cached embeddings for repeat queries."""
+        key = " ".join(text.split()).casefold()
+
+        embedding = self._query_cache.get(key)
+        if embedding is None:
+            embedding = generate_embedding(text)
+            embedding.flags.writeable = False  # Shared by every caller of this query
+            self._query_cache.put(key, embedding)
+        return embedding
+
+    def _embed_queries(self, texts: List[str]) -> np.ndarray:
+        """`_embed_query` for many texts; cache misses are embedded in one batch."""
+        keys = [" ".join(text.split()).casefold() for text in texts]
+        embeddings = [self._query_cache.get(key) for key in keys]
+
+        missing = [i for i, e in enumerate(embeddings) if e is None]
+        if missing:
+            for i, embedding in zip(missing, generate_embeddings_batch([texts[i] for i in missing])):
+                embedding.flags.writeable = False
+                embeddings[i] = embedding
+                self._query_cache.put(keys[i], embedding)
+        return np.array(embeddings, dtype=np.float32)
+
+    def query_cache_stats(self) -> Dict:
+        """Get hit/miss statistics for the query embedding cache."""
+        return self._query_cache.stats()
+
+    def _write_rows(
+        self,
+        table: str,
+        key: str,
+        columns: List[str],
+        rows: List[Dict],
+        embeddings: Sequence[Optional[np.ndarray]]
+    ) -> Dict[str, str]:
+        """Upsert rows by `key` with their vectors; returns key -> id."""
+        store = self._vectors[table]
+        now = _now()
+        ids = {}
+
+        with self.transaction():
+            for row, embedding in zip(rows, embeddings):
+                existing = self._conn.execute(
+                    f"SELECT id FROM {table} WHERE {key} = ?", (row[key],)
+                ).fetchone()
+                item_id = existing["id"] if existing else str(uuid.uuid4())
+
+                vector_row = None
+                if embedding is not None:
+                    vector_row = store.put(item_id, embedding)
+                else:
+                    store.remove(item_id)
+
+                values = [row[c] for c in columns] + [vector_row]
+                if existing:
+                    assignments = ", ".join(f"{c} = ?" for c in columns)
+                    self._conn.execute(
+                        f"UPDATE {table} SET {assignments}, vector_row = ?, updated_at = ? WHERE id = ?",
+                        values + [now, item_id]
+                    )
+                else:
+                    self._conn.execute(
+                        f"INSERT INTO {table} (id, {', '.join(columns)}, vector_row, created_at, updated_at) "
+                        f"VALUES (?, {', '.join('?' * len(columns))}, ?, ?, ?)",
+                        [item_id] + values + [now, now]
+                    )
+                ids[row[key]] = item_id
+
+        return ids
+
+    def _existing_hashes(self, table: str, key: str, values: List[str]) -> Dict[str, Dict]:
+        placeholders = ",".join("?" * len(values))
+        return {
+            r[key]: r
+            for r in self._query(
+                f"SELECT id, {key}, content_hash, vector_row IS NOT NULL AS has_embedding "
+                f"FROM {table} WHERE {key} IN ({placeholders})",
+                values
+            )
+        }
+
+    def _search(
+        self,
+        table: str,
+        columns: str,
+        embedding: np.ndarray,
+        threshold: float,
+        limit: Optional[int],
+        text: Optional[str] = None
+    ) -> List[Dict]:
+        """Vector search, or hybrid search when the query `text` is given."""
+        with self._lock:
+            if text is None:
+                matches = [
+                    (item_id, {"similarity": score})
+                    for item_id, score in self._top_k(table, embedding, threshold, limit)
+                ]
+            else:
+                matches = self._hybrid_matches(table, embedding, text, limit)
+            if not matches:
+                return []
+            rows = {
+                r["id"]: r
+                for r in self._query(
+                    f"SELECT {columns} FROM {table} WHERE id IN ({','.join('?' * len(matches))})",
+                    [item_id for item_id, _ in matches]
+                )
+            }
+        return [dict(rows[item_id], **scores) for item_id, scores in matches if item_id in rows]
+
+    def _hybrid_matches(
+        self,
+        table: str,
+        embedding: np.ndarray,
+        text: str,
+        limit: int
+    ) -> List[Tuple[str, Dict]]:
+        """Reciprocal rank fusion of the vector and FTS5 rankings."""
+        candidates = max(limit * SEARCH_OVERFETCH, HYBRID_CANDIDATES)
+        ranked = self._top_k(table, embedding, float("-inf"))
+        similarity = dict(ranked)
+
+        fused: Dict[str, float] = {}
+        for rank, (item_id, _) in enumerate(ranked[:candidates], 1):
+            fused[item_id] = fused.get(item_id, 0.0) + 1.0 / (RRF_K + rank)
+
+        match = _fts_query(text)
+        if match:
+            # Weight title/name over description over content, like the Postgres tsvector
+            text_ranked = self._conn.execute(
+                f"SELECT t.id FROM {table}_fts JOIN {table} t ON t.rowid = {table}_fts.rowid "
+                f"WHERE {table}_fts MATCH ? ORDER BY bm25({table}_fts, 10.0, 4.0, 1.0) LIMIT ?",
+                (match, candidates)
+            ).fetchall()
+            for rank, row in enumerate(text_ranked, 1):
+                fused[row["id"]] = fused.get(row["id"], 0.0) + 1.0 / (RRF_K + rank)
+
+        best = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [
+            (item_id, {"similarity": similarity.get(item_id), "score": score})
+            for item_id, score in best
+        ]
+
+    # -------------------------------------------------------------------------
+    # Skills
+    # -------------------------------------------------------------------------
+
+    _SKILL_COLUMNS = ["name", "description", "content", "path", "version", "author", "content_hash"]
+
+    def upsert_skill(
+        self,
+        name: str,
+        description: str,
+        content: str,
+        path: str,
+        version: str = "1.0.0",
+        author: Optional[str] = None,
+        generate_embedding_flag: bool = True,
+        force: bool = False
+    ) -> str:
+        """Insert or update a skill. Returns the skill ID."""
+        return self.bulk_upsert_skills([{
+            "name": name,
+            "description": description,
+            "content": content,
+            "path": path,
+            "version": version,
+            "author": author,
+        }], force=force, generate_embedding_flag=generate_embedding_flag)[name]
+
+    def bulk_upsert_skills(
+        self,
+        skills: List[Dict],
+        force: bool = False,
+        generate_embedding_flag: bool = True
+    ) -> Dict[str, str]:
+        """Insert or update many skills; returns skill name -> ID."""
+        skills = list({s["name"]: s for s in skills}.values())
+        if not skills:
+            return {}
+
+        existing = self._existing_hashes("skills", "name", [s["name"] for s in skills])
+
+        ids = {}
+        changed = []
+        for skill in skills:
+            row = dict(skill, version=skill.get("version", "1.0.0"), author=skill.get("author"))
+            row["content_hash"] = _skill_hash(
+                row["name"], row["description"], row["content"], row["path"],
+                row["version"], row["author"]
+            )
+            current = existing.get(row["name"])
+            if not force and current and _is_unchanged(current, row["content_hash"], generate_embedding_flag):
+                ids[row["name"]] = current["id"]
+            else:
+                changed.append(row)
+
+        if not changed:
+            return ids
+
+        embeddings = [None] * len(changed)
+        if generate_embedding_flag:
+            embeddings = generate_embeddings_batch([
+                f"{s['name']}: {s['description']}\n\n{s['content'][:4000]}"
+                for s in changed
+            ])
+
+        ids.update(self._write_rows("skills", "name", self._SKILL_COLUMNS, changed, embeddings))
+        return ids
+
+    def get_skill(self, name: str) -> Optional[Dict]:
+        """Get a skill by name."""
+        results = self._query(
+            "SELECT id, name, description, content, path, version, author, created_at, updated_at "
+            "FROM skills WHERE name = ?",
+            (name,)
+        )
+        return results[0] if results else None
+
+    def get_skill_by_id(self, skill_id: str) -> Optional[Dict]:
+        """Get a skill by ID."""
+        results = self._query(
+            "SELECT id, name, description, content, path, version, author, created_at, updated_at "
+            "FROM skills WHERE id = ?",
+            (str(skill_id),)
+        )
+        return results[0] if results else None
+
+    def list_skills(self) -> List[Dict]:
+        """List all skills with basic info."""
+        return self._query(
+            "SELECT id, name, description, version, path, updated_at "
+            "FROM skills ORDER BY name"
+        )
+
+    def delete_skill(self, name: str) -> bool:
+        """Delete a skill by name."""
+        return self.delete_skills([name]) > 0
+
+    def delete_skills(self, names: List[str]) -> int:
+        """Delete many skills by name. Returns the number deleted."""
+        with self.transaction():
+            rows = self._conn.execute(
+                "SELECT id FROM skills WHERE name IN (SELECT value FROM json_each(?))",
+                (json.dumps(list(names)),)
+            ).fetchall()
+            for row in rows:
+                self._conn.execute("DELETE FROM skills WHERE id = ?", (row["id"],))
+                self._vectors["skills"].remove(row["id"])
+            return len(rows)
+
+    def search_skills(
+        self,
+        query: str,
+        threshold: float = 0.7,
+        limit: int = 10,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        mode: str = "vector"
+    ) -> List[Dict]:
+        """Semantic search for skills."""
+        return self.search(query, "skills", threshold, limit, mode=mode)["skills"]
+
+    def find_related_skills(
+        self,
+        content: str,
+        threshold: float = 0.7,
+        limit: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        embedding: Optional[np.ndarray] = None
+    ) -> List[Dict]:
+        """Find skills related to given content (or its precomputed `embedding`)."""
+        if embedding is None:
+            embedding = generate_embedding(content[:8000])  # Not a repeatable query; bypass the cache
+        return self._related_skills(embedding, threshold, limit)
+
+    def find_related_skills_batch(
+        self,
+        contents: List[str],
+        threshold: float = 0.7,
+        limit: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        embeddings: Optional[np.ndarray] = None
+    ) -> List[List[Dict]]:
+        """`find_related_skills` for many contents, embedded in one batch unless `embeddings` are given."""
+        if not contents:
+            return []
+        if embeddings is None:
+            embeddings = generate_embeddings_batch([content[:8000] for content in contents])
+        return [self._related_skills(embedding, threshold, limit) for embedding in embeddings]
+
+    def _related_skills(self, embedding: np.ndarray, threshold: float, limit: Optional[int]) -> List[Dict]:
+        return [
+            {"skill_id": r["id"], "skill_name": r["name"], "similarity": r["similarity"]}
+            for r in self._search("skills", "id, name", embedding, threshold, limit)
+        ]
+
+    # -------------------------------------------------------------------------
+    # Documents
+    # -------------------------------------------------------------------------
+
+    _DOCUMENT_COLUMNS = ["title", "content", "path", "content_hash", "doc_type", "description", "source_url"]
+
+    def embed_documents(self, documents: List[Dict]) -> np.ndarray:
+        """Embed documents ("title" and "content") in one batch, the way `upsert_document` would."""
+        return generate_embeddings_batch([
+            document_embedding_text(d["title"], d["content"]) for d in documents
+        ])
+
+    def upsert_document(
+        self,
+        title: str,
+        content: str,
+        path: str,
+        doc_type: str = "reference",
+        description: str = "",
+        source_url: str = "No",
+        generate_embedding_flag: bool = True,
+        force: bool = False,
+        embedding: Optional[np.ndarray] = None
+    ) -> str:
+        """Insert or update a document, with its precomputed `embedding` if given. Returns the document ID."""
+        return self.bulk_upsert_documents([{
+            "title": title,
+            "content": content,
+            "path": path,
+            "doc_type": doc_type,
+            "description": description,
+            "source_url": source_url,
+            "embedding": embedding,
+        }], force=force, generate_embedding_flag=generate_embedding_flag)[path]
+
+    def bulk_upsert_documents(
+        self,
+        documents: List[Dict],
+        force: bool = False,
+        generate_embedding_flag: bool = True
+    ) -> Dict[str, str]:
+        """
+        Insert or update many documents; returns path -> document ID.
+
+        Documents with a precomputed "embedding" are not embedded again.
+        """
+        documents = list({d["path"]: d for d in documents}.values())
+        if not documents:
+            return {}
+
+        existing = self._existing_hashes("documents", "path", [d["path"] for d in documents])
+
+        ids = {}
+        changed = []
+        for doc in documents:
+            row = dict(
+                doc,
+                content_hash=content_hash(doc["content"]),
+                doc_type=doc.get("doc_type", "reference"),
+                description=doc.get("description", ""),
+                source_url=doc.get("source_url", "No")
+            )
+            current = existing.get(row["path"])
+            if not force and current and _is_unchanged(current, row["content_hash"], generate_embedding_flag):
+                ids[row["path"]] = current["id"]
+            else:
+                changed.append(row)
+
+        if not changed:
+            return ids
+
+        embeddings = [None] * len(changed)
+        if generate_embedding_flag:
+            embeddings = [doc.get("embedding") for doc in changed]
+            missing = [i for i, e in enumerate(embeddings) if e is None]
+            if missing:
+                computed = generate_embeddings_batch([
+                    document_embedding_text(changed[i]["title"], changed[i]["content"])
+                    for i in missing
+                ])
+                for i, embedding in zip(missing, computed):
+                    embeddings[i] = embedding
+
+        with self.transaction():
+            written = self._write_rows("documents", "path", self._DOCUMENT_COLUMNS, changed, embeddings)
+            if generate_embedding_flag and DOCUMENT_CHUNKS_ENABLED:
+                self._sync_document_chunks([(written[doc["path"]], doc["content"]) for doc in changed])
+        
+        ids.update(written)
+        return ids
+
+    def _sync_document_chunks(self, documents: List[Tuple[str, str]]) -> int:
+        """
+        Bring document_chunks in line with each (document ID, content).
+
+        Chunks whose hash is unchanged keep their vector, as in
+        `SkillRegistry._sync_document_chunks`. Returns the number embedded.
+        """
+        store = self._vectors["document_chunks"]
+        placeholders = ",".join("?" * len(documents))
+        existing: Dict[Tuple[str, str], List[str]] = {}
+        for r in self._conn.execute(
+            f"SELECT id, document_id, content_hash FROM document_chunks WHERE document_id IN ({placeholders})",
+            [doc_id for doc_id, _ in documents]
+        ):
+            existing.setdefault((r["document_id"], r["content_hash"]), []).append(r["id"])
+
+        kept = []
+        new = []
+        for doc_id, content in documents:
+            for ordinal, (start, end) in enumerate(chunk_spans(content)):
+                chunk_hash = content_hash(content[start:end])
+                matches = existing.get((doc_id, chunk_hash))
+                if matches:
+                    kept.append((ordinal, start, end, matches.pop()))
+                else:
+                    new.append((str(uuid.uuid4()), doc_id, ordinal, start, end, chunk_hash, content[start:end]))
+
+        stale = [chunk_id for chunk_ids in existing.values() for chunk_id in chunk_ids]
+        for chunk_id in stale:
+            store.remove(chunk_id)
+        self._conn.executemany("DELETE FROM document_chunks WHERE id = ?", [(c,) for c in stale])
+        self._conn.executemany(
+            "UPDATE document_chunks SET ordinal = ?, start_offset = ?, end_offset = ? WHERE id = ?",
+            kept
+        )
+
+        if new:
+            embeddings = generate_embeddings_batch([text for *_, text in new])
+            self._conn.executemany(
+                "INSERT INTO document_chunks "
+                "(id, document_id, ordinal, start_offset, end_offset, content_hash, vector_row) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (chunk_id, doc_id, ordinal, start, end, chunk_hash, store.put(chunk_id, embedding))
+                    for (chunk_id, doc_id, ordinal, start, end, chunk_hash, _), embedding in zip(new, embeddings)
+                ]
+            )
+
+        return len(new)
+
+    def get_document(self, path: str) -> Optional[Dict]:
+        """Get a document by path."""
+        results = self._query(
+            "SELECT id, title, content, path, doc_type, content_hash, created_at, updated_at "
+            "FROM documents WHERE path = ?",
+            (path,)
+        )
+        return results[0] if results else None
+
+    def list_documents(self, doc_type: Optional[str] = None) -> List[Dict]:
+        """List all documents, optionally filtered by type."""
+        if doc_type:
+            return self._query(
+                "SELECT id, title, path, doc_type, updated_at "
+                "FROM documents WHERE doc_type = ? ORDER BY title",
+                (doc_type,)
+            )
+        return self._query(
+            "SELECT id, title, path, doc_type, updated_at "
+            "FROM documents ORDER BY title"
+        )
+
+    def delete_document(self, path: str) -> bool:
+        """Delete a document by path."""
+        return self.delete_documents([path]) > 0
+
+    def delete_documents(self, paths: List[str]) -> int:
+        """Delete many documents (and their chunks) by path. Returns the number deleted."""
+        with self.transaction():
+            rows = self._conn.execute(
+                "SELECT id FROM documents WHERE path IN (SELECT value FROM json_each(?))",
+                (json.dumps(list(paths)),)
+            ).fetchall()
+            for row in rows:
+                for chunk in self._conn.execute(
+                    "SELECT id FROM document_chunks WHERE document_id = ?", (row["id"],)
+                ).fetchall():
+                    self._vectors["document_chunks"].remove(chunk["id"])
+                self._conn.execute("DELETE FROM documents WHERE id = ?", (row["id"],))
+                self._vectors["documents"].remove(row["id"])
+            return len(rows)
+
+    def rename_documents(self, renames: Dict[str, str]) -> int:
+        """
+        Move documents to new paths, keeping their ID, vectors and links.
+
+        `renames` maps old path to new path. Returns the number moved.
+        Swapped or chained paths move through temporary paths, and a
+        document still at a target path that isn't moving away is
+        replaced, as in `SkillRegistry.rename_documents`.
+        """
+        if not renames:
+            return 0
+        with self.transaction():
+            self.delete_documents([p for p in renames.values() if p not in renames])
+            moved = []
+            for old_path, new_path in renames.items():
+                row = self._conn.execute("SELECT id FROM documents WHERE path = ?", (old_path,)).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE documents SET path = ? WHERE id = ?", (f".renaming/{row['id']}", row["id"])
+                    )
+                    moved.append((new_path, _now(), row["id"]))
+            self._conn.executemany("UPDATE documents SET path = ?, updated_at = ? WHERE id = ?", moved)
+            return len(moved)
+
+    def existing_ids(self, skill_ids: List[str], document_ids: List[str]) -> set:
+        """Get the subset of the given skill and document IDs that still exist."""
+        rows = self._query(
+            """
+            SELECT id FROM skills WHERE id IN (SELECT value FROM json_each(?))
+            UNION ALL
+            SELECT id FROM documents WHERE id IN (SELECT value FROM json_each(?))
+            """,
+            (json.dumps(list(skill_ids)), json.dumps(list(document_ids)))
+        )
+        return {r["id"] for r in rows}
+
+    def search_documents(
+        self,
+        query: str,
+        threshold: float = 0.7,
+        limit: int = 10,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        mode: str = "vector"
+    ) -> List[Dict]:
+        """Semantic search for documents."""
+        return self.search(query, "docs", threshold, limit, mode=mode)["documents"]
+
+    def search_document_chunks(
+        self,
+        query: str,
+        threshold: float = 0.7,
+        limit: int = 10,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None
+    ) -> List[Dict]:
+        """Semantic search over document chunks, rolled up to documents."""
+        candidates = max(limit * SEARCH_OVERFETCH, CHUNK_SEARCH_CANDIDATES)
+        with self._lock:
+            matches = self._top_k("document_chunks", self._embed_query(query), threshold, candidates)
+            if not matches:
+                return []
+            chunks = {
+                r["chunk_id"]: r
+                for r in self._query(
+                    f"""
+                    SELECT c.id AS chunk_id, d.id, d.title, d.path, d.doc_type, d.content,
+                           c.ordinal, c.start_offset, c.end_offset
+                    FROM document_chunks c
+                    JOIN documents d ON d.id = c.document_id
+                    WHERE c.id IN ({','.join('?' * len(matches))})
+                    """,
+                    [chunk_id for chunk_id, _ in matches]
+                )
+            }
+
+        # Matches are best first, so the first chunk seen per document is its best
+        results = {}
+        for chunk_id, similarity in matches:
+            chunk = chunks.get(chunk_id)
+            if chunk is None or chunk["id"] in results:
+                continue
+            content = chunk.pop("content")
+            del chunk["chunk_id"]
+            chunk["similarity"] = similarity
+            chunk["excerpt"] = content[chunk["start_offset"]:chunk["end_offset"]]
+            results[chunk["id"]] = chunk
+        return list(results.values())[:limit]
+
+    # -------------------------------------------------------------------------
+    # Unified Search
+    # -------------------------------------------------------------------------
+
+    def search(
+        self,
+        query: str,
+        search_type: str = "all",
+        threshold: float = 0.7,
+        limit: int = 10,
+        skill_threshold: Optional[float] = None,
+        skill_limit: Optional[int] = None,
+        doc_threshold: Optional[float] = None,
+        doc_limit: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        mode: str = "vector"
+    ) -> Dict[str, List[Dict]]:
+        """
+        Semantic search across skills and documents with one query embedding.
+
+        `mode="hybrid"` fuses vector and FTS5 rankings and ignores
+        thresholds, as in `SkillRegistry.search`.
+        """
+        if mode not in ("vector", "hybrid"):
+            raise ValueError(f"Unknown search mode: {mode}")
+        embedding = self._embed_query(query)
+        text = query if mode == "hybrid" else None
+        results = {"skills": [], "documents": []}
+
+        if search_type in ("skills", "all"):
+            results["skills"] = self._search(
+                "skills", "id, name, description, path", embedding,
+                threshold if skill_threshold is None else skill_threshold,
+                limit if skill_limit is None else skill_limit,
+                text
+            )
+        if search_type in ("docs", "all"):
+            results["documents"] = self._search(
+                "documents", "id, title, path, doc_type", embedding,
+                threshold if doc_threshold is None else doc_threshold,
+                limit if doc_limit is None else doc_limit,
+                text
+            )
+
+        return results
+
+    # -------------------------------------------------------------------------
+    # Skill-Document Links
+    # -------------------------------------------------------------------------
+
+    def link_skill_to_document(
+        self,
+        skill_id: str,
+        document_id: str,
+        relevance: float = 1.0
+    ) -> None:
+        """Link a skill to a source document."""
+        self.bulk_link_skills_to_documents([(skill_id, document_id, relevance)])
+
+    def bulk_link_skills_to_documents(
+        self,
+        links: List[Tuple[str, str, float]]
+    ) -> None:
+        """Link many (skill_id, document_id, relevance) pairs."""
+        links = list({(str(s), str(d)): (str(s), str(d), r) for s, d, r in links}.values())
+        if not links:
+            return
+
+        now = _now()
+        with self.transaction():
+            self._conn.executemany(
+                """
+                INSERT INTO skill_sources (skill_id, document_id, relevance, created_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (skill_id, document_id) DO UPDATE SET
+                    relevance = excluded.relevance
+                WHERE skill_sources.relevance IS NOT excluded.relevance
+                """,
+                [(s, d, r, now) for s, d, r in links]
+            )
+
+    def get_skill_sources(self, skill_id: str) -> List[Dict]:
+        """Get all source documents for a skill."""
+        return self._query(
+            """
+            SELECT d.id, d.title, d.path, d.doc_type, ss.relevance
+            FROM documents d
+            JOIN skill_sources ss ON d.id = ss.document_id
+            WHERE ss.skill_id = ?
+            ORDER BY ss.relevance DESC
+            """,
+            (str(skill_id),)
+        )
+
+    def get_document_skills(self, document_id: str) -> List[Dict]:
+        """Get all skills that use a document as source."""
+        return self._query(
+            """
+            SELECT s.id, s.name, s.description, ss.relevance
+            FROM skills s
+            JOIN skill_sources ss ON s.id = ss.skill_id
+            WHERE ss.document_id = ?
+            ORDER BY ss.relevance DESC
+            """,
+            (str(document_id),)
+        )
+
+    # -------------------------------------------------------------------------
+    # Skill Versions
+    # -------------------------------------------------------------------------
+
+    def create_skill_version(
+        self,
+        skill_id: str,
+        version: str,
+        content: str,
+        change_summary: Optional[str] = None
+    ) -> str:
+        """Create a version snapshot for a skill."""
+        version_id = str(uuid.uuid4())
+        with self.transaction():
+            self._conn.execute(
+                """
+                INSERT INTO skill_versions (id, skill_id, version, content, change_summary, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (version_id, str(skill_id), version, content, change_summary, _now())
+            )
+        return version_id
+
+    def get_skill_versions(self, skill_id: str) -> List[Dict]:
+        """Get version history for a skill."""
+        return self._query(
+            """
+            SELECT id, version, change_summary, created_at
+            FROM skill_versions
+            WHERE skill_id = ?
+            ORDER BY created_at DESC
+            """,
+            (str(skill_id),)
+        )
+
+    # -------------------------------------------------------------------------
+    # Utilities
+    # -------------------------------------------------------------------------
+
+    def get_stats(self) -> Dict:
+        """Get registry statistics."""
+        with self._lock:
+            self._refresh_vectors()
+        counts = self._query(
+            """
+            SELECT
+                (SELECT COUNT(*) FROM skills) AS skills,
+                (SELECT COUNT(*) FROM documents) AS documents,
+                (SELECT COUNT(*) FROM document_chunks) AS document_chunks,
+                (SELECT COUNT(*) FROM skill_sources) AS skill_document_links
+            """
+        )[0]
+        return {
+            "skills": counts["skills"],
+            "skills_with_embedding": len(self._vectors["skills"]),
+            "documents": counts["documents"],
+            "documents_with_embedding": len(self._vectors["documents"]),
+            "document_chunks": counts["document_chunks"],
+            "skill_document_links": counts["skill_document_links"]
+        }
+
+    def close(self) -> None:
+        """Flush vectors and close the database."""
+        with self._lock:
+            self._commit()
+            self._conn.close()
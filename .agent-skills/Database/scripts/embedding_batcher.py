@@ -0,0 +1,198 @@
+"""
+Scheduling of remote embedding requests.
+
+`EmbeddingBatcher` turns a list of texts into as few API requests as the
+provider's limits allow and keeps several of them in flight:
+
+- identical texts are sent once and their vector is shared;
+- texts are packed into requests by token count (`EMBEDDING_BATCH_TOKENS`)
+  as well as by input count (the provider's `batch_size`);
+- up to `EMBEDDING_CONCURRENCY` requests run at once (threads for `embed`,
+  tasks for `aembed`);
+- requests failing with a rate limit, a 5xx or a connection error are
+  retried with jittered exponential backoff, honouring Retry-After.
+
+Used by `embeddings.embed_chunks` / `aembed_chunks` for remote providers.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .config import (
+    EMBEDDING_BATCH_TOKENS,
+    EMBEDDING_CONCURRENCY,
+    EMBEDDING_MAX_RETRIES,
+    EMBEDDING_BACKOFF_BASE,
+    EMBEDDING_BACKOFF_MAX,
+)
+
+
+def pack_batches(token_counts: Sequence[int], token_budget: int, max_inputs: int) -> List[List[int]]:
+    """
+    Group input indexes into requests of at most `token_budget` tokens and
+    `max_inputs` inputs, keeping input order.
+
+    An input larger than the budget on its own gets a request to itself.
+    """
+    batches = []
+    batch = []
+    tokens = 0
+    for i, count in enumerate(token_counts):
+        if batch and (tokens + count > token_budget or len(batch) >= max_inputs):
+            batches.append(batch)
+            batch = []
+            tokens = 0
+        batch.append(i)
+        tokens += count
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class EmbeddingBatcher:
+    """
+    Embeds texts through a provider with packing, concurrency and retries.
+
+        batcher = EmbeddingBatcher(provider, count_tokens)
+        vectors = batcher.embed(texts)          # or: await batcher.aembed(texts)
+
+    `stats` is incremented with the requests, inputs and tokens sent, the
+    retries and the duplicate inputs skipped; pass a shared dict to keep
+    process-wide totals.
+    """
+
+    def __init__(
+        self,
+        provider,
+        count_tokens: Callable[[str], int],
+        token_budget: int = EMBEDDING_BATCH_TOKENS,
+        max_inputs: Optional[int] = None,
+        concurrency: int = EMBEDDING_CONCURRENCY,
+        max_retries: int = EMBEDDING_MAX_RETRIES,
+        backoff_base: float = EMBEDDING_BACKOFF_BASE,
+        backoff_max: float = EMBEDDING_BACKOFF_MAX,
+        stats: Optional[Dict[str, int]] = None
+    ):
+        self.provider = provider
+        self.count_tokens = count_tokens
+        self.token_budget = token_budget
+        self.max_inputs = max_inputs or provider.batch_size
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stats = stats if stats is not None else {}
+        self._lock = threading.Lock()
+
+    def plan(
+        self,
+        texts: Sequence[str],
+        token_counts: Optional[Sequence[int]] = None
+    ) -> Tuple[List[str], List[int], List[int], List[List[int]]]:
+        """
+        Deduplicate and pack `texts`.
+
+        `token_counts`, one per text, saves tokenizing texts whose counts
+        the caller already has (such as chunks from `chunk_text_with_counts`).
+
+        Returns the distinct texts, the position of each input text among
+        them, each distinct text's token count, and the requests as lists
+        of positions in the distinct texts.
+        """
+        positions = {}
+        inverse = [positions.setdefault(text, len(positions)) for text in texts]
+        unique = list(positions)
+        if token_counts is None:
+            tokens = [self.count_tokens(t) for t in unique]
+        else:
+            tokens = [0] * len(unique)
+            for position, count in zip(inverse, token_counts):
+                tokens[position] = count
+        return unique, inverse, tokens, pack_batches(tokens, self.token_budget, self.max_inputs)
+
+    def embed(self, texts: Sequence[str], token_counts: Optional[Sequence[int]] = None) -> np.ndarray:
+        """
+        Embed texts, with their token counts if known (see `plan`).
+        Returns a float32 array of shape (len(texts), dimension).
+        """
+        unique, inverse, tokens, batches = self.plan(texts, token_counts)
+        vectors = np.empty((len(unique), self.provider.dimension), dtype=np.float32)
+        self._count(duplicates=len(texts) - len(unique))
+
+        def run(batch: List[int]) -> None:
+            vectors[batch] = self._request([unique[i] for i in batch], sum(tokens[i] for i in batch))
+
+        if len(batches) == 1 or self.concurrency == 1:
+            for batch in batches:
+                run(batch)
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(batches))) as executor:
+                # list() re-raises the first failed request
+                list(executor.map(run, batches))
+        return vectors[inverse]
+
+    async def aembed(self, texts: Sequence[str], token_counts: Optional[Sequence[int]] = None) -> np.ndarray:
+        """Async `embed`: requests run as tasks, at most `concurrency` at once."""
+        unique, inverse, tokens, batches = self.plan(texts, token_counts)
+        vectors = np.empty((len(unique), self.provider.dimension), dtype=np.float32)
+        self._count(duplicates=len(texts) - len(unique))
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(batch: List[int]) -> None:
+            async with semaphore:
+                vectors[batch] = await self._arequest(
+                    [unique[i] for i in batch], sum(tokens[i] for i in batch)
+                )
+
+        await asyncio.gather(*(run(batch) for batch in batches))
+        return vectors[inverse]
+
+    def _request(self, texts: List[str], tokens: int) -> np.ndarray:
+        for attempt in range(self.max_retries + 1):
+            try:
+                result = self.provider.embed(texts)
+            except Exception as e:
+                if attempt == self.max_retries or not self.provider.retryable(e):
+                    raise
+                self._count(retries=1)
+                time.sleep(self.backoff(attempt, self.provider.retry_after(e)))
+            else:
+                self._count(requests=1, inputs=len(texts), tokens=tokens)
+                return result
+
+    async def _arequest(self, texts: List[str], tokens: int) -> np.ndarray:
+        for attempt in range(self.max_retries + 1):
+            try:
+                result = await self.provider.aembed(texts)
+            except Exception as e:
+                if attempt == self.max_retries or not self.provider.retryable(e):
+                    raise
+                self._count(retries=1)
+                await asyncio.sleep(self.backoff(attempt, self.provider.retry_after(e)))
+            else:
+                self._count(requests=1, inputs=len(texts), tokens=tokens)
+                return result
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Seconds to wait before retry `attempt` + 1.
+
+        Full jitter: uniform between 0 and base * 2^attempt (capped), so
+        concurrent requests that failed together don't retry together.
+        A server-provided Retry-After is used as the lower bound.
+        """
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
+
+    def _count(self, **counts: int) -> None:
+        with self._lock:
+            for key, value in counts.items():
+                self.stats[key] = self.stats.get(key, 0) + value
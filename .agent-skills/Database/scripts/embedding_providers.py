@@ -0,0 +1,273 @@
+"""
+Pluggable embedding providers.
+
+`config.EMBEDDING_MODEL` selects the provider: names registered in
+`LOCAL_PROVIDERS` run in-process, anything else is treated as an OpenAI
+embedding model name.
+
+    EMBEDDING_MODEL=text-embedding-3-small   # OpenAI API (default)
+    EMBEDDING_MODEL=local-hashing            # Offline hashed n-gram vectors
+"""
+
+import asyncio
+import re
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional, Sequence
+
+import numpy as np
+
+from .config import (
+    OPENAI_API_KEY,
+    OPENAI_BASE_URL,
+    EMBEDDING_MODEL,
+    EMBEDDING_DIMENSION,
+    MAX_TOKENS_PER_CHUNK,
+)
+
+
+class EmbeddingProvider:
+    """
+    Turns texts into float32 vectors of a fixed dimension.
+
+    Subclasses set:
+        model: Name used to key cached embeddings
+        remote: Whether `embed` calls a network service. Remote results
+            are cached on disk and counted in the request stats.
+        max_tokens: Input limit per text; longer texts are chunked and
+            pooled. None means any length is accepted as-is.
+        batch_size: Maximum number of texts per `embed` call
+
+    Remote providers also decide which failed calls are worth retrying
+    (`retryable`, `retry_after`); see embedding_batcher.py.
+    """
+
+    model: str = ""
+    remote: bool = False
+    max_tokens: Optional[int] = None
+    batch_size: int = 100
+
+    def __init__(self, dimension: int = EMBEDDING_DIMENSION):
+        self.dimension = dimension
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed texts. Returns a float32 array of shape (len(texts), dimension)."""
+        raise NotImplementedError
+
+    async def aembed(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Async `embed`.
+
+        Runs `embed` in a worker thread; providers with a native async
+        client override this.
+        """
+        return await asyncio.to_thread(self.embed, texts)
+
+    def retryable(self, error: Exception) -> bool:
+        """
+        Whether a failed `embed` call may succeed if repeated.
+
+        True for rate limits (429), server errors (5xx) and dropped
+        connections or timeouts. Errors carrying an HTTP status are
+        recognised by a `status_code` attribute.
+        """
+        status = getattr(error, "status_code", None)
+        if status is not None:
+            return status == 429 or status >= 500
+        return isinstance(error, (ConnectionError, TimeoutError))
+
+    def retry_after(self, error: Exception) -> Optional[float]:
+        """Seconds the server asked to wait (Retry-After header), if any."""
+        headers = getattr(getattr(error, "response", None), "headers", None)
+        if not headers:
+            return None
+        if headers.get("retry-after-ms"):
+            try:
+                return float(headers["retry-after-ms"]) / 1000
+            except ValueError:
+                pass
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            return None
+
+
+def get_embedding_client(api_key: Optional[str] = None, base_url: Optional[str] = OPENAI_BASE_URL):
+    """
+    Get configured OpenAI client for embeddings.
+
+    The client's own retries are disabled; EmbeddingBatcher retries
+    failed requests with backoff.
+    """
+    from openai import OpenAI
+
+    api_key = api_key or OPENAI_API_KEY
+    if not api_key:
+        raise ValueError(
+            "OPENAI_API_KEY not set. "
+            "Set it in environment or .env file."
+        )
+    return OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+
+
+def get_async_embedding_client(api_key: Optional[str] = None, base_url: Optional[str] = OPENAI_BASE_URL):
+    """Get configured async OpenAI client for embeddings."""
+    from openai import AsyncOpenAI
+
+    api_key = api_key or OPENAI_API_KEY
+    if not api_key:
+        raise ValueError(
+            "OPENAI_API_KEY not set. "
+            "Set it in environment or .env file."
+        )
+    return AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+
+
+class OpenAIProvider(EmbeddingProvider):
+    """
+    Embeddings from the OpenAI API, or any OpenAI-compatible endpoint
+    given as `base_url` (OPENAI_BASE_URL).
+    """
+
+    remote = True
+    max_tokens = MAX_TOKENS_PER_CHUNK
+    batch_size = 2048  # API limit per request; EMBEDDING_BATCH_TOKENS usually binds first
+
+    def __init__(
+        self,
+        model: str = EMBEDDING_MODEL,
+        dimension: int = EMBEDDING_DIMENSION,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = OPENAI_BASE_URL
+    ):
+        super().__init__(dimension)
+        self.model = model
+        self.api_key = api_key
+        self.base_url = base_url
+        self._client = None
+        self._async_client = None
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        if self._client is None:
+            self._client = get_embedding_client(self.api_key, self.base_url)
+        response = self._client.embeddings.create(model=self.model, input=list(texts))
+        return np.array([d.embedding for d in response.data], dtype=np.float32)
+
+    async def aembed(self, texts: Sequence[str]) -> np.ndarray:
+        if self._async_client is None:
+            self._async_client = get_async_embedding_client(self.api_key, self.base_url)
+        response = await self._async_client.embeddings.create(model=self.model, input=list(texts))
+        return np.array([d.embedding for d in response.data], dtype=np.float32)
+
+    def retryable(self, error: Exception) -> bool:
+        from openai import APIConnectionError  # Includes APITimeoutError
+
+        return isinstance(error, APIConnectionError) or super().retryable(error)
+
+
+# 64-bit mixing constants (MurmurHash3 finalizer) and the n-gram polynomial base
+_FMIX_1 = np.uint64(0xFF51AFD7ED558CCD)
+_FMIX_2 = np.uint64(0xC4CEB9FE1A85EC53)
+_BASE = np.uint64(0x100000001B3)
+_WHITESPACE = re.compile(r"\s+")
+
+
+class HashingProvider(EmbeddingProvider):
+    """
+    Offline embeddings from hashed character n-grams.
+
+    Each text is lowercased and whitespace-collapsed, then every character
+    n-gram (3 to 5 bytes by default) is hashed into one of `dimension`
+    buckets with a random sign (the "hashing trick"). Bucket counts are
+    log-scaled so frequent n-grams don't dominate, and the vector is
+    L2-normalized, so cosine similarity reflects shared vocabulary and
+    word fragments.
+
+    There is no model to load and no corpus state: the same text always
+    maps to the same vector. Hashing is vectorized with NumPy, so
+    throughput is thousands of documents per second.
+    """
+
+    model = "local-hashing"
+
+    def __init__(self, dimension: int = EMBEDDING_DIMENSION, ngram_range=(3, 5)):
+        super().__init__(dimension)
+        self.ngram_range = ngram_range
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for i, text in enumerate(texts):
+            vectors[i] = self._embed_one(text)
+        return vectors
+
+    def _embed_one(self, text: str) -> np.ndarray:
+        normalized = " " + _WHITESPACE.sub(" ", text.lower()).strip() + " "
+        data = np.frombuffer(normalized.encode("utf-8"), dtype=np.uint8).astype(np.uint64)
+
+        # Extend the (n-1)-gram hashes by one byte to get the n-gram hashes
+        low, high = self.ngram_range
+        rolling = np.zeros(len(data), dtype=np.uint64)
+        grams = []
+        for n in range(1, high + 1):
+            windows = len(data) - n + 1
+            if windows <= 0:
+                break
+            rolling = rolling[:windows] * _BASE + data[n - 1:n - 1 + windows]
+            if n >= low:
+                grams.append(rolling ^ np.uint64(n))
+        if not grams:
+            return np.zeros(self.dimension, dtype=np.float32)
+
+        hashes = _fmix64(np.concatenate(grams))
+        buckets = (hashes % np.uint64(self.dimension)).astype(np.intp)
+        signs = 1.0 - 2.0 * (hashes >> np.uint64(63)).astype(np.float64)
+        counts = np.bincount(buckets, weights=signs, minlength=self.dimension)
+
+        vector = np.sign(counts) * np.log1p(np.abs(counts))
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector.astype(np.float32)
+
+
+def _fmix64(h: np.ndarray) -> np.ndarray:
+    """Scramble 64-bit hashes so bucket and sign bits are well distributed."""
+    h = h ^ (h >> np.uint64(33))
+    h = h * _FMIX_1
+    h = h ^ (h >> np.uint64(33))
+    h = h * _FMIX_2
+    return h ^ (h >> np.uint64(33))
+
+
+# Model name -> factory for providers that run in-process
+LOCAL_PROVIDERS: Dict[str, Callable[[int], EmbeddingProvider]] = {
+    "local-hashing": HashingProvider,
+}
+
+
+def register_provider(name: str, factory: Callable[[int], EmbeddingProvider]) -> None:
+    """Make `EMBEDDING_MODEL=<name>` select a custom provider."""
+    LOCAL_PROVIDERS[name] = factory
+    _providers.pop(name, None)
+
+
+_providers: Dict[str, EmbeddingProvider] = {}
+
+
+def get_embedding_provider(model: str = EMBEDDING_MODEL) -> EmbeddingProvider:
+    """Get the provider for a model name, creating it on first use."""
+    provider = _providers.get(model)
+    if provider is None:
+        if model in LOCAL_PROVIDERS:
+            provider = LOCAL_PROVIDERS[model](EMBEDDING_DIMENSION)
+        else:
+            provider = OpenAIProvider(model, EMBEDDING_DIMENSION)
+        _providers[model] = provider
+    return provider
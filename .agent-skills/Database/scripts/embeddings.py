@@ -1,161 +1,421 @@
 """Embedding generation utilities."""
 
+import asyncio
 import hashlib
-from typing import List, Optional
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import accumulate
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+import numpy as np
 import tiktoken
 
-from openai import OpenAI
+from .config import (
+    EMBEDDING_POOL_WEIGHTED,
+    EMBEDDING_NORMALIZE,
+    MAX_TOKENS_PER_CHUNK,
+    CHUNK_OVERLAP,
+    DOCUMENT_CHUNK_CHARS,
+    DOCUMENT_CHUNK_OVERLAP_CHARS,
+)
+from .embedding_batcher import EmbeddingBatcher
+from .embedding_cache import get_embedding_cache
+from .embedding_providers import get_embedding_client, get_embedding_provider
 
-from .config import OPENAI_API_KEY, EMBEDDING_MODEL, MAX_TOKENS_PER_CHUNK
 
+# Running totals of embedding API usage for this process
+_request_stats = {"requests": 0, "inputs": 0, "tokens": 0, "retries": 0, "duplicates": 0}
+
+
+def get_request_stats() -> Dict[str, int]:
+    """
+    Get embedding API usage so far: requests, inputs and tokens sent,
+    retried requests and duplicate inputs that were not sent.
+    """
+    return dict(_request_stats)
+
+
+@lru_cache(maxsize=None)
+def get_encoding(name: str = "cl100k_base") -> tiktoken.Encoding:
+    """Get a tiktoken encoding, loading it only once per process."""
+    return tiktoken.get_encoding(name)
 
-def get_embedding_client() -> OpenAI:
-    """Get configured OpenAI client for embeddings."""
-    if not OPENAI_API_KEY:
-        raise ValueError(
-            "OPENAI_API_KEY not set. "
-            "Set it in environment or .env file."
-        )
-    return OpenAI(api_key=OPENAI_API_KEY)
+
+@lru_cache(maxsize=None)
+def _paragraph_break_tokens(name: str) -> FrozenSet[int]:
+    """IDs of every token in the vocabulary that contains a blank line."""
+    encoding = get_encoding(name)
+    return frozenset(
+        encoding.encode_single_token(token_bytes)
+        for token_bytes in encoding.token_byte_values()
+        if b"\n\n" in token_bytes
+    )
 
 
 def count_tokens(text: str, model: str = "cl100k_base") -> int:
     """Count tokens in text using tiktoken."""
-    encoding = tiktoken.get_encoding(model)
-    return len(encoding.encode(text))
+    return len(get_encoding(model).encode_ordinary(text))
 
 
 def chunk_text(
     text: str,
     max_tokens: int = MAX_TOKENS_PER_CHUNK,
-    overlap: int = 200
+    overlap: int = CHUNK_OVERLAP
 ) -> List[str]:
     """
     Split text into chunks that fit within token limits.
     
     For documents longer than max_tokens, we split and embed chunks,
-    then average the embeddings. This is a simple but effective approach.
+    then average the embeddings. The text is encoded once and sliced on
+    token offsets: each chunk ends at the last paragraph break in the back
+    half of its window if there is one, otherwise at the window edge, and
+    consecutive chunks share `overlap` tokens.
+    """
+    return [chunk for chunk, _ in chunk_text_with_counts(text, max_tokens, overlap)]
+
+
+def chunk_text_with_counts(
+    text: str,
+    max_tokens: int = MAX_TOKENS_PER_CHUNK,
+    overlap: int = CHUNK_OVERLAP
+) -> List[Tuple[str, int]]:
     """
-    token_count = count_tokens(text)
+    Like `chunk_text`, but pairs each chunk with its token count.
     
-    if token_count <= max_tokens:
-        return [text]
+    A multi-byte character can be split across tokens, so chunk edges
+    are moved to the nearest token boundary that falls between
+    characters, and each chunk is sliced from the UTF-8 text rather than
+    decoded (which would turn the split halves into U+FFFD).
+    """
+    encoding = get_encoding()
+    tokens = encoding.encode_ordinary(text)
+    
+    if len(tokens) <= max_tokens:
+        return [(text, len(tokens))]
+    
+    # Overlap must leave room for each chunk to make progress
+    overlap = max(0, min(overlap, max_tokens // 2))
+    break_tokens = _paragraph_break_tokens(encoding.name)
+    breaks = [i + 1 for i, token in enumerate(tokens) if token in break_tokens]
+    
+    data = text.encode("utf-8")
+    offsets = list(accumulate((len(b) for b in encoding.decode_tokens_bytes(tokens)), initial=0))
+    
+    def snap(i: int, floor: int) -> int:
+        """Move token boundary `i` back to one between characters, staying above `floor`."""
+        def between_characters(i: int) -> bool:
+            # Not in front of a UTF-8 continuation byte (0b10xxxxxx)
+            return offsets[i] == len(data) or data[offsets[i]] & 0xC0 != 0x80
+        while i > floor + 1 and not between_characters(i):
+            i -= 1
+        while not between_characters(i):
+            i += 1
+        return i
     
-    # Split by paragraphs first
-    paragraphs = text.split("\n\n")
     chunks = []
-    current_chunk = []
-    current_tokens = 0
+    start = 0
     
-    for para in paragraphs:
-        para_tokens = count_tokens(para)
+    while True:
+        end = min(start + max_tokens, len(tokens))
         
-        if current_tokens + para_tokens > max_tokens:
-            if current_chunk:
-                chunks.append("\n\n".join(current_chunk))
-            current_chunk = [para]
-            current_tokens = para_tokens
-        else:
-            current_chunk.append(para)
-            current_tokens += para_tokens
-    
-    if current_chunk:
-        chunks.append("\n\n".join(current_chunk))
+        if end < len(tokens):
+            last_break = bisect_right(breaks, end) - 1
+            if last_break >= 0 and breaks[last_break] > start + max_tokens // 2:
+                end = breaks[last_break]
+            end = snap(end, start)
+        
+        chunks.append((data[offsets[start]:offsets[end]].decode("utf-8"), end - start))
+        
+        if end >= len(tokens):
+            break
+        start = snap(end - overlap, start)
     
     return chunks
 
 
-def generate_embedding(text: str) -> List[float]:
+def chunk_spans(
+    text: str,
+    max_chars: int = DOCUMENT_CHUNK_CHARS,
+    overlap: int = DOCUMENT_CHUNK_OVERLAP_CHARS
+) -> List[Tuple[int, int]]:
     """
-    Generate embedding for text.
+    Split text into (start, end) character spans for retrieval chunks.
     
-    For long texts, chunks and averages embeddings.
+    Unlike `chunk_text`, which only splits what won't fit in one embedding
+    request, this cuts every document into small passages so search can
+    point at the part that matches. Each span ends at the last paragraph
+    break in the back half of its window, else the last whitespace, else
+    the window edge; consecutive spans share about `overlap` characters,
+    starting on a word boundary. No tokenizer is needed, so spans can be
+    computed offline and cheaply.
     """
-    client = get_embedding_client()
-    chunks = chunk_text(text)
+    if len(text) <= max_chars:
+        return [(0, len(text))] if text.strip() else []
     
-    if len(chunks) == 1:
-        response = client.embeddings.create(
-            model=EMBEDDING_MODEL,
-            input=text
-        )
-        return response.data[0].embedding
-    
-    # Multiple chunks: embed each and average
-    embeddings = []
-    for chunk in chunks:
-        response = client.embeddings.create(
-            model=EMBEDDING_MODEL,
-            input=chunk
-        )
-        embeddings.append(response.data[0].embedding)
+    overlap = max(0, min(overlap, max_chars // 2))
+    spans = []
+    start = 0
     
-    # Average the embeddings
-    avg_embedding = [
-        sum(e[i] for e in embeddings) / len(embeddings)
-        for i in range(len(embeddings[0]))
-    ]
+    while True:
+        end = min(start + max_chars, len(text))
+        
+        if end < len(text):
+            half = start + max_chars // 2
+            cut = text.rfind("\n\n", half, end)
+            if cut < 0:
+                cut = max(text.rfind(" ", half, end), text.rfind("\n", half, end))
+            if cut > start:
+                end = cut
+        
+        if text[start:end].strip():
+            spans.append((start, end))
+        
+        if end >= len(text):
+            break
+        
+        next_start = max(end - overlap, start + 1)
+        space = text.find(" ", next_start, end)
+        start = space + 1 if 0 <= space < end - 1 else next_start
     
-    return avg_embedding
+    return spans
 
 
-def generate_embeddings_batch(texts: List[str]) -> List[List[float]]:
-    """Generate embeddings for multiple texts in a batch."""
-    client = get_embedding_client()
+def embed_chunks(
+    chunks: List[str],
+    batch_size: Optional[int] = None,
+    token_counts: Optional[List[int]] = None
+) -> np.ndarray:
+    """
+    Embed already-chunked texts, one vector per chunk.
     
-    # Process texts that might need chunking
-    all_chunks = []
-    chunk_indices = []  # Maps chunks back to original texts
+    For remote providers, chunks found in the embedding cache are served
+    from disk; only the misses are sent to the API, and their vectors are
+    cached afterwards. Local providers are cheaper to run than to cache.
     
-    for idx, text in enumerate(texts):
-        chunks = chunk_text(text)
-        for chunk in chunks:
-            all_chunks.append(chunk)
-            chunk_indices.append(idx)
+    API requests go through EmbeddingBatcher: duplicates are sent once,
+    requests are packed by token budget and `batch_size` (inputs per
+    request), several run concurrently, and rate-limited or failed
+    requests are retried with backoff. Pass each chunk's `token_counts`
+    if known, so the chunks aren't tokenized again to pack requests.
+    
+    Returns a float32 array of shape (len(chunks), dimension).
+    """
+    provider = get_embedding_provider()
+    batch_size = batch_size or provider.batch_size
     
-    # Batch embed all chunks (OpenAI supports up to 2048 inputs)
-    embeddings = []
-    batch_size = 100
+    if not provider.remote:
+        embeddings = np.empty((len(chunks), provider.dimension), dtype=np.float32)
+        for start in range(0, len(chunks), batch_size):
+            embeddings[start:start + batch_size] = provider.embed(chunks[start:start + batch_size])
+        return embeddings
     
-    for i in range(0, len(all_chunks), batch_size):
-        batch = all_chunks[i:i + batch_size]
-        response = client.embeddings.create(
-            model=EMBEDDING_MODEL,
-            input=batch
+    embeddings, missing, hashes = _load_cached(provider, chunks)
+    
+    if missing:
+        embeddings[missing] = _batcher(provider, batch_size).embed(
+            [chunks[i] for i in missing],
+            None if token_counts is None else [token_counts[i] for i in missing]
         )
-        embeddings.extend([d.embedding for d in response.data])
-    
-    # Reconstruct: average embeddings for texts with multiple chunks
-    result = []
-    current_idx = -1
-    current_embeddings = []
-    
-    for emb, idx in zip(embeddings, chunk_indices):
-        if idx != current_idx:
-            if current_embeddings:
-                # Average and append
-                avg = [
-                    sum(e[i] for e in current_embeddings) / len(current_embeddings)
-                    for i in range(len(current_embeddings[0]))
-                ]
-                result.append(avg)
-            current_idx = idx
-            current_embeddings = [emb]
-        else:
-            current_embeddings.append(emb)
     
-    # Don't forget the last one
-    if current_embeddings:
-        if len(current_embeddings) == 1:
-            result.append(current_embeddings[0])
+    _store_cached(provider, embeddings, missing, hashes)
+    return embeddings
+
+
+async def aembed_chunks(
+    chunks: List[str],
+    batch_size: Optional[int] = None,
+    token_counts: Optional[List[int]] = None
+) -> np.ndarray:
+    """
+    Async `embed_chunks`: cache misses are sent as concurrent API requests
+    (at most EMBEDDING_CONCURRENCY at once).
+    
+    Local providers run in a worker thread so the event loop stays free.
+    """
+    provider = get_embedding_provider()
+    batch_size = batch_size or provider.batch_size
+    
+    if not provider.remote:
+        return await asyncio.to_thread(embed_chunks, chunks, batch_size)
+    
+    embeddings, missing, hashes = _load_cached(provider, chunks)
+    
+    if missing:
+        embeddings[missing] = await _batcher(provider, batch_size).aembed(
+            [chunks[i] for i in missing],
+            None if token_counts is None else [token_counts[i] for i in missing]
+        )
+    
+    _store_cached(provider, embeddings, missing, hashes)
+    return embeddings
+
+
+def _batcher(provider, batch_size: int) -> EmbeddingBatcher:
+    """Request scheduler for a remote provider, counting into the process totals."""
+    return EmbeddingBatcher(provider, count_tokens, max_inputs=batch_size, stats=_request_stats)
+
+
+def _load_cached(provider, chunks: List[str]) -> Tuple[np.ndarray, List[int], List[str]]:
+    """
+    Fill an embedding matrix from the disk cache.
+    
+    Returns the matrix, the indexes of chunks still to embed, and every
+    chunk's content hash.
+    """
+    cache = get_embedding_cache()
+    hashes = [content_hash(chunk) for chunk in chunks]
+    
+    if cache:
+        cached = cache.get_many(provider.model, provider.dimension, hashes)
+    else:
+        cached = [None] * len(chunks)
+    
+    embeddings = np.empty((len(chunks), provider.dimension), dtype=np.float32)
+    missing = []
+    for i, emb in enumerate(cached):
+        if emb is None:
+            missing.append(i)
         else:
-            avg = [
-                sum(e[i] for e in current_embeddings) / len(current_embeddings)
-                for i in range(len(current_embeddings[0]))
-            ]
-            result.append(avg)
+            embeddings[i] = emb
+    return embeddings, missing, hashes
+
+
+def _store_cached(provider, embeddings: np.ndarray, missing: List[int], hashes: List[str]) -> None:
+    """Write freshly embedded chunks to the disk cache."""
+    cache = get_embedding_cache()
+    if cache and missing:
+        cache.put_many(
+            provider.model,
+            provider.dimension,
+            [(hashes[i], embeddings[i]) for i in missing]
+        )
+
+
+def pool_embeddings(
+    embeddings: np.ndarray,
+    offsets: Sequence[int],
+    weights: Optional[Sequence[float]] = None,
+    normalize: bool = EMBEDDING_NORMALIZE
+) -> np.ndarray:
+    """
+    Average consecutive runs of chunk embeddings into one vector per text.
+    
+    Args:
+        embeddings: (n_chunks, dimension) chunk embeddings
+        offsets: Index of the first chunk of each text, in increasing order
+        weights: Optional per-chunk weights (e.g. token counts)
+        normalize: L2-normalize each pooled vector
+    
+    Returns:
+        float32 array of shape (len(offsets), dimension)
+    """
+    if len(offsets) == 0:
+        return np.empty((0, embeddings.shape[1]), dtype=np.float32)
+    
+    offsets = np.asarray(offsets, dtype=np.intp)
+    if weights is None:
+        weights = np.ones(len(embeddings), dtype=np.float32)
+    else:
+        weights = np.asarray(weights, dtype=np.float32)
+    
+    sums = np.add.reduceat(embeddings * weights[:, None], offsets, axis=0)
+    pooled = sums / np.add.reduceat(weights, offsets)[:, None]
+    
+    if normalize:
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        pooled = pooled / np.where(norms > 0, norms, 1.0)
+    
+    return pooled.astype(np.float32, copy=False)
+
+
+def generate_embedding(
+    text: str,
+    weighted: bool = EMBEDDING_POOL_WEIGHTED
+) -> np.ndarray:
+    """
+    Generate embedding for text.
+    
+    For long texts, chunks and averages embeddings, optionally weighting
+    each chunk by its token count.
+    
+    Returns a float32 vector.
+    """
+    return generate_embeddings_batch([text], weighted=weighted)[0]
+
+
+def generate_embeddings_batch(
+    texts: List[str],
+    weighted: bool = EMBEDDING_POOL_WEIGHTED
+) -> np.ndarray:
+    """
+    Generate embeddings for multiple texts in a batch.
+    
+    Texts longer than the provider's token limit are chunked; providers
+    without a limit embed each text whole.
+    
+    Returns a float32 array of shape (len(texts), dimension).
+    """
+    provider = get_embedding_provider()
+    if provider.max_tokens is None:
+        return embed_chunks(list(texts))
+    
+    all_chunks, token_counts, offsets = _split_for_embedding(texts, provider.max_tokens)
+    embeddings = embed_chunks(all_chunks, token_counts=token_counts)
+    
+    # Pool chunk embeddings back into one vector per text
+    return pool_embeddings(
+        embeddings,
+        offsets,
+        weights=token_counts if weighted else None
+    )
+
+
+async def agenerate_embedding(
+    text: str,
+    weighted: bool = EMBEDDING_POOL_WEIGHTED
+) -> np.ndarray:
+    """Async `generate_embedding`."""
+    return (await agenerate_embeddings_batch([text], weighted=weighted))[0]
+
+
+async def agenerate_embeddings_batch(
+    texts: List[str],
+    weighted: bool = EMBEDDING_POOL_WEIGHTED
+) -> np.ndarray:
+    """Async `generate_embeddings_batch`."""
+    provider = get_embedding_provider()
+    if provider.max_tokens is None:
+        return await aembed_chunks(list(texts))
+    
+    all_chunks, token_counts, offsets = _split_for_embedding(texts, provider.max_tokens)
+    embeddings = await aembed_chunks(all_chunks, token_counts=token_counts)
+    return pool_embeddings(
+        embeddings,
+        offsets,
+        weights=token_counts if weighted else None
+    )
+
+
+def _split_for_embedding(
+    texts: Sequence[str],
+    max_tokens: int
+) -> Tuple[List[str], List[int], List[int]]:
+    """
+    Chunk texts that exceed the token limit.
+    
+    Returns every chunk, each chunk's token count, and the index of each
+    text's first chunk.
+    """
+    all_chunks = []
+    token_counts = []
+    offsets = []
+    
+    for text in texts:
+        offsets.append(len(all_chunks))
+        for chunk, tokens in chunk_text_with_counts(text, max_tokens):
+            all_chunks.append(chunk)
+            token_counts.append(tokens)
     
-    return result
+    return all_chunks, token_counts, offsets
 
 
 def content_hash(content: str) -> str:
@@ -7,150 +7,470 @@ Usage:
     python scripts/index.py --docs       # Index all documents
     python scripts/index.py --all        # Index everything
     python scripts/index.py --all --force  # Re-index even if unchanged
+    python scripts/index.py --all --bulk   # Batched embeddings, one transaction
+    python scripts/index.py --all --no-manifest  # Stat and read every file
+    python scripts/index.py --all --commit-every 50  # Commit every 50 items
+
+Files whose mtime and size match the local index manifest are skipped
+without being read. Deleted files are removed from the registry and
+moved files are renamed in place (see index_manifest.py).
 """
 
 import argparse
+import os
+import re
 import sys
+import time
 from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from .config import SKILLS_DIR, DOCS_DIR, PROJECT_ROOT, INDEX_MANIFEST_ENABLED, INDEX_COMMIT_INTERVAL
+from .embeddings import get_request_stats, content_hash
+from .registry import SkillRegistry, open_registry, parse_skill_frontmatter, extract_title_from_markdown
+from .embedding_cache import get_embedding_cache
+from .index_manifest import IndexManifest
+
+
+def read_skill(skill_dir: Path) -> Optional[Dict]:
+    """
+    Read a skill directory into upsert fields.
+    
+    Returns None if the directory has no SKILL.md. Reference files are
+    returned under "references" as document upsert fields.
+    """
+    skill_file = skill_dir / "SKILL.md"
+    
+    if not skill_file.exists():
+        return None
+    
+    content = skill_file.read_text()
+    frontmatter = parse_skill_frontmatter(content)
+    
+    name = frontmatter.get("name", skill_dir.name)
+    description = frontmatter.get("description", "")
+    version = "1.0.0"  # Could parse from metadata if available
+    author = frontmatter.get("author", "Agent Skills Contributors")
+    
+    # Extract version from content if present
+    if "**Version**:" in content:
+        match = re.search(r'\*\*Version\*\*:\s*(\d+\.\d+\.\d+)', content)
+        if match:
+            version = match.group(1)
+    
+    references = []
+    refs_dir = skill_dir / "references"
+    if refs_dir.exists():
+        for ref_file in refs_dir.glob("*.md"):
+            ref_content = ref_file.read_text()
+            ref_title = extract_title_from_markdown(ref_content)
+            references.append({
+                "title": f"{name}: {ref_title}",
+                "content": ref_content,
+                "path": str(ref_file.relative_to(SKILLS_DIR.parent)),
+                "doc_type": "reference"
+            })
+    
+    return {
+        "name": name,
+        "description": description,
+        "content": content,
+        "path": str(skill_file.relative_to(SKILLS_DIR.parent)),
+        "version": version,
+        "author": author,
+        "references": references
+    }
+
+
+def read_document(doc_file: Path) -> Dict:
+    """Read a file from the docs directory into upsert fields."""
+    content = doc_file.read_text()
+    
+    # Parse frontmatter if present
+    frontmatter = parse_skill_frontmatter(content)
+    
+    # Use frontmatter name if available, otherwise use filename
+    if frontmatter.get("name"):
+        title = frontmatter.get("name")
+    else:
+        filename_title = doc_file.stem.replace('_', ' ').replace('-', ' ').title()
+        title = extract_title_from_markdown(content, fallback=filename_title)
+    
+    # Use frontmatter description if available
+    description = frontmatter.get("description", "")
+    
+    # Get source_url from frontmatter
+    source_url = frontmatter.get("source_url", "No")
+    
+    # Get doc_type from frontmatter, fallback to inference if not present
+    doc_type = frontmatter.get("doc_type")
+    if not doc_type:
+        # Fallback: infer from path or filename
+        doc_type = "research"
+        if "blog" in doc_file.name.lower() or "blog" in title.lower():
+            doc_type = "blog"
+        elif "case" in doc_file.name.lower():
+            doc_type = "case_study"
+        elif "reference" in doc_file.name.lower() or "reference" in str(doc_file.parent).lower():
+            doc_type = "reference"
+    
+    return {
+        "title": title,
+        "content": content,
+        "path": str(doc_file.relative_to(DOCS_DIR.parent)),
+        "doc_type": doc_type,
+        "description": description,
+        "source_url": source_url
+    }
+
+
+class IndexPlan(NamedTuple):
+    """What an indexing run has to write, after comparing disk with the manifest."""
+    skills: List[Dict]                  # read_skill() results to upsert
+    documents: List[Dict]               # read_document() results to upsert
+    renames: Dict[str, str]             # Old document path -> new path
+    deleted_skills: List[str]           # Skill names whose SKILL.md is gone
+    deleted_documents: List[str]        # Paths of documents whose file is gone
+    stats: Dict[str, os.stat_result]    # Path -> stat of every file that was read
+    skipped: int                        # Files skipped without being read
+
+
+def _skill_files(skill_dir: Path) -> List[Path]:
+    """SKILL.md and reference files of a skill directory, as read_skill reads them."""
+    skill_file = skill_dir / "SKILL.md"
+    if not skill_file.exists():
+        return []
+    return [skill_file] + sorted((skill_dir / "references").glob("*.md"))
+
+
+def plan_index(
+    manifest: Optional[IndexManifest] = None,
+    skills: bool = True,
+    docs: bool = True,
+    force: bool = False
+) -> IndexPlan:
+    """
+    Work out which skills and documents need writing.
+    
+    The manifest is updated for files that need no write (touched,
+    moved or deleted); written files are added by `record_plan`, and
+    nothing is persisted until the caller saves it.
+    
+    Without a manifest every file is read and returned for upsert, and
+    the registry's content hashes decide what actually changes. With one,
+    files whose mtime and size are unchanged are skipped unread; files
+    that were touched but still hash the same only get their manifest
+    entry refreshed. Manifest entries whose file is gone become deletions,
+    or a rename when a new document file has the same content hash (one
+    vanished file per new file; identical leftovers are deleted).
+    `force` reads every file but still detects deletions and renames.
+    """
+    plan = IndexPlan([], [], {}, [], [], {}, 0)
+    
+    if skills and SKILLS_DIR.exists():
+        skill_dirs = {d.name: d for d in SKILLS_DIR.iterdir() if d.is_dir()}
+        files = [f for d in skill_dirs.values() for f in _skill_files(d)]
+        prefix = f"{SKILLS_DIR.relative_to(PROJECT_ROOT)}/"
+        
+        if manifest is None:
+            dirty = set(skill_dirs)
+        else:
+            scan = manifest.scan(files, prefix, force=force)
+            plan.stats.update(scan.changed)
+            dirty = {Path(key).parts[1] for key, _ in scan.changed}
+            # A deleted reference changes its skill too
+            dirty |= {Path(key).parts[1] for key in scan.missing} & set(skill_dirs)
+            for key, entry in scan.missing.items():
+                if entry["kind"] == "skill":
+                    plan.deleted_skills.append(entry["name"])
+                else:
+                    plan.deleted_documents.append(key)
+            manifest.forget(scan.missing)
+        
+        for dir_name in sorted(dirty):
+            skill_dir = skill_dirs[dir_name]
+            skill = read_skill(skill_dir)
+            if skill is None:
+                continue
+            
+            if manifest is not None and not force:
+                changed = [
+                    item for item in [skill] + skill["references"]
+                    if item["path"] in plan.stats
+                ]
+                if all(
+                    manifest.is_same_content(item["path"], content_hash(item["content"]))
+                    for item in changed
+                ):
+                    # Touched but not edited, or only a reference was deleted
+                    for item in changed:
+                        manifest.touch(item["path"], plan.stats.pop(item["path"]))
+                    continue
+            
+            if manifest is not None:
+                previous = manifest.entries.get(skill["path"])
+                if previous and previous.get("name") != skill["name"]:
+                    plan.deleted_skills.append(previous["name"])
+            
+            plan.skills.append(skill)
+        
+        # A skill moved to another directory keeps its row
+        upserted = {skill["name"] for skill in plan.skills}
+        plan.deleted_skills[:] = [name for name in plan.deleted_skills if name not in upserted]
+        
+        if manifest is not None:
+            plan = plan._replace(skipped=plan.skipped + len(files) - len(plan.stats))
+    
+    if docs and DOCS_DIR.exists():
+        files = list(DOCS_DIR.rglob("*.md"))
+        
+        if manifest is None:
+            plan.documents.extend(read_document(f) for f in files)
+            return plan
+        
+        prefix = f"{DOCS_DIR.relative_to(PROJECT_ROOT)}/"
+        scan = manifest.scan(files, prefix, force=force)
+        
+        added = []
+        for key, stat in scan.changed:
+            doc = read_document(PROJECT_ROOT / key)
+            doc_hash = content_hash(doc["content"])
+            if not force and manifest.is_same_content(key, doc_hash):
+                manifest.touch(key, stat)
+                plan = plan._replace(skipped=plan.skipped + 1)
+                continue
+            if key not in manifest.entries:
+                added.append((doc, doc_hash, stat))
+            else:
+                plan.documents.append(doc)
+                plan.stats[key] = stat
+        
+        # A new file with the content of a vanished one is a move
+        vanished: Dict[str, List[str]] = {}
+        for key, entry in scan.missing.items():
+            vanished.setdefault(entry["hash"], []).append(key)
+        for doc, doc_hash, stat in added:
+            old_keys = vanished.get(doc_hash)
+            if old_keys:
+                old_key = old_keys.pop(0)
+                plan.renames[old_key] = doc["path"]
+                manifest.move(old_key, doc["path"], stat)
+            else:
+                plan.documents.append(doc)
+                plan.stats[doc["path"]] = stat
+        
+        gone = [key for keys in vanished.values() for key in keys]
+        plan.deleted_documents.extend(gone)
+        manifest.forget(gone)
+        plan = plan._replace(skipped=plan.skipped + len(scan.unchanged))
+    
+    return plan
 
-from .config import SKILLS_DIR, DOCS_DIR
-from .registry import SkillRegistry, parse_skill_frontmatter, extract_title_from_markdown
 
+def apply_removals(registry: SkillRegistry, plan: IndexPlan) -> None:
+    """Apply a plan's renames and deletions as batched statements."""
+    if plan.renames:
+        moved = registry.rename_documents(plan.renames)
+        print(f"  Renamed {moved} documents")
+    if plan.deleted_skills:
+        deleted = registry.delete_skills(plan.deleted_skills)
+        print(f"  Deleted {deleted} skills")
+    if plan.deleted_documents:
+        deleted = registry.delete_documents(plan.deleted_documents)
+        print(f"  Deleted {deleted} documents")
 
-def index_skills(registry: SkillRegistry, force: bool = False) -> int:
+
+def record_plan(
+    manifest: Optional[IndexManifest],
+    plan: IndexPlan,
+    skill_ids: Dict[str, str],
+    doc_ids: Dict[str, str]
+) -> None:
+    """Record everything a plan wrote in the manifest."""
+    if manifest is None:
+        return
+    
+    def record(item: Dict, row_id: Optional[str], kind: str, name: Optional[str] = None):
+        stat = plan.stats.get(item["path"])
+        if stat is None or row_id is None:
+            return
+        manifest.record(item["path"], stat, content_hash(item["content"]), row_id, kind, name)
+    
+    for skill in plan.skills:
+        record(skill, skill_ids.get(skill["name"]), "skill", skill["name"])
+        for ref in skill["references"]:
+            record(ref, doc_ids.get(ref["path"]), "document")
+    for doc in plan.documents:
+        record(doc, doc_ids.get(doc["path"]), "document")
+
+
+def index_skills(
+    registry: SkillRegistry,
+    force: bool = False,
+    manifest: Optional[IndexManifest] = None,
+    commit_every: int = INDEX_COMMIT_INTERVAL
+) -> int:
     """
     Index all skills from the skills directory.
     
+    The run is one registry session: every write shares a connection and
+    a transaction, committed every `commit_every` skills (0 = at the end).
+    Each skill, with its references and links, is written as one unit;
+    a skill that fails is rolled back and the rest are kept.
+    
     Returns number of skills indexed.
     """
     if not SKILLS_DIR.exists():
         print(f"Skills directory not found: {SKILLS_DIR}")
         return 0
     
+    plan = plan_index(manifest, skills=True, docs=False, force=force)
+    if plan.skipped:
+        print(f"  Skipped {plan.skipped} unchanged files")
+    
     count = 0
-    skill_dirs = [d for d in SKILLS_DIR.iterdir() if d.is_dir()]
+    skill_ids = {}
+    doc_ids = {}
     
-    for skill_dir in skill_dirs:
-        skill_file = skill_dir / "SKILL.md"
-        
-        if not skill_file.exists():
-            print(f"  Skipping {skill_dir.name}: no SKILL.md")
-            continue
-        
-        content = skill_file.read_text()
-        frontmatter = parse_skill_frontmatter(content)
-        
-        name = frontmatter.get("name", skill_dir.name)
-        description = frontmatter.get("description", "")
-        version = "1.0.0"  # Could parse from metadata if available
-        author = frontmatter.get("author", "Agent Skills Contributors")
-        
-        # Extract version from content if present
-        if "**Version**:" in content:
-            import re
-            match = re.search(r'\*\*Version\*\*:\s*(\d+\.\d+\.\d+)', content)
-            if match:
-                version = match.group(1)
-        
-        print(f"  Indexing skill: {name}")
+    with registry.session(commit_every) as session:
+        apply_removals(registry, plan)
         
-        try:
-            skill_id = registry.upsert_skill(
-                name=name,
-                description=description,
-                content=content,
-                path=str(skill_file.relative_to(SKILLS_DIR.parent)),
-                version=version,
-                author=author,
-                generate_embedding_flag=True  # Generate embeddings
-            )
-            count += 1
+        for skill in plan.skills:
+            name = skill["name"]
+            print(f"  Indexing skill: {name}")
             
-            # Index references within the skill
-            refs_dir = skill_dir / "references"
-            if refs_dir.exists():
-                for ref_file in refs_dir.glob("*.md"):
-                    ref_content = ref_file.read_text()
-                    ref_title = extract_title_from_markdown(ref_content)
-                    
-                    doc_id = registry.upsert_document(
-                        title=f"{name}: {ref_title}",
-                        content=ref_content,
-                        path=str(ref_file.relative_to(SKILLS_DIR.parent)),
-                        doc_type="reference"
+            try:
+                with session.unit():
+                    skill_id = registry.upsert_skill(
+                        name=name,
+                        description=skill["description"],
+                        content=skill["content"],
+                        path=skill["path"],
+                        version=skill["version"],
+                        author=skill["author"],
+                        generate_embedding_flag=True,  # Generate embeddings
+                        force=force
                     )
                     
-                    # Link reference to skill
-                    registry.link_skill_to_document(skill_id, doc_id, relevance=0.9)
-                    
-        except Exception as e:
-            print(f"  Error indexing {name}: {e}")
+                    # Index references within the skill
+                    ref_ids = {}
+                    for ref in skill["references"]:
+                        doc_id = registry.upsert_document(**ref, force=force)
+                        
+                        # Link reference to skill
+                        registry.link_skill_to_document(skill_id, doc_id, relevance=0.9)
+                        ref_ids[ref["path"]] = doc_id
+                
+                count += 1
+                skill_ids[name] = skill_id
+                doc_ids.update(ref_ids)
+                        
+            except Exception as e:
+                print(f"  Error indexing {name}: {e}")
     
+    record_plan(manifest, plan, skill_ids, doc_ids)
     return count
 
 
-def index_documents(registry: SkillRegistry, force: bool = False) -> int:
+def index_documents(
+    registry: SkillRegistry,
+    force: bool = False,
+    manifest: Optional[IndexManifest] = None,
+    commit_every: int = INDEX_COMMIT_INTERVAL
+) -> int:
     """
     Index all documents from the docs directory.
     
+    Runs as one registry session, like `index_skills`, with each
+    document as a unit.
+    
     Returns number of documents indexed.
     """
     if not DOCS_DIR.exists():
         print(f"Docs directory not found: {DOCS_DIR}")
         return 0
     
+    plan = plan_index(manifest, skills=False, docs=True, force=force)
+    if plan.skipped:
+        print(f"  Skipped {plan.skipped} unchanged files")
+    
     count = 0
+    doc_ids = {}
     
-    # Index all markdown files in docs
-    for doc_file in DOCS_DIR.rglob("*.md"):
-        content = doc_file.read_text()
-        
-        # Parse frontmatter if present
-        frontmatter = parse_skill_frontmatter(content)
-        
-        # Use frontmatter name if available, otherwise use filename
-        if frontmatter.get("name"):
-            title = frontmatter.get("name")
-        else:
-            filename_title = doc_file.stem.replace('_', ' ').replace('-', ' ').title()
-            title = extract_title_from_markdown(content, fallback=filename_title)
-        
-        # Use frontmatter description if available
-        description = frontmatter.get("description", "")
-        
-        # Get source_url from frontmatter
-        source_url = frontmatter.get("source_url", "No")
+    with registry.session(commit_every) as session:
+        apply_removals(registry, plan)
         
-        # Get doc_type from frontmatter, fallback to inference if not present
-        doc_type = frontmatter.get("doc_type")
-        if not doc_type:
-            # Fallback: infer from path or filename
-            doc_type = "research"
-            if "blog" in doc_file.name.lower() or "blog" in title.lower():
-                doc_type = "blog"
-            elif "case" in doc_file.name.lower():
-                doc_type = "case_study"
-            elif "reference" in doc_file.name.lower() or "reference" in str(doc_file.parent).lower():
-                doc_type = "reference"
-        
-        print(f"  Indexing document: {title}")
-        
-        try:
-            registry.upsert_document(
-                title=title,
-                content=content,
-                path=str(doc_file.relative_to(DOCS_DIR.parent)),
-                doc_type=doc_type,
-                description=description,
-                source_url=source_url
-            )
-            count += 1
-        except Exception as e:
-            print(f"  Error indexing {doc_file.name}: {e}")
+        # Index all markdown files in docs
+        for doc in plan.documents:
+            print(f"  Indexing document: {doc['title']}")
+            
+            try:
+                with session.unit():
+                    doc_id = registry.upsert_document(**doc, force=force)
+                doc_ids[doc["path"]] = doc_id
+                count += 1
+            except Exception as e:
+                print(f"  Error indexing {doc['path']}: {e}")
     
+    record_plan(manifest, plan, {}, doc_ids)
     return count
 
 
+def bulk_index(
+    registry: SkillRegistry,
+    skills: bool = True,
+    docs: bool = True,
+    force: bool = False,
+    manifest: Optional[IndexManifest] = None
+) -> Dict:
+    """
+    Index skills and documents in bulk.
+    
+    Reads every changed file first, then embeds all changed items in
+    batched API calls and writes them, along with renames and deletions,
+    with multi-row statements inside a single transaction. If anything
+    fails, nothing is written.
+    
+    Returns throughput statistics for the run.
+    """
+    start = time.perf_counter()
+    requests_before = get_request_stats()["requests"]
+    
+    plan = plan_index(manifest, skills=skills, docs=docs, force=force)
+    skill_items = plan.skills
+    documents = plan.documents
+    references = [ref for skill in skill_items for ref in skill["references"]]
+    
+    with registry.transaction():
+        apply_removals(registry, plan)
+        skill_ids = registry.bulk_upsert_skills([
+            {k: v for k, v in skill.items() if k != "references"}
+            for skill in skill_items
+        ], force=force)
+        doc_ids = registry.bulk_upsert_documents(references + documents, force=force)
+        registry.bulk_link_skills_to_documents([
+            (skill_ids[skill["name"]], doc_ids[ref["path"]], 0.9)
+            for skill in skill_items
+            for ref in skill["references"]
+        ])
+    
+    record_plan(manifest, plan, skill_ids, doc_ids)
+    
+    elapsed = time.perf_counter() - start
+    items = len(skill_items) + len(references) + len(documents)
+    
+    return {
+        "skills": len(skill_items),
+        "documents": len(references) + len(documents),
+        "skipped": plan.skipped,
+        "renamed": len(plan.renames),
+        "deleted": len(plan.deleted_skills) + len(plan.deleted_documents),
+        "items": items,
+        "seconds": elapsed,
+        "items_per_second": items / elapsed if elapsed > 0 else 0.0,
+        "embedding_requests": get_request_stats()["requests"] - requests_before
+    }
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Index skills and documents into the Semantic Knowledge Registry"
@@ -175,6 +495,23 @@ def main():
         action="store_true",
         help="Force re-indexing even if content unchanged"
     )
+    parser.add_argument(
+        "--bulk",
+        action="store_true",
+        help="Embed in batches and write everything in a single transaction"
+    )
+    parser.add_argument(
+        "--commit-every",
+        type=int,
+        default=INDEX_COMMIT_INTERVAL,
+        metavar="N",
+        help="Commit every N skills/documents instead of once at the end"
+    )
+    parser.add_argument(
+        "--no-manifest",
+        action="store_true",
+        help="Read every file instead of skipping those unchanged since the last run"
+    )
     
     args = parser.parse_args()
     
@@ -183,22 +520,48 @@ def main():
         sys.exit(1)
     
     print("Connecting to database...")
-    registry = SkillRegistry()
+    registry = open_registry()
+    
+    manifest = None
+    if INDEX_MANIFEST_ENABLED and not args.no_manifest:
+        manifest = IndexManifest()
+        stale = manifest.prune(registry)
+        if stale:
+            print(f"Manifest: {stale} entries no longer in the registry, re-reading them")
     
     total = 0
     
-    if args.skills or args.all:
+    if args.bulk:
+        print("\nBulk indexing...")
+        result = bulk_index(
+            registry,
+            skills=args.skills or args.all,
+            docs=args.docs or args.all,
+            force=args.force,
+            manifest=manifest
+        )
+        print(f"  Indexed {result['skills']} skills and {result['documents']} documents "
+              f"in {result['seconds']:.2f}s ({result['items_per_second']:.1f} items/sec)")
+        print(f"  Skipped {result['skipped']} unchanged files, "
+              f"renamed {result['renamed']}, deleted {result['deleted']}")
+        print(f"  Embedding requests issued: {result['embedding_requests']}")
+        total = result["items"]
+    
+    if (args.skills or args.all) and not args.bulk:
         print("\nIndexing skills...")
-        count = index_skills(registry, args.force)
+        count = index_skills(registry, args.force, manifest, args.commit_every)
         print(f"  Indexed {count} skills")
         total += count
     
-    if args.docs or args.all:
+    if (args.docs or args.all) and not args.bulk:
         print("\nIndexing documents...")
-        count = index_documents(registry, args.force)
+        count = index_documents(registry, args.force, manifest, args.commit_every)
         print(f"  Indexed {count} documents")
         total += count
     
+    if manifest is not None:
+        manifest.save()
+    
     print(f"\nTotal indexed: {total} items")
     
     # Print stats
@@ -207,6 +570,14 @@ def main():
     print(f"  Skills: {stats['skills']} ({stats['skills_with_embedding']} with embeddings)")
     print(f"  Documents: {stats['documents']} ({stats['documents_with_embedding']} with embeddings)")
     print(f"  Skill-Document links: {stats['skill_document_links']}")
+    
+    cache = get_embedding_cache()
+    if cache:
+        cache_stats = cache.stats()
+        print(f"\nEmbedding cache:")
+        print(f"  Hits: {cache_stats['hits']}, Misses: {cache_stats['misses']} "
+              f"(hit rate {cache_stats['hit_rate']:.1%})")
+        print(f"  Entries: {cache_stats['entries']}/{cache_stats['max_entries']}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,189 @@
+"""
+Local manifest of indexed files for incremental indexing.
+
+The manifest maps each indexed file (path relative to the project root)
+to the file's mtime and size, the SHA-256 of its content and the ID of
+the registry row it was written to. On the next run, a file whose mtime
+and size still match is skipped without being opened and without a
+database lookup. Files that are gone are reported as missing, so the
+indexer can delete their rows or, when a new file has the same content
+hash, treat the pair as a rename.
+
+The manifest is bound to the database, embedding model and dimension it
+was built against; pointing the indexer at a different target starts
+from an empty manifest.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .config import (
+    DATABASE_URL,
+    EMBEDDING_MODEL,
+    EMBEDDING_DIMENSION,
+    INDEX_MANIFEST_PATH,
+    PROJECT_ROOT,
+)
+
+
+MANIFEST_VERSION = 1
+
+
+class ManifestScan(NamedTuple):
+    """Result of comparing files on disk against the manifest."""
+    unchanged: List[str]                        # Paths skipped by mtime and size
+    changed: List[Tuple[str, os.stat_result]]   # New or modified paths, with their stat
+    missing: Dict[str, Dict]                    # Manifest entries no longer on disk
+
+
+def manifest_target(
+    database_url: str = DATABASE_URL,
+    model: str = EMBEDDING_MODEL,
+    dimension: int = EMBEDDING_DIMENSION
+) -> str:
+    """Fingerprint of what the manifest's row IDs and hashes are valid for."""
+    return hashlib.sha256(
+        f"{database_url}\x1f{model}\x1f{dimension}".encode("utf-8")
+    ).hexdigest()
+
+
+class IndexManifest:
+    """
+    Path -> {kind, mtime_ns, size, hash, id} for every indexed file.
+
+    `kind` is "skill" (a SKILL.md, with the skill `name`) or "document".
+    """
+
+    def __init__(
+        self,
+        path: Path = INDEX_MANIFEST_PATH,
+        target: Optional[str] = None,
+        root: Path = PROJECT_ROOT
+    ):
+        self.path = Path(path)
+        self.target = target or manifest_target()
+        self.root = Path(root)
+        self.entries: Dict[str, Dict] = {}
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return
+        if data.get("version") == MANIFEST_VERSION and data.get("target") == self.target:
+            self.entries = data.get("files", {})
+
+    def save(self) -> None:
+        """Write the manifest atomically."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps({
+            "version": MANIFEST_VERSION,
+            "target": self.target,
+            "files": self.entries
+        }, sort_keys=True))
+        os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        """Forget every entry (the file is rewritten on the next `save`)."""
+        self.entries = {}
+
+    def relative(self, file: Path) -> str:
+        """Manifest key for a file: its path relative to the project root."""
+        return str(Path(file).relative_to(self.root))
+
+    def scan(self, files: Iterable[Path], prefix: str, force: bool = False) -> ManifestScan:
+        """
+        Compare files on disk with the manifest.
+
+        Only `os.stat` is called on each file; with `force`, every file is
+        reported as changed. Entries under `prefix` (for example "docs/")
+        whose file was not in `files` are returned as missing.
+        """
+        unchanged = []
+        changed = []
+        seen = set()
+
+        for file in files:
+            key = self.relative(file)
+            seen.add(key)
+            stat = os.stat(file)
+            entry = self.entries.get(key)
+            if (
+                not force and entry
+                and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size
+            ):
+                unchanged.append(key)
+            else:
+                changed.append((key, stat))
+
+        missing = {
+            key: entry for key, entry in self.entries.items()
+            if key.startswith(prefix) and key not in seen
+        }
+        return ManifestScan(unchanged, changed, missing)
+
+    def is_same_content(self, key: str, file_hash: str) -> bool:
+        """Whether a changed file still has the content hash it was indexed with."""
+        entry = self.entries.get(key)
+        return entry is not None and entry["hash"] == file_hash
+
+    def record(
+        self,
+        key: str,
+        stat: os.stat_result,
+        file_hash: str,
+        row_id: str,
+        kind: str = "document",
+        name: Optional[str] = None
+    ) -> None:
+        """Record a file as indexed into row `row_id`."""
+        entry = {
+            "kind": kind,
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "hash": file_hash,
+            "id": str(row_id)
+        }
+        if name is not None:
+            entry["name"] = name
+        self.entries[key] = entry
+
+    def touch(self, key: str, stat: os.stat_result) -> None:
+        """Update the stat of a file whose content did not change."""
+        self.entries[key].update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+
+    def move(self, old_key: str, new_key: str, stat: os.stat_result) -> None:
+        """Carry an entry over to the new path of a renamed file."""
+        self.entries[new_key] = self.entries.pop(old_key)
+        self.touch(new_key, stat)
+
+    def forget(self, keys: Iterable[str]) -> None:
+        """Drop entries, e.g. for files whose rows were deleted."""
+        for key in keys:
+            self.entries.pop(key, None)
+
+    def prune(self, registry) -> int:
+        """
+        Drop entries whose registry rows no longer exist.
+
+        One query for the whole manifest, so a database that was reset or
+        edited outside the indexer is not mistaken for up to date.
+
+        Returns the number of entries dropped.
+        """
+        if not self.entries:
+            return 0
+        skill_ids = [e["id"] for e in self.entries.values() if e["kind"] == "skill"]
+        document_ids = [e["id"] for e in self.entries.values() if e["kind"] == "document"]
+        existing = registry.existing_ids(skill_ids, document_ids)
+        stale = [key for key, e in self.entries.items() if e["id"] not in existing]
+        self.forget(stale)
+        return len(stale)
+
+    def __len__(self) -> int:
+        return len(self.entries)
@@ -10,10 +10,8 @@ Usage:
 """
 
 from pathlib import Path
-import psycopg2
-from pgvector.psycopg2 import register_vector
 
-from .config import DATABASE_URL
+from .db import get_cursor
 
 
 def init_database():
@@ -26,19 +24,13 @@ def init_database():
     schema_sql = schema_path.read_text()
     
     print(f"Connecting to database...")
-    conn = psycopg2.connect(DATABASE_URL)
-    register_vector(conn)
-    
-    try:
-        cursor = conn.cursor()
-        
+    with get_cursor() as cursor:
         print("Executing schema...")
         cursor.execute(schema_sql)
-        
-        conn.commit()
-        print("Schema initialized successfully.")
-        
-        # Verify tables exist
+    print("Schema initialized successfully.")
+    
+    # Verify tables exist
+    with get_cursor() as cursor:
         cursor.execute("""
             SELECT table_name 
             FROM information_schema.tables 
@@ -46,15 +38,8 @@ def init_database():
             ORDER BY table_name
         """)
         
-        tables = [row[0] for row in cursor.fetchall()]
+        tables = [row["table_name"] for row in cursor.fetchall()]
         print(f"\nTables created: {', '.join(tables)}")
-        
-    except Exception as e:
-        conn.rollback()
-        raise e
-    finally:
-        cursor.close()
-        conn.close()
 
 
 def main():
@@ -4,14 +4,341 @@ Semantic Knowledge Registry
 Core API for skill and document management with semantic search.
 """
 
-from typing import List, Dict, Optional, Any
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import partial
+from itertools import count
+from typing import List, Dict, Optional, Any, Tuple, Generator
 from pathlib import Path
 import re
+import threading
+import time
+import numpy as np
 import yaml
+from psycopg2.extras import execute_values
 
-from .db import get_cursor, execute_query
-from .embeddings import generate_embedding, content_hash
-from .config import EMBEDDING_DIMENSION
+from .db import get_cursor, execute_query, transaction, savepoint, commit, on_commit, pending_commit
+from .embeddings import generate_embedding, generate_embeddings_batch, content_hash, chunk_spans
+from .config import (
+    DATABASE_URL,
+    EMBEDDING_DIMENSION,
+    QUERY_CACHE_SIZE,
+    QUERY_CACHE_TTL,
+    RESULT_CACHE_SIZE,
+    RESULT_CACHE_CHECK_INTERVAL,
+    SKILL_MATRIX_MAX_SIZE,
+    HNSW_EF_SEARCH,
+    HNSW_DEFAULT_EF_SEARCH,
+    HNSW_MAX_EF_SEARCH,
+    IVFFLAT_PROBES,
+    SEARCH_OVERFETCH,
+    HYBRID_CANDIDATES,
+    RRF_K,
+    DOCUMENT_CHUNKS_ENABLED,
+    CHUNK_SEARCH_CANDIDATES,
+    INDEX_COMMIT_INTERVAL,
+    VECTOR_QUANTIZATION,
+    VECTOR_INDEX_DIMENSION,
+    QUANTIZATION_RERANK,
+)
+from .memory_cache import LRUCache
+from .skill_matrix import SkillMatrix
+from .vector_index import scan_order
+
+
+# Similarity search SQL.
+#
+# The inner query is a plain ORDER BY distance LIMIT k, which pgvector can
+# serve directly from the ANN index. The threshold is applied afterwards to
+# that small candidate set; putting it on the distance inside the scan would
+# keep the planner from using an ordered index scan. The distance is computed
+# once per row and reused for the threshold and the similarity.
+
+def _nearest_sql(
+    table: str,
+    columns: str,
+    limit: str,
+    quantization: str = VECTOR_QUANTIZATION,
+    rerank: int = QUANTIZATION_RERANK,
+    dimension: int = EMBEDDING_DIMENSION,
+    truncate: int = VECTOR_INDEX_DIMENSION
+) -> str:
+    """
+    Nearest rows of `table` by exact cosine distance, as a subquery.
+
+    Selects `columns` plus `distance`, at most `%(<limit>)s` rows. With a
+    quantized or truncated index (halfvec, binary or a Matryoshka prefix,
+    see vector_index.py), the index scan orders by the reduced vectors and
+    returns `rerank` times as many rows; those are re-ranked on the
+    full-precision embeddings, so the reduction costs recall only when a
+    true neighbour falls out of the shortlist. The shortlist is capped at
+    HNSW_MAX_EF_SEARCH rows (or the limit, if larger), the most an HNSW
+    scan can return.
+    """
+    if quantization == "none" and not truncate:
+        return f"""
+        SELECT {columns}, embedding <=> %(embedding)s::vector AS distance
+        FROM {table}
+        WHERE embedding IS NOT NULL
+        ORDER BY embedding <=> %(embedding)s::vector
+        LIMIT %({limit})s"""
+    return f"""
+        SELECT * FROM (
+            SELECT {columns}, embedding <=> %(embedding)s::vector AS distance
+            FROM {table}
+            WHERE embedding IS NOT NULL
+            ORDER BY {scan_order(quantization, dimension, truncate)}
+            LIMIT CASE
+                WHEN %({limit})s * {int(rerank)} > {HNSW_MAX_EF_SEARCH}
+                THEN GREATEST(%({limit})s, {HNSW_MAX_EF_SEARCH})
+                ELSE %({limit})s * {int(rerank)}
+            END
+        ) AS shortlist
+        ORDER BY distance
+        LIMIT %({limit})s"""
+
+
+SEARCH_SKILLS_SQL = f"""
+    SELECT id, name, description, path, 1 - distance AS similarity
+    FROM ({_nearest_sql("skills", "id, name, description, path", "candidates")}
+    ) AS candidates
+    WHERE distance < 1 - %(threshold)s
+    ORDER BY distance
+    LIMIT %(limit)s
+"""
+
+SEARCH_DOCUMENTS_SQL = f"""
+    SELECT id, title, path, doc_type, 1 - distance AS similarity
+    FROM ({_nearest_sql("documents", "id, title, path, doc_type", "candidates")}
+    ) AS candidates
+    WHERE distance < 1 - %(threshold)s
+    ORDER BY distance
+    LIMIT %(limit)s
+"""
+
+RELATED_SKILLS_SQL = f"""
+    SELECT skill_id, skill_name, 1 - distance AS similarity
+    FROM ({_nearest_sql("skills", "id AS skill_id, name AS skill_name", "candidates")}
+    ) AS candidates
+    WHERE distance < 1 - %(threshold)s
+    ORDER BY distance
+    LIMIT %(limit)s
+"""
+
+
+# Unified search branches, joined with UNION ALL by `search`. Same
+# top-k-then-threshold shape as SEARCH_SKILLS_SQL / SEARCH_DOCUMENTS_SQL,
+# with per-type thresholds and limits.
+
+UNIFIED_SKILLS_SQL = f"""
+    (SELECT
+        'skill' AS kind,
+        id,
+        name AS title,
+        description,
+        path,
+        NULL::varchar AS doc_type,
+        1 - distance AS similarity
+    FROM ({_nearest_sql("skills", "id, name, description, path", "skill_candidates")}
+    ) AS skill_candidates
+    WHERE distance < 1 - %(skill_threshold)s
+    ORDER BY distance
+    LIMIT %(skill_limit)s)
+"""
+
+UNIFIED_DOCUMENTS_SQL = f"""
+    (SELECT
+        'document' AS kind,
+        id,
+        title,
+        NULL::text AS description,
+        path,
+        doc_type,
+        1 - distance AS similarity
+    FROM ({_nearest_sql("documents", "id, title, path, doc_type", "doc_candidates")}
+    ) AS doc_candidates
+    WHERE distance < 1 - %(doc_threshold)s
+    ORDER BY distance
+    LIMIT %(doc_limit)s)
+"""
+
+
+# Chunk-level document search: nearest chunks from the ANN index, rolled up
+# to one row per document (its best chunk) with that chunk's text.
+SEARCH_DOCUMENT_CHUNKS_SQL = f"""
+    SELECT d.id, d.title, d.path, d.doc_type, 1 - best.distance AS similarity,
+           best.ordinal, best.start_offset, best.end_offset,
+           substr(d.content, best.start_offset + 1, best.end_offset - best.start_offset) AS excerpt
+    FROM (
+        SELECT DISTINCT ON (document_id) document_id, ordinal, start_offset, end_offset, distance
+        FROM ({_nearest_sql("document_chunks", "document_id, ordinal, start_offset, end_offset", "candidates")}
+        ) AS nearest
+        WHERE distance < 1 - %(threshold)s
+        ORDER BY document_id, distance
+    ) AS best
+    JOIN documents d ON d.id = best.document_id
+    ORDER BY best.distance
+    LIMIT %(limit)s
+"""
+
+# Hybrid search: reciprocal rank fusion of vector and full-text rankings.
+#
+# Each side ranks its own top candidates: the nearest rows from the ANN
+# index, and the best ts_rank_cd matches from the GIN index on search_tsv.
+# A row scores sum(1 / (rrf_k + rank)) over the rankings it appears in,
+# so exact-term hits surface even when their cosine similarity is low.
+# Formatted per table; `{p}` prefixes the per-table parameters.
+
+_HYBRID_SQL = """
+    (WITH vector_ranked AS (
+        SELECT id, row_number() OVER (ORDER BY distance) AS rank
+        FROM ({nearest}
+        ) AS nearest
+    ),
+    text_ranked AS (
+        SELECT id, row_number() OVER (ORDER BY ts_rank_cd(search_tsv, tsq) DESC) AS rank
+        FROM {table}, websearch_to_tsquery('english', %(query)s) AS tsq
+        WHERE search_tsv @@ tsq
+        ORDER BY ts_rank_cd(search_tsv, tsq) DESC
+        LIMIT %({p}candidates)s
+    ),
+    fused AS (
+        SELECT id, SUM(1.0 / (%(rrf_k)s + rank)) AS score
+        FROM (
+            SELECT id, rank FROM vector_ranked
+            UNION ALL
+            SELECT id, rank FROM text_ranked
+        ) AS rankings
+        GROUP BY id
+    )
+    SELECT {columns},
+           1 - (t.embedding <=> %(embedding)s::vector) AS similarity,
+           f.score
+    FROM fused f
+    JOIN {table} t ON t.id = f.id
+    ORDER BY f.score DESC
+    LIMIT %({p}limit)s)
+"""
+
+HYBRID_SKILLS_SQL = _HYBRID_SQL.format(
+    table="skills",
+    p="skill_",
+    nearest=_nearest_sql("skills", "id", "skill_candidates"),
+    columns="'skill' AS kind, t.id, t.name AS title, t.description, t.path, NULL::varchar AS doc_type"
+)
+
+HYBRID_DOCUMENTS_SQL = _HYBRID_SQL.format(
+    table="documents",
+    p="doc_",
+    nearest=_nearest_sql("documents", "id", "doc_candidates"),
+    columns="'document' AS kind, t.id, t.title, NULL::text AS description, t.path, t.doc_type"
+)
+
+
+def _candidate_count(limit: Optional[int]) -> Optional[int]:
+    """How many nearest rows to pull from the index before thresholding."""
+    return None if limit is None else limit * SEARCH_OVERFETCH
+
+
+def _hybrid_candidate_count(limit: int) -> int:
+    """How many rows each ranking contributes to hybrid fusion."""
+    return max(limit * SEARCH_OVERFETCH, HYBRID_CANDIDATES)
+
+
+def _ann_settings(
+    ef_search: Optional[int],
+    probes: Optional[int],
+    candidates: Optional[int]
+) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Resolve per-query (ef_search, probes) against the configured defaults.
+    
+    An HNSW scan returns at most ef_search rows, so it is raised to
+    `candidates` (times the re-rank factor on a quantized or truncated
+    index) when lower, up to the HNSW_MAX_EF_SEARCH pgvector accepts.
+    None means "leave the server setting".
+    """
+    ef_search = HNSW_EF_SEARCH if ef_search is None else ef_search
+    probes = IVFFLAT_PROBES if probes is None else probes
+    if candidates is not None and (VECTOR_QUANTIZATION != "none" or VECTOR_INDEX_DIMENSION):
+        candidates *= QUANTIZATION_RERANK
+    if candidates is not None and candidates > (ef_search or HNSW_DEFAULT_EF_SEARCH):
+        ef_search = candidates
+    if ef_search is not None:
+        ef_search = min(ef_search, HNSW_MAX_EF_SEARCH)
+    return ef_search, probes
+
+
+class RegistrySession:
+    """
+    Unit of work for a batch of registry writes, such as an indexing run.
+    
+    Every registry call in the session shares one connection and one
+    transaction instead of connecting and committing per call:
+    
+        with registry.session(commit_every=100) as session:
+            for skill in skills:
+                with session.unit():
+                    skill_id = registry.upsert_skill(...)
+                    registry.link_skill_to_document(skill_id, ...)
+    
+    A unit that raises is rolled back on its own (savepoint), so one bad
+    item doesn't lose the rest. Completed units are committed every
+    `commit_every` units (0 = only when the session ends); if the session
+    itself raises, everything since the last commit is rolled back.
+    """
+    
+    def __init__(self, registry, commit_every: int = INDEX_COMMIT_INTERVAL):
+        self.registry = registry
+        self.commit_every = commit_every
+        self.pending = 0     # Units done since the last commit
+        self.committed = 0   # Units committed
+        self.failed = 0      # Units rolled back
+        self.commits = 0
+        self._transaction = None
+    
+    def __enter__(self) -> "RegistrySession":
+        self._transaction = self.registry.transaction()
+        self._transaction.__enter__()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        transaction, self._transaction = self._transaction, None
+        transaction.__exit__(exc_type, exc, tb)
+        if exc_type is None:
+            self.committed += self.pending
+            self.commits += 1
+        self.pending = 0
+        return False
+    
+    @contextmanager
+    def unit(self) -> Generator[None, None, None]:
+        """Group one item's writes; they are undone together if the block raises."""
+        try:
+            with self.registry._savepoint():
+                yield
+        except Exception:
+            self.failed += 1
+            raise
+        self.pending += 1
+        if self.commit_every and self.pending >= self.commit_every:
+            self.commit()
+    
+    def commit(self) -> None:
+        """Commit the units done so far; the session continues."""
+        self.registry._commit()
+        self.committed += self.pending
+        self.pending = 0
+        self.commits += 1
+    
+    def stats(self) -> Dict:
+        """Get unit and commit counts."""
+        return {
+            "committed": self.committed,
+            "pending": self.pending,
+            "failed": self.failed,
+            "commits": self.commits
+        }
 
 
 class SkillRegistry:
@@ -19,10 +346,54 @@ class SkillRegistry:
     Main interface for the Semantic Knowledge Registry.
     
     Handles skill and document CRUD operations with semantic embeddings.
+    Query embeddings for searches are kept in a bounded in-memory LRU, so
+    repeated searches only pay for the database round-trip.
+    
+    Search results are cached too, stamped with the registry generation
+    they were read at: a counter bumped when this registry's writes
+    commit, plus the database's `registry_generation` sequence, which
+    every committed transaction bumps (read at most every
+    `result_cache_check` seconds). A repeated search between writes is
+    served from memory; searches on a connection with uncommitted
+    registry writes bypass the cache.
+    
+    `find_related_skills` scores against an in-memory matrix of every
+    skill embedding (see skill_matrix.py) while the registry has at most
+    `skill_matrix_max_size` skills. The matrix is reloaded after this
+    registry commits a skill change, and when the database generation
+    changes (any commit, checked at the same interval); until the commit,
+    the writing thread queries the skills table instead. Without the
+    `registry_generation` sequence it falls back to watching the skills
+    table's row count and latest `updated_at`, which can miss writes
+    committed by long transactions.
     """
     
-    def __init__(self):
+    def __init__(
+        self,
+        query_cache_size: int = QUERY_CACHE_SIZE,
+        query_cache_ttl: Optional[float] = QUERY_CACHE_TTL,
+        result_cache_size: int = RESULT_CACHE_SIZE,
+        result_cache_check: float = RESULT_CACHE_CHECK_INTERVAL,
+        skill_matrix_max_size: int = SKILL_MATRIX_MAX_SIZE
+    ):
+        self._query_cache = LRUCache(query_cache_size, ttl=query_cache_ttl)
+        self._result_cache = LRUCache(result_cache_size)
+        self._result_cache_check = result_cache_check
+        self._write_counter = count(1)
+        self._local_generation = 0
+        self._database_generation = None
+        self._generation_read_at = float("-inf")
+        self._skill_matrix_max_size = skill_matrix_max_size
+        self._skill_matrix = None
+        self._skill_matrix_version = None
+        self._skill_generation = 0
+        self._skill_fingerprint = None
+        self._skill_fingerprint_read_at = float("-inf")
+        self._skill_matrix_lock = threading.Lock()
         self._verify_connection()
+        self._has_generation_sequence = execute_query(
+            "SELECT to_regclass('registry_generation') IS NOT NULL AS present"
+        )[0]["present"]
     
     def _verify_connection(self):
         """Verify database connection works."""
@@ -33,6 +404,192 @@ class SkillRegistry:
                 f"Could not connect to database. Is it running? Error: {e}"
             )
     
+    def _embed_query(self, text: str) -> np.ndarray:
+        """
+        Embed a search query, reusing cached embeddings for repeat queries.
+        
+        Queries differing only in case or whitespace share a cache entry.
+        """
+        key = " ".join(text.split()).casefold()
+        
+        embedding = self._query_cache.get(key)
+        if embedding is None:
+            embedding = generate_embedding(text)
+            embedding.flags.writeable = False  # Shared by every caller of this query
+            self._query_cache.put(key, embedding)
+        return embedding
+    
+    def _embed_queries(self, texts: List[str]) -> np.ndarray:
+        """`_embed_query` for many texts; cache misses are embedded in one batch."""
+        keys = [" ".join(text.split()).casefold() for text in texts]
+        embeddings = [self._query_cache.get(key) for key in keys]
+        
+        missing = [i for i, e in enumerate(embeddings) if e is None]
+        if missing:
+            for i, embedding in zip(missing, generate_embeddings_batch([texts[i] for i in missing])):
+                embedding.flags.writeable = False
+                embeddings[i] = embedding
+                self._query_cache.put(keys[i], embedding)
+        return np.array(embeddings, dtype=np.float32)
+    
+    def query_cache_stats(self) -> Dict:
+        """Get hit/miss statistics for the query embedding cache."""
+        return self._query_cache.stats()
+    
+    def result_cache_stats(self) -> Dict:
+        """Get hit/miss statistics for the search result cache."""
+        return self._result_cache.stats()
+    
+    def _bump_generation(self, skills: bool = False) -> None:
+        """Invalidate cached search results (and with `skills`, the skill matrix)."""
+        self._local_generation = next(self._write_counter)
+        if skills:
+            self._skill_generation = self._local_generation
+            self._skill_fingerprint_read_at = float("-inf")
+    
+    def _wrote(self, skills: bool = False) -> None:
+        """
+        Note a write that changes search results (with `skills`, skill
+        embeddings); caches are invalidated once its transaction commits.
+        """
+        on_commit((self, skills), partial(self._bump_generation, skills=skills))
+    
+    def _generation(self) -> Tuple:
+        """
+        The registry generation cached results are stamped with.
+        
+        Without the `registry_generation` sequence (run
+        schema/add_registry_generation.sql), writes by other processes
+        can't be seen, so results expire every check interval instead.
+        """
+        now = time.monotonic()
+        if now - self._generation_read_at >= self._result_cache_check:
+            if self._has_generation_sequence:
+                self._database_generation = execute_query(
+                    "SELECT last_value FROM registry_generation"
+                )[0]["last_value"]
+            else:
+                self._database_generation = now
+            self._generation_read_at = now
+        return self._local_generation, self._database_generation
+    
+    def refresh_skill_matrix(self) -> Optional[SkillMatrix]:
+        """
+        Reload the in-memory skill matrix now.
+        
+        Returns it, or None if disabled or the registry has more than
+        `skill_matrix_max_size` skills.
+        """
+        with self._skill_matrix_lock:
+            self._skill_matrix_version = None
+        return self._current_skill_matrix()
+    
+    def _current_skill_matrix(self) -> Optional[SkillMatrix]:
+        """The skill matrix, reloaded first if skills have changed."""
+        if self._skill_matrix_max_size <= 0 or pending_commit((self, True)):
+            return None
+        with self._skill_matrix_lock:
+            if self._has_generation_sequence:
+                self._skill_fingerprint = self._generation()[1]
+            else:
+                # Best effort: updated_at is the writing transaction's start
+                # time, so a late commit can leave both values unchanged
+                now = time.monotonic()
+                if now - self._skill_fingerprint_read_at >= self._result_cache_check:
+                    row = execute_query(
+                        "SELECT COUNT(*) AS count, MAX(updated_at) AS updated_at FROM skills"
+                    )[0]
+                    self._skill_fingerprint = (row["count"], row["updated_at"])
+                    self._skill_fingerprint_read_at = now
+            
+            version = (self._skill_generation, self._skill_fingerprint)
+            if version != self._skill_matrix_version:
+                rows = execute_query(
+                    "SELECT id, name, embedding FROM skills "
+                    "WHERE embedding IS NOT NULL ORDER BY name LIMIT %s",
+                    (self._skill_matrix_max_size + 1,)
+                )
+                self._skill_matrix = (
+                    SkillMatrix.from_rows(rows, EMBEDDING_DIMENSION)
+                    if len(rows) <= self._skill_matrix_max_size else None
+                )
+                self._skill_matrix_version = version
+            return self._skill_matrix
+    
+    @contextmanager
+    def transaction(self) -> Generator[None, None, None]:
+        """Run every registry call in the block as one transaction."""
+        with transaction():
+            yield
+    
+    def session(self, commit_every: int = INDEX_COMMIT_INTERVAL) -> RegistrySession:
+        """Open a unit of work for a batch of writes; see `RegistrySession`."""
+        return RegistrySession(self, commit_every)
+    
+    @contextmanager
+    def _savepoint(self) -> Generator[None, None, None]:
+        with savepoint():
+            yield
+    
+    def _commit(self) -> None:
+        commit()
+    
+    def _vector_query(
+        self,
+        query: str,
+        params: Dict,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        candidates: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Run a similarity query with per-call ANN index settings.
+        
+        `ef_search` (HNSW) and `probes` (ivfflat) trade speed for recall.
+        They are set with SET LOCAL semantics, so they only apply to this
+        query's transaction. None falls back to the configured default,
+        and then to the server setting. An HNSW scan returns at most
+        ef_search rows, so it is raised to `candidates` when lower.
+        
+        The settings and the query are sent as one statement batch.
+        Results are cached per (query, parameters, settings) until the
+        registry generation changes; callers get their own copies.
+        """
+        key = None
+        if self._result_cache.max_size > 0 and not pending_commit():
+            # Entries from older generations are never hit again and age out
+            key = (
+                self._generation(),
+                query,
+                params["embedding"].tobytes(),
+                tuple(sorted((k, v) for k, v in params.items() if k != "embedding")),
+                ef_search,
+                probes
+            )
+            cached = self._result_cache.get(key)
+            if cached is not None:
+                return [dict(r) for r in cached]
+        
+        ef_search, probes = _ann_settings(ef_search, probes, candidates)
+        
+        settings = ""
+        params = dict(params)
+        if ef_search is not None:
+            settings += "SELECT set_config('hnsw.ef_search', %(_ef_search)s, true); "
+            params["_ef_search"] = str(ef_search)
+        if probes is not None:
+            settings += "SELECT set_config('ivfflat.probes', %(_probes)s, true); "
+            params["_probes"] = str(probes)
+        
+        with get_cursor() as cur:
+            cur.execute(settings + query, params)
+            rows = [dict(r) for r in cur.fetchall()]
+        
+        if key is not None:
+            self._result_cache.put(key, rows)
+            return [dict(r) for r in rows]
+        return rows
+    
     # -------------------------------------------------------------------------
     # Skills
     # -------------------------------------------------------------------------
@@ -45,13 +602,29 @@ class SkillRegistry:
         path: str,
         version: str = "1.0.0",
         author: Optional[str] = None,
-        generate_embedding_flag: bool = True
+        generate_embedding_flag: bool = True,
+        force: bool = False
     ) -> str:
         """
         Insert or update a skill.
         
+        Skips the embedding and the write entirely when the stored skill
+        has the same content hash, unless `force` is set.
+        
         Returns the skill ID.
         """
+        skill_hash = _skill_hash(name, description, content, path, version, author)
+        
+        # Check if skill exists and is unchanged
+        existing = execute_query(
+            "SELECT id, content_hash, embedding IS NOT NULL AS has_embedding "
+            "FROM skills WHERE name = %s",
+            (name,)
+        )
+        
+        if not force and existing and _is_unchanged(existing[0], skill_hash, generate_embedding_flag):
+            return str(existing[0]["id"])
+        
         embedding = None
         if generate_embedding_flag:
             # Embed description + first part of content for semantic search
@@ -59,23 +632,109 @@ class SkillRegistry:
             embedding = generate_embedding(embed_text)
         
         query = """
-            INSERT INTO skills (name, description, content, path, version, author, embedding)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            INSERT INTO skills (name, description, content, path, version, author, content_hash, embedding)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
             ON CONFLICT (name) DO UPDATE SET
                 description = EXCLUDED.description,
                 content = EXCLUDED.content,
                 path = EXCLUDED.path,
                 version = EXCLUDED.version,
                 author = EXCLUDED.author,
+                content_hash = EXCLUDED.content_hash,
                 embedding = EXCLUDED.embedding
             RETURNING id
         """
         
         with get_cursor() as cur:
-            cur.execute(query, (name, description, content, path, version, author, embedding))
+            cur.execute(query, (name, description, content, path, version, author, skill_hash, embedding))
             result = cur.fetchone()
+            self._wrote(skills=True)
             return str(result["id"])
     
+    def bulk_upsert_skills(
+        self,
+        skills: List[Dict],
+        force: bool = False,
+        generate_embedding_flag: bool = True
+    ) -> Dict[str, str]:
+        """
+        Insert or update many skills at once.
+        
+        Each item takes the same fields as `upsert_skill`. Existing content
+        hashes are fetched in one query; unchanged skills are skipped unless
+        `force` is set. Changed skills are embedded in batches and written
+        with a single multi-row upsert.
+        
+        Returns a mapping of skill name to skill ID for every input skill.
+        """
+        # Last occurrence wins; a multi-row upsert can't touch a row twice
+        skills = list({s["name"]: s for s in skills}.values())
+        if not skills:
+            return {}
+        
+        existing = execute_query(
+            "SELECT id, name, content_hash, embedding IS NOT NULL AS has_embedding "
+            "FROM skills WHERE name = ANY(%s)",
+            ([s["name"] for s in skills],)
+        )
+        existing_by_name = {r["name"]: r for r in existing}
+        
+        ids = {}
+        changed = []
+        for skill in skills:
+            skill_hash = _skill_hash(
+                skill["name"], skill["description"], skill["content"], skill["path"],
+                skill.get("version", "1.0.0"), skill.get("author")
+            )
+            current = existing_by_name.get(skill["name"])
+            if not force and current and _is_unchanged(current, skill_hash, generate_embedding_flag):
+                ids[skill["name"]] = str(current["id"])
+            else:
+                changed.append((skill, skill_hash))
+        
+        if not changed:
+            return ids
+        
+        embeddings = [None] * len(changed)
+        if generate_embedding_flag:
+            embeddings = generate_embeddings_batch([
+                f"{s['name']}: {s['description']}\n\n{s['content'][:4000]}"
+                for s, _ in changed
+            ])
+        
+        rows = [
+            (
+                s["name"], s["description"], s["content"], s["path"],
+                s.get("version", "1.0.0"), s.get("author"), skill_hash, embedding
+            )
+            for (s, skill_hash), embedding in zip(changed, embeddings)
+        ]
+        
+        with get_cursor() as cur:
+            results = execute_values(
+                cur,
+                """
+                INSERT INTO skills (name, description, content, path, version, author, content_hash, embedding)
+                VALUES %s
+                ON CONFLICT (name) DO UPDATE SET
+                    description = EXCLUDED.description,
+                    content = EXCLUDED.content,
+                    path = EXCLUDED.path,
+                    version = EXCLUDED.version,
+                    author = EXCLUDED.author,
+                    content_hash = EXCLUDED.content_hash,
+                    embedding = EXCLUDED.embedding
+                RETURNING id, name
+                """,
+                rows,
+                template="(%s, %s, %s, %s, %s, %s, %s, %s::vector)",
+                fetch=True
+            )
+            self._wrote(skills=True)
+        
+        ids.update({r["name"]: str(r["id"]) for r in results})
+        return ids
+    
     def get_skill(self, name: str) -> Optional[Dict]:
         """Get a skill by name."""
         results = execute_query(
@@ -105,81 +764,168 @@ class SkillRegistry:
         """Delete a skill by name."""
         with get_cursor() as cur:
             cur.execute("DELETE FROM skills WHERE name = %s RETURNING id", (name,))
-            return cur.fetchone() is not None
+            if cur.fetchone() is None:
+                return False
+            self._wrote(skills=True)
+            return True
+    
+    def delete_skills(self, names: List[str]) -> int:
+        """Delete many skills by name in one statement. Returns the number deleted."""
+        if not names:
+            return 0
+        with get_cursor() as cur:
+            cur.execute("DELETE FROM skills WHERE name = ANY(%s)", (list(names),))
+            if cur.rowcount:
+                self._wrote(skills=True)
+            return cur.rowcount
     
     def search_skills(
         self,
         query: str,
         threshold: float = 0.7,
-        limit: int = 10
+        limit: int = 10,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        mode: str = "vector"
     ) -> List[Dict]:
         """
         Semantic search for skills.
         
         Args:
             query: Natural language search query
-            threshold: Minimum similarity score (0-1)
+            threshold: Minimum similarity score (0-1); not applied in hybrid mode
             limit: Maximum number of results
+            ef_search: HNSW candidate list size for this query
+            probes: ivfflat lists to probe for this query
+            mode: "vector", or "hybrid" to fuse in full-text ranking
             
         Returns:
             List of skills with similarity scores
         """
-        query_embedding = generate_embedding(query)
+        if mode == "hybrid":
+            return self.search(
+                query, "skills", threshold, limit,
+                ef_search=ef_search, probes=probes, mode=mode
+            )["skills"]
         
-        # Direct query with proper vector casting
-        results = execute_query(
-            """
-            SELECT 
-                id,
-                name,
-                description,
-                path,
-                1 - (embedding <=> %s::vector) AS similarity
-            FROM skills
-            WHERE embedding IS NOT NULL
-              AND 1 - (embedding <=> %s::vector) > %s
-            ORDER BY embedding <=> %s::vector
-            LIMIT %s
-            """,
-            (query_embedding, query_embedding, threshold, query_embedding, limit)
-        )
+        query_embedding = self._embed_query(query)
         
-        return [dict(r) for r in results]
+        candidates = _candidate_count(limit)
+        return self._vector_query(
+            SEARCH_SKILLS_SQL,
+            {
+                "embedding": query_embedding,
+                "threshold": threshold,
+                "limit": limit,
+                "candidates": candidates
+            },
+            ef_search=ef_search,
+            probes=probes,
+            candidates=candidates
+        )
     
     def find_related_skills(
         self,
         content: str,
-        threshold: float = 0.7
+        threshold: float = 0.7,
+        limit: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        embedding: Optional[np.ndarray] = None
     ) -> List[Dict]:
         """
         Find skills related to given content.
         
         Useful for determining which skills might need updates
-        when a new document is added.
+        when a new document is added. Scored exactly against the
+        in-memory skill matrix when it is enabled (`ef_search` / `probes`
+        are then unused). Otherwise, without a `limit` every skill above
+        the threshold is returned, which needs a full scan; pass a limit
+        to let the ANN index serve the query.
+        
+        Pass the content's `embedding` if already computed (such as the
+        document embedding from `embed_documents`) to skip embedding it.
+        Content is embedded without the query cache: documents are rarely
+        looked up twice, and would only evict search queries.
         """
-        content_embedding = generate_embedding(content[:8000])
+        content_embedding = embedding if embedding is not None else generate_embedding(content[:8000])
         
-        # Direct query with proper vector casting
-        results = execute_query(
-            """
-            SELECT 
-                id as skill_id,
-                name as skill_name,
-                1 - (embedding <=> %s::vector) AS similarity
-            FROM skills
-            WHERE embedding IS NOT NULL
-              AND 1 - (embedding <=> %s::vector) > %s
-            ORDER BY embedding <=> %s::vector
-            """,
-            (content_embedding, content_embedding, threshold, content_embedding)
+        matrix = self._current_skill_matrix()
+        if matrix is not None:
+            return matrix.related(content_embedding, threshold, limit)[0]
+        
+        candidates = _candidate_count(limit)
+        return self._vector_query(
+            RELATED_SKILLS_SQL,
+            {
+                "embedding": content_embedding,
+                "threshold": threshold,
+                "limit": limit,
+                "candidates": candidates
+            },
+            ef_search=ef_search,
+            probes=probes,
+            candidates=candidates
         )
+    
+    def find_related_skills_batch(
+        self,
+        contents: List[str],
+        threshold: float = 0.7,
+        limit: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        embeddings: Optional[np.ndarray] = None
+    ) -> List[List[Dict]]:
+        """
+        `find_related_skills` for many contents, in order.
+        
+        The contents are embedded in one batch (unless their `embeddings`
+        are passed, one row per content) and, with the skill matrix,
+        scored in one matrix product; otherwise one query runs per content.
+        """
+        if not contents:
+            return []
+        if embeddings is None:
+            embeddings = generate_embeddings_batch([content[:8000] for content in contents])
+        
+        matrix = self._current_skill_matrix()
+        if matrix is not None:
+            return matrix.related(embeddings, threshold, limit)
         
-        return [dict(r) for r in results]
+        candidates = _candidate_count(limit)
+        return [
+            self._vector_query(
+                RELATED_SKILLS_SQL,
+                {
+                    "embedding": embedding,
+                    "threshold": threshold,
+                    "limit": limit,
+                    "candidates": candidates
+                },
+                ef_search=ef_search,
+                probes=probes,
+                candidates=candidates
+            )
+            for embedding in embeddings
+        ]
     
     # -------------------------------------------------------------------------
     # Documents
     # -------------------------------------------------------------------------
     
+    def embed_documents(self, documents: List[Dict]) -> np.ndarray:
+        """
+        Embed documents ("title" and "content") in one batch, the way
+        `upsert_document` would.
+        
+        Pass the rows on to the upserts and `find_related_skills_batch`
+        so each document is embedded once.
+        """
+        return generate_embeddings_batch([
+            document_embedding_text(d["title"], d["content"]) for d in documents
+        ])
+    
     def upsert_document(
         self,
         title: str,
@@ -188,30 +934,36 @@ class SkillRegistry:
         doc_type: str = "reference",
         description: str = "",
         source_url: str = "No",
-        generate_embedding_flag: bool = True
+        generate_embedding_flag: bool = True,
+        force: bool = False,
+        embedding: Optional[np.ndarray] = None
     ) -> str:
         """
         Insert or update a document.
         
+        Skips the update when the stored content hash matches, unless
+        `force` is set. A precomputed `embedding` (see `embed_documents`)
+        is stored instead of embedding the document here.
+        
         Returns the document ID.
         """
         doc_hash = content_hash(content)
         
         # Check if document exists and content unchanged
         existing = execute_query(
-            "SELECT id, content_hash FROM documents WHERE path = %s",
+            "SELECT id, content_hash, embedding IS NOT NULL AS has_embedding "
+            "FROM documents WHERE path = %s",
             (path,)
         )
         
-        if existing and existing[0]["content_hash"] == doc_hash:
+        if not force and existing and _is_unchanged(existing[0], doc_hash, generate_embedding_flag):
             # Content unchanged, skip update
             return str(existing[0]["id"])
         
-        embedding = None
-        if generate_embedding_flag:
-            # Embed title + first part of content
-            embed_text = f"{title}\n\n{content[:8000]}"
-            embedding = generate_embedding(embed_text)
+        if not generate_embedding_flag:
+            embedding = None
+        elif embedding is None:
+            embedding = generate_embedding(document_embedding_text(title, content))
         
         query = """
             INSERT INTO documents (title, content, path, content_hash, doc_type, description, source_url, embedding)
@@ -229,8 +981,165 @@ class SkillRegistry:
         
         with get_cursor() as cur:
             cur.execute(query, (title, content, path, doc_hash, doc_type, description, source_url, embedding))
-            result = cur.fetchone()
-            return str(result["id"])
+            doc_id = str(cur.fetchone()["id"])
+            if generate_embedding_flag and DOCUMENT_CHUNKS_ENABLED:
+                self._sync_document_chunks(cur, [(doc_id, content)])
+            self._wrote()
+            return doc_id
+    
+    def bulk_upsert_documents(
+        self,
+        documents: List[Dict],
+        force: bool = False,
+        generate_embedding_flag: bool = True
+    ) -> Dict[str, str]:
+        """
+        Insert or update many documents at once.
+        
+        Each item takes the same fields as `upsert_document`. Existing
+        content hashes are fetched in one query; unchanged documents are
+        skipped unless `force` is set. Changed documents are embedded in
+        batches (except those given a precomputed "embedding") and written
+        with a single multi-row upsert.
+        
+        Returns a mapping of path to document ID for every input document.
+        """
+        documents = list({d["path"]: d for d in documents}.values())
+        if not documents:
+            return {}
+        
+        existing = execute_query(
+            "SELECT id, path, content_hash, embedding IS NOT NULL AS has_embedding "
+            "FROM documents WHERE path = ANY(%s)",
+            ([d["path"] for d in documents],)
+        )
+        existing_by_path = {r["path"]: r for r in existing}
+        
+        ids = {}
+        changed = []
+        for doc in documents:
+            doc_hash = content_hash(doc["content"])
+            current = existing_by_path.get(doc["path"])
+            if not force and current and _is_unchanged(current, doc_hash, generate_embedding_flag):
+                ids[doc["path"]] = str(current["id"])
+            else:
+                changed.append((doc, doc_hash))
+        
+        if not changed:
+            return ids
+        
+        embeddings = [None] * len(changed)
+        if generate_embedding_flag:
+            embeddings = [doc.get("embedding") for doc, _ in changed]
+            missing = [i for i, e in enumerate(embeddings) if e is None]
+            if missing:
+                computed = generate_embeddings_batch([
+                    document_embedding_text(changed[i][0]["title"], changed[i][0]["content"])
+                    for i in missing
+                ])
+                for i, embedding in zip(missing, computed):
+                    embeddings[i] = embedding
+        
+        rows = [
+            (
+                doc["title"], doc["content"], doc["path"], doc_hash,
+                doc.get("doc_type", "reference"), doc.get("description", ""),
+                doc.get("source_url", "No"), embedding
+            )
+            for (doc, doc_hash), embedding in zip(changed, embeddings)
+        ]
+        
+        with get_cursor() as cur:
+            results = execute_values(
+                cur,
+                """
+                INSERT INTO documents (title, content, path, content_hash, doc_type, description, source_url, embedding)
+                VALUES %s
+                ON CONFLICT (path) DO UPDATE SET
+                    title = EXCLUDED.title,
+                    content = EXCLUDED.content,
+                    content_hash = EXCLUDED.content_hash,
+                    doc_type = EXCLUDED.doc_type,
+                    description = EXCLUDED.description,
+                    source_url = EXCLUDED.source_url,
+                    embedding = EXCLUDED.embedding
+                RETURNING id, path
+                """,
+                rows,
+                template="(%s, %s, %s, %s, %s, %s, %s, %s::vector)",
+                fetch=True
+            )
+            written = {r["path"]: str(r["id"]) for r in results}
+            
+            if generate_embedding_flag and DOCUMENT_CHUNKS_ENABLED:
+                self._sync_document_chunks(
+                    cur,
+                    [(written[doc["path"]], doc["content"]) for doc, _ in changed]
+                )
+            self._wrote()
+        
+        ids.update(written)
+        return ids
+    
+    def _sync_document_chunks(self, cur, documents: List[Tuple[str, str]]) -> int:
+        """
+        Bring document_chunks in line with each (document ID, content).
+        
+        New chunks are matched to the document's existing chunks by hash.
+        Matches keep their embedding and only get a new ordinal and span;
+        the rest are embedded in one batch, and chunks no longer present
+        are deleted. An edit to one section of a long document therefore
+        re-embeds only the chunks it touched.
+        
+        Returns the number of chunks embedded.
+        """
+        if not documents:
+            return 0
+        
+        cur.execute(
+            "SELECT id, document_id, content_hash FROM document_chunks "
+            "WHERE document_id = ANY(%s::uuid[])",
+            ([doc_id for doc_id, _ in documents],)
+        )
+        kept, new, stale = _match_chunks(cur.fetchall(), documents)
+        
+        if stale:
+            cur.execute("DELETE FROM document_chunks WHERE id = ANY(%s::uuid[])", (stale,))
+        
+        if kept:
+            execute_values(
+                cur,
+                """
+                UPDATE document_chunks c SET
+                    ordinal = v.ordinal,
+                    start_offset = v.start_offset,
+                    end_offset = v.end_offset
+                FROM (VALUES %s) AS v(id, ordinal, start_offset, end_offset)
+                WHERE c.id = v.id
+                  AND (c.ordinal, c.start_offset, c.end_offset)
+                      IS DISTINCT FROM (v.ordinal, v.start_offset, v.end_offset)
+                """,
+                kept,
+                template="(%s::uuid, %s, %s, %s)"
+            )
+        
+        if new:
+            embeddings = generate_embeddings_batch([text for *_, text in new])
+            execute_values(
+                cur,
+                """
+                INSERT INTO document_chunks
+                    (document_id, ordinal, start_offset, end_offset, content_hash, embedding)
+                VALUES %s
+                """,
+                [
+                    (doc_id, ordinal, start, end, chunk_hash, embedding)
+                    for (doc_id, ordinal, start, end, chunk_hash, _), embedding in zip(new, embeddings)
+                ],
+                template="(%s::uuid, %s, %s, %s, %s, %s::vector)"
+            )
+        
+        return len(new)
     
     def get_document(self, path: str) -> Optional[Dict]:
         """Get a document by path."""
@@ -254,34 +1163,275 @@ class SkillRegistry:
             "FROM documents ORDER BY title"
         )
     
+    def delete_document(self, path: str) -> bool:
+        """Delete a document by path."""
+        with get_cursor() as cur:
+            cur.execute("DELETE FROM documents WHERE path = %s RETURNING id", (path,))
+            if cur.fetchone() is None:
+                return False
+            self._wrote()
+            return True
+    
+    def delete_documents(self, paths: List[str]) -> int:
+        """
+        Delete many documents by path in one statement.
+        
+        Their chunks and skill links are removed by cascade. Returns the
+        number deleted.
+        """
+        if not paths:
+            return 0
+        with get_cursor() as cur:
+            cur.execute("DELETE FROM documents WHERE path = ANY(%s)", (list(paths),))
+            if cur.rowcount:
+                self._wrote()
+            return cur.rowcount
+    
+    def rename_documents(self, renames: Dict[str, str]) -> int:
+        """
+        Move documents to new paths in one statement.
+        
+        `renames` maps old path to new path. The rows keep their ID,
+        embedding, chunks and skill links, so a moved file is not
+        re-embedded. Returns the number of documents moved.
+        
+        Paths may be swapped or chained (a -> b, b -> a): rows move to a
+        temporary path first, so the unique `path` constraint only sees
+        the final paths. A document still registered at a target path
+        that isn't itself moving away is replaced.
+        """
+        if not renames:
+            return 0
+        with get_cursor() as cur:
+            cur.execute(
+                "DELETE FROM documents WHERE path = ANY(%s) AND NOT path = ANY(%s)",
+                (list(renames.values()), list(renames))
+            )
+            if cur.rowcount:
+                self._wrote()
+            moved = execute_values(
+                cur,
+                """
+                UPDATE documents d SET path = '.renaming/' || d.id
+                FROM (VALUES %s) AS v(old_path, new_path)
+                WHERE d.path = v.old_path
+                RETURNING d.id, v.new_path
+                """,
+                list(renames.items()),
+                page_size=len(renames),
+                fetch=True
+            )
+            if moved:
+                execute_values(
+                    cur,
+                    """
+                    UPDATE documents d SET path = v.new_path
+                    FROM (VALUES %s) AS v(id, new_path)
+                    WHERE d.id = v.id::uuid
+                    """,
+                    [(str(r["id"]), r["new_path"]) for r in moved],
+                    page_size=len(moved)
+                )
+                self._wrote()
+            return len(moved)
+    
+    def existing_ids(self, skill_ids: List[str], document_ids: List[str]) -> set:
+        """Get the subset of the given skill and document IDs that still exist."""
+        rows = execute_query(
+            """
+            SELECT id::text AS id FROM skills WHERE id = ANY(%s::uuid[])
+            UNION ALL
+            SELECT id::text AS id FROM documents WHERE id = ANY(%s::uuid[])
+            """,
+            (list(skill_ids), list(document_ids))
+        )
+        return {r["id"] for r in rows}
+    
     def search_documents(
         self,
         query: str,
         threshold: float = 0.7,
-        limit: int = 10
+        limit: int = 10,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        mode: str = "vector"
+    ) -> List[Dict]:
+        """
+        Semantic search for documents.
+        
+        `ef_search` / `probes` tune the ANN index and `mode` selects vector
+        or hybrid ranking, as in `search_skills`.
+        """
+        if mode == "hybrid":
+            return self.search(
+                query, "docs", threshold, limit,
+                ef_search=ef_search, probes=probes, mode=mode
+            )["documents"]
+        
+        query_embedding = self._embed_query(query)
+        
+        candidates = _candidate_count(limit)
+        return self._vector_query(
+            SEARCH_DOCUMENTS_SQL,
+            {
+                "embedding": query_embedding,
+                "threshold": threshold,
+                "limit": limit,
+                "candidates": candidates
+            },
+            ef_search=ef_search,
+            probes=probes,
+            candidates=candidates
+        )
+    
+    def search_document_chunks(
+        self,
+        query: str,
+        threshold: float = 0.7,
+        limit: int = 10,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None
     ) -> List[Dict]:
-        """Semantic search for documents."""
-        query_embedding = generate_embedding(query)
+        """
+        Semantic search over document chunks, rolled up to documents.
         
-        # Direct query with proper vector casting
-        results = execute_query(
-            """
-            SELECT 
-                id,
-                title,
-                path,
-                doc_type,
-                1 - (embedding <=> %s::vector) AS similarity
-            FROM documents
-            WHERE embedding IS NOT NULL
-              AND 1 - (embedding <=> %s::vector) > %s
-            ORDER BY embedding <=> %s::vector
-            LIMIT %s
-            """,
-            (query_embedding, query_embedding, threshold, query_embedding, limit)
+        Long documents are matched on their best passage rather than one
+        averaged vector. Each result is a document, shaped like
+        `search_documents` results, plus the matching chunk's `ordinal`,
+        character span (`start_offset`, `end_offset`) and `excerpt`.
+        """
+        candidates = max(_candidate_count(limit), CHUNK_SEARCH_CANDIDATES)
+        return self._vector_query(
+            SEARCH_DOCUMENT_CHUNKS_SQL,
+            {
+                "embedding": self._embed_query(query),
+                "threshold": threshold,
+                "limit": limit,
+                "candidates": candidates
+            },
+            ef_search=ef_search,
+            probes=probes,
+            candidates=candidates
         )
+    
+    # -------------------------------------------------------------------------
+    # Unified Search
+    # -------------------------------------------------------------------------
+    
+    def search(
+        self,
+        query: str,
+        search_type: str = "all",
+        threshold: float = 0.7,
+        limit: int = 10,
+        skill_threshold: Optional[float] = None,
+        skill_limit: Optional[int] = None,
+        doc_threshold: Optional[float] = None,
+        doc_limit: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        mode: str = "vector"
+    ) -> Dict[str, List[Dict]]:
+        """
+        Semantic search across skills and documents in one round-trip.
+        
+        The query is embedded once and both tables are searched by a single
+        UNION ALL query. Each type keeps its own threshold and limit,
+        defaulting to `threshold` and `limit`.
         
-        return [dict(r) for r in results]
+        Args:
+            query: Natural language search query
+            search_type: "skills", "docs", or "all"
+            threshold: Default minimum similarity score (0-1)
+            limit: Default maximum number of results per type
+            ef_search: HNSW candidate list size for this query
+            probes: ivfflat lists to probe for this query
+            mode: "vector" ranks by cosine similarity. "hybrid" fuses the
+                vector ranking with full-text rank (reciprocal rank fusion),
+                so exact terms like function names or error strings match
+                even with low similarity; thresholds are not applied, and
+                each result also carries its fused `score`.
+            
+        Returns:
+            {"skills": [...], "documents": [...]}, each ranked by similarity
+            (or fused score) and shaped like `search_skills` /
+            `search_documents` results
+        """
+        if mode == "hybrid":
+            return self._hybrid_search(query, search_type, limit, skill_limit, doc_limit, ef_search, probes)
+        if mode != "vector":
+            raise ValueError(f"Unknown search mode: {mode}")
+        
+        branches = []
+        skill_limit = limit if skill_limit is None else skill_limit
+        doc_limit = limit if doc_limit is None else doc_limit
+        params = {
+            "embedding": self._embed_query(query),
+            "skill_threshold": threshold if skill_threshold is None else skill_threshold,
+            "skill_limit": skill_limit,
+            "skill_candidates": _candidate_count(skill_limit),
+            "doc_threshold": threshold if doc_threshold is None else doc_threshold,
+            "doc_limit": doc_limit,
+            "doc_candidates": _candidate_count(doc_limit)
+        }
+        
+        if search_type in ("skills", "all"):
+            branches.append(UNIFIED_SKILLS_SQL)
+        if search_type in ("docs", "all"):
+            branches.append(UNIFIED_DOCUMENTS_SQL)
+        
+        if not branches:
+            return {"skills": [], "documents": []}
+        
+        rows = self._vector_query(
+            " UNION ALL ".join(branches) + " ORDER BY similarity DESC",
+            params,
+            ef_search=ef_search,
+            probes=probes,
+            candidates=max(params["skill_candidates"], params["doc_candidates"])
+        )
+        
+        return _split_search_rows(rows)
+    
+    def _hybrid_search(
+        self,
+        query: str,
+        search_type: str,
+        limit: int,
+        skill_limit: Optional[int],
+        doc_limit: Optional[int],
+        ef_search: Optional[int],
+        probes: Optional[int]
+    ) -> Dict[str, List[Dict]]:
+        """Reciprocal rank fusion of vector and full-text search in one query."""
+        skill_limit = limit if skill_limit is None else skill_limit
+        doc_limit = limit if doc_limit is None else doc_limit
+        params = {
+            "embedding": self._embed_query(query),
+            "query": query,
+            "rrf_k": RRF_K,
+            "skill_limit": skill_limit,
+            "skill_candidates": _hybrid_candidate_count(skill_limit),
+            "doc_limit": doc_limit,
+            "doc_candidates": _hybrid_candidate_count(doc_limit)
+        }
+        
+        branches = []
+        if search_type in ("skills", "all"):
+            branches.append(HYBRID_SKILLS_SQL)
+        if search_type in ("docs", "all"):
+            branches.append(HYBRID_DOCUMENTS_SQL)
+        if not branches:
+            return {"skills": [], "documents": []}
+        
+        rows = self._vector_query(
+            " UNION ALL ".join(branches) + " ORDER BY score DESC",
+            params,
+            ef_search=ef_search,
+            probes=probes,
+            candidates=max(params["skill_candidates"], params["doc_candidates"])
+        )
+        return _split_search_rows(rows)
     
     # -------------------------------------------------------------------------
     # Skill-Document Links
@@ -301,10 +1451,33 @@ class SkillRegistry:
                 VALUES (%s, %s, %s)
                 ON CONFLICT (skill_id, document_id) DO UPDATE SET
                     relevance = EXCLUDED.relevance
+                WHERE skill_sources.relevance IS DISTINCT FROM EXCLUDED.relevance
                 """,
                 (skill_id, document_id, relevance)
             )
     
+    def bulk_link_skills_to_documents(
+        self,
+        links: List[Tuple[str, str, float]]
+    ) -> None:
+        """Link many (skill_id, document_id, relevance) pairs in one statement."""
+        links = list({(s, d): (s, d, r) for s, d, r in links}.values())
+        if not links:
+            return
+        
+        with get_cursor() as cur:
+            execute_values(
+                cur,
+                """
+                INSERT INTO skill_sources (skill_id, document_id, relevance)
+                VALUES %s
+                ON CONFLICT (skill_id, document_id) DO UPDATE SET
+                    relevance = EXCLUDED.relevance
+                WHERE skill_sources.relevance IS DISTINCT FROM EXCLUDED.relevance
+                """,
+                links
+            )
+    
     def get_skill_sources(self, skill_id: str) -> List[Dict]:
         """Get all source documents for a skill."""
         return execute_query(
@@ -383,6 +1556,7 @@ class SkillRegistry:
             "SELECT COUNT(*) as count FROM documents WHERE embedding IS NOT NULL"
         )[0]["count"]
         
+        chunks = execute_query("SELECT COUNT(*) as count FROM document_chunks")[0]["count"]
         links = execute_query("SELECT COUNT(*) as count FROM skill_sources")[0]["count"]
         
         return {
@@ -390,10 +1564,114 @@ class SkillRegistry:
             "skills_with_embedding": skills_with_embedding,
             "documents": documents,
             "documents_with_embedding": documents_with_embedding,
+            "document_chunks": chunks,
             "skill_document_links": links
         }
 
 
+def _split_search_rows(rows: List[Dict]) -> Dict[str, List[Dict]]:
+    """Split unified search rows by `kind` into skill and document results."""
+    results = {"skills": [], "documents": []}
+    for r in rows:
+        if r["kind"] == "skill":
+            result = {
+                "id": r["id"],
+                "name": r["title"],
+                "description": r["description"],
+                "path": r["path"],
+                "similarity": r["similarity"]
+            }
+            results["skills"].append(result)
+        else:
+            result = {
+                "id": r["id"],
+                "title": r["title"],
+                "path": r["path"],
+                "doc_type": r["doc_type"],
+                "similarity": r["similarity"]
+            }
+            results["documents"].append(result)
+        if "score" in r:
+            result["score"] = float(r["score"])
+    return results
+
+
+def _match_chunks(
+    existing_rows: List[Dict],
+    documents: List[Tuple[str, str]]
+) -> Tuple[List[Tuple], List[Tuple], List[str]]:
+    """
+    Match each document's chunks against its stored chunks by hash.
+    
+    `existing_rows` are stored chunks with `id`, `document_id` and
+    `content_hash`; `documents` are (document ID, content) pairs.
+    
+    Returns (kept, new, stale): kept chunks as (chunk ID, ordinal, start,
+    end), chunks to embed as (document ID, ordinal, start, end, hash,
+    text), and IDs of stored chunks that no longer occur.
+    """
+    existing = defaultdict(list)
+    for r in existing_rows:
+        existing[(str(r["document_id"]), r["content_hash"])].append(str(r["id"]))
+    
+    kept = []
+    new = []
+    for doc_id, content in documents:
+        for ordinal, (start, end) in enumerate(chunk_spans(content)):
+            chunk_hash = content_hash(content[start:end])
+            matches = existing.get((doc_id, chunk_hash))
+            if matches:
+                kept.append((matches.pop(), ordinal, start, end))
+            else:
+                new.append((doc_id, ordinal, start, end, chunk_hash, content[start:end]))
+    
+    stale = [chunk_id for chunk_ids in existing.values() for chunk_id in chunk_ids]
+    return kept, new, stale
+
+
+def open_registry(**kwargs):
+    """
+    Open the registry backend selected by DATABASE_URL.
+    
+    `sqlite:///path/to/registry.db` opens the embedded backend
+    (`EmbeddedSkillRegistry`); any other URL connects to Postgres.
+    Keyword arguments are passed to the registry constructor.
+    """
+    from .embedded_registry import EmbeddedSkillRegistry, sqlite_path_from_url
+    
+    path = sqlite_path_from_url(DATABASE_URL)
+    if path is not None:
+        return EmbeddedSkillRegistry(path, **kwargs)
+    return SkillRegistry(**kwargs)
+
+
+def _skill_hash(
+    name: str,
+    description: str,
+    content: str,
+    path: str,
+    version: str,
+    author: Optional[str]
+) -> str:
+    """Hash every stored skill field, so any change triggers an update."""
+    return content_hash("\x1f".join([
+        name, description or "", content, path, version or "", author or ""
+    ]))
+
+
+def document_embedding_text(title: str, content: str) -> str:
+    """The text a document's embedding is computed from: its title and the start of its content."""
+    return f"{title}\n\n{content[:8000]}"
+
+
+def _is_unchanged(existing: Dict, new_hash: str, needs_embedding: bool) -> bool:
+    """Whether a stored row matches `new_hash` and has the embedding it needs."""
+    return (
+        existing["content_hash"] == new_hash
+        and (existing["has_embedding"] or not needs_embedding)
+    )
+
+
 def parse_skill_frontmatter(content: str) -> Dict[str, Any]:
     """
     Parse YAML frontmatter from skill content.
@@ -17,13 +17,12 @@ import argparse
 from pathlib import Path
 
 from .config import SKILLS_DIR, DOCS_DIR
-from .registry import SkillRegistry, parse_skill_frontmatter, extract_title_from_markdown
-from .db import execute_query
+from .registry import open_registry, parse_skill_frontmatter, extract_title_from_markdown
 
 
 def reindex_skill(skill_name: str):
     """Re-index a single skill."""
-    registry = SkillRegistry()
+    registry = open_registry()
     
     skill_dir = SKILLS_DIR / skill_name
     skill_file = skill_dir / "SKILL.md"
@@ -46,7 +45,8 @@ def reindex_skill(skill_name: str):
         content=content,
         path=str(skill_file.relative_to(SKILLS_DIR.parent)),
         version="1.0.0",
-        generate_embedding_flag=True
+        generate_embedding_flag=True,
+        force=True
     )
     
     print(f"✓ Re-indexed: {name} (ID: {skill_id[:8]}...)")
@@ -55,7 +55,7 @@ def reindex_skill(skill_name: str):
 
 def reindex_document(doc_path: str):
     """Re-index a single document."""
-    registry = SkillRegistry()
+    registry = open_registry()
     
     # Support both absolute and relative paths
     if doc_path.startswith("docs/"):
@@ -89,7 +89,8 @@ def reindex_document(doc_path: str):
         doc_type=doc_type,
         description=description,
         source_url=source_url,
-        generate_embedding_flag=True
+        generate_embedding_flag=True,
+        force=True
     )
     
     print(f"✓ Re-indexed: {name} (ID: {doc_id[:8]}...)")
@@ -98,7 +99,7 @@ def reindex_document(doc_path: str):
 
 def delete_skill(skill_name: str):
     """Delete a single skill."""
-    registry = SkillRegistry()
+    registry = open_registry()
     
     print(f"Deleting skill: {skill_name}")
     
@@ -112,15 +113,11 @@ def delete_skill(skill_name: str):
 
 def delete_document(doc_path: str):
     """Delete a single document."""
-    print(f"Deleting document: {doc_path}")
+    registry = open_registry()
     
-    result = execute_query(
-        "DELETE FROM documents WHERE path = %s RETURNING id",
-        (doc_path,),
-        fetch=True
-    )
+    print(f"Deleting document: {doc_path}")
     
-    if result:
+    if registry.delete_document(doc_path):
         print(f"✓ Deleted: {doc_path}")
         return True
     else:
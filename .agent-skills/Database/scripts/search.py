@@ -6,19 +6,34 @@ Usage:
     python scripts/search.py "how to design agent tools"
     python scripts/search.py "context optimization" --type skills --limit 5
     python scripts/search.py "memory systems" --type docs --threshold 0.6
+    python scripts/search.py "tool design" --ef-search 100
+    python scripts/search.py "get_cursor rollback" --mode hybrid
+    python scripts/search.py "ivfflat probes" --type docs --chunks
+
+When a search server (search_server.py) is running, the query is sent to
+it instead of opening the registry in this process; --no-server forces a
+local search.
 """
 
 import argparse
 import sys
 import json
 
-from .registry import SkillRegistry
+from .search_client import SearchClient
+
+
+def format_score(result: dict) -> str:
+    """Similarity, or fused score plus similarity for hybrid results."""
+    similarity = "-" if result["similarity"] is None else f"{result['similarity']:.3f}"
+    if "score" in result:
+        return f"{result['score']:.4f} | sim {similarity}"
+    return similarity
 
 
 def format_skill_result(skill: dict) -> str:
     """Format a skill search result for display."""
     return (
-        f"\n  [{skill['similarity']:.3f}] {skill['name']}\n"
+        f"\n  [{format_score(skill)}] {skill['name']}\n"
         f"           {skill['description'][:80]}...\n"
         f"           Path: {skill['path']}"
     )
@@ -26,11 +41,54 @@ def format_skill_result(skill: dict) -> str:
 
 def format_document_result(doc: dict) -> str:
     """Format a document search result for display."""
-    return (
-        f"\n  [{doc['similarity']:.3f}] {doc['title']}\n"
+    lines = (
+        f"\n  [{format_score(doc)}] {doc['title']}\n"
         f"           Type: {doc['doc_type']}\n"
         f"           Path: {doc['path']}"
     )
+    if "excerpt" in doc:
+        excerpt = " ".join(doc["excerpt"].split())
+        lines += f"\n           Chunk {doc['ordinal']}: {excerpt[:120]}..."
+    return lines
+
+
+def run_search(call, args) -> dict:
+    """
+    Run the searches the arguments ask for.
+    
+    `call(method, **params)` invokes a registry method, either on a
+    search server or on a local registry.
+    """
+    # One embedding and one query, whatever the search type
+    search_type = args.type
+    if args.chunks:
+        # Documents come from the chunk search below
+        search_type = {"all": "skills", "docs": None}.get(search_type, search_type)
+    results = {"skills": [], "documents": []}
+    if search_type:
+        results = call(
+            "search",
+            query=args.query,
+            search_type=search_type,
+            threshold=args.threshold,
+            limit=args.limit,
+            ef_search=args.ef_search,
+            probes=args.probes,
+            mode=args.mode
+        )
+    
+    # Chunk search shares the cached query embedding
+    if args.chunks and args.type in ("docs", "all"):
+        results["documents"] = call(
+            "search_document_chunks",
+            query=args.query,
+            threshold=args.threshold,
+            limit=args.limit,
+            ef_search=args.ef_search,
+            probes=args.probes
+        )
+    
+    return results
 
 
 def main():
@@ -59,33 +117,57 @@ def main():
         default=0.7,
         help="Minimum similarity threshold (0-1)"
     )
+    parser.add_argument(
+        "--mode",
+        choices=["vector", "hybrid"],
+        default="vector",
+        help="Rank by vector similarity, or fuse with full-text rank (ignores --threshold)"
+    )
+    parser.add_argument(
+        "--chunks",
+        action="store_true",
+        help="Match documents by their best chunk and show the matching passage"
+    )
+    parser.add_argument(
+        "--ef-search",
+        type=int,
+        default=None,
+        help="HNSW candidate list size (higher = better recall, slower)"
+    )
+    parser.add_argument(
+        "--probes",
+        type=int,
+        default=None,
+        help="ivfflat lists to probe (higher = better recall, slower)"
+    )
     parser.add_argument(
         "--json",
         action="store_true",
         help="Output results as JSON"
     )
+    parser.add_argument(
+        "--no-server",
+        action="store_true",
+        help="Search in this process even if a search server is running"
+    )
     
     args = parser.parse_args()
     
-    registry = SkillRegistry()
-    
-    results = {"skills": [], "documents": []}
-    
-    if args.type in ["skills", "all"]:
-        skills = registry.search_skills(
-            args.query,
-            threshold=args.threshold,
-            limit=args.limit
-        )
-        results["skills"] = skills
+    results = None
+    if not args.no_server:
+        client = SearchClient()
+        try:
+            results = run_search(client.call, args)
+        except OSError:
+            pass  # No server running
+        finally:
+            client.close()
     
-    if args.type in ["docs", "all"]:
-        docs = registry.search_documents(
-            args.query,
-            threshold=args.threshold,
-            limit=args.limit
-        )
-        results["documents"] = docs
+    if results is None:
+        from .registry import open_registry
+        
+        registry = open_registry()
+        results = run_search(lambda method, **params: getattr(registry, method)(**params), args)
     
     if args.json:
         # Convert UUIDs to strings for JSON serialization
@@ -98,7 +180,10 @@ def main():
     
     # Human-readable output
     print(f"\nSearch: \"{args.query}\"")
-    print(f"Threshold: {args.threshold}, Limit: {args.limit}")
+    if args.mode == "hybrid":
+        print(f"Mode: hybrid (RRF), Limit: {args.limit}")
+    else:
+        print(f"Threshold: {args.threshold}, Limit: {args.limit}")
     
     if results["skills"]:
         print(f"\n{'='*60}")
@@ -0,0 +1,93 @@
+"""
+Client for the resident search service (search_server.py).
+
+Deliberately imports nothing but the standard library and config, so a
+lookup through a running server skips loading NumPy, psycopg2 and the
+embedding client altogether.
+"""
+
+import json
+import socket
+from pathlib import Path
+from typing import Any, Optional
+
+from .config import SEARCH_SOCKET_PATH
+
+
+class SearchServerError(Exception):
+    """The server ran the request and reported an error."""
+
+
+class SearchClient:
+    """
+    Calls registry methods on a running search server.
+
+        with SearchClient() as client:
+            results = client.call("search", query="tool design", limit=5)
+
+    The connection is opened on the first call and reused.
+    """
+
+    def __init__(self, socket_path: Path = SEARCH_SOCKET_PATH, timeout: Optional[float] = 30.0):
+        self.socket_path = Path(socket_path)
+        self.timeout = timeout
+        self._sock = None
+        self._reader = None
+
+    def _connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(str(self.socket_path))
+        except OSError:
+            sock.close()
+            raise
+        self._sock = sock
+        self._reader = sock.makefile("rb")
+
+    def call(self, method: str, **params) -> Any:
+        """
+        Run a registry method on the server and return its result.
+
+        Raises ConnectionError if no server is reachable and
+        SearchServerError if the method failed on the server.
+        """
+        if self._sock is None:
+            self._connect()
+
+        request = json.dumps({"method": method, "params": params}).encode("utf-8") + b"\n"
+        self._sock.sendall(request)
+        line = self._reader.readline()
+        if not line:
+            self.close()
+            raise ConnectionError("Search server closed the connection")
+
+        response = json.loads(line)
+        if "error" in response:
+            raise SearchServerError(response["error"])
+        return response["result"]
+
+    def close(self) -> None:
+        """Close the connection."""
+        if self._sock is not None:
+            self._reader.close()
+            self._sock.close()
+            self._sock = None
+            self._reader = None
+
+    def __enter__(self) -> "SearchClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def server_available(socket_path: Path = SEARCH_SOCKET_PATH) -> bool:
+    """Whether a search server is accepting connections on `socket_path`."""
+    if not Path(socket_path).exists():
+        return False
+    try:
+        with SearchClient(socket_path, timeout=1.0) as client:
+            return client.call("ping") == "pong"
+    except (OSError, ValueError, SearchServerError):
+        return False
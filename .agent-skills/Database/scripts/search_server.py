@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Resident search service for the Knowledge Registry.
+
+Keeps one registry open - connection pool, embedding client, query
+embedding cache - and serves requests over a Unix socket, so agents pay
+the import, connect and warm-up cost once instead of on every lookup.
+
+Usage:
+    python -m scripts.search_server                      # Serve on SEARCH_SOCKET_PATH
+    python -m scripts.search_server --socket /tmp/registry.sock --workers 8
+
+Protocol: one JSON object per line in each direction.
+
+    -> {"method": "search", "params": {"query": "tool design", "limit": 5}}
+    <- {"result": {"skills": [...], "documents": [...]}}
+    <- {"error": "Unknown method: drop_tables"}
+
+A connection can send any number of requests; responses come back in
+order. `search.py` uses the service automatically when it is running
+(see search_client.py).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict
+
+import numpy as np
+
+from .config import SEARCH_SOCKET_PATH, DB_POOL_MAX_SIZE
+from .registry import open_registry
+
+
+# Registry methods exposed over the socket
+METHODS = (
+    "search",
+    "search_skills",
+    "search_documents",
+    "search_document_chunks",
+    "find_related_skills",
+    "find_related_skills_batch",
+    "get_skill",
+    "get_document",
+    "list_skills",
+    "list_documents",
+    "upsert_skill",
+    "upsert_document",
+    "get_stats",
+    "query_cache_stats",
+)
+
+# Largest request line accepted (upserts carry whole documents)
+MAX_REQUEST_BYTES = 64 * 1024 * 1024
+
+# Parameters that arrive as JSON lists but are vectors to the registry
+VECTOR_PARAMS = ("embedding", "embeddings")
+
+
+def _json_default(value: Any) -> Any:
+    """Encode the non-JSON types registry results contain."""
+    if isinstance(value, (uuid.UUID, datetime, date)):
+        return str(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode_message(message: Dict) -> bytes:
+    """Serialize one protocol message as a JSON line."""
+    return json.dumps(message, default=_json_default).encode("utf-8") + b"\n"
+
+
+class SearchServer:
+    """
+    Serves registry methods over a Unix socket.
+
+    Registry calls block (database and embedding API), so they run on a
+    thread pool sized like the connection pool; the event loop only
+    parses requests and writes responses, and many clients can be
+    served at once.
+    """
+
+    def __init__(self, registry, socket_path: Path = SEARCH_SOCKET_PATH, workers: int = DB_POOL_MAX_SIZE):
+        self.registry = registry
+        self.socket_path = Path(socket_path)
+        self.started_at = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="registry")
+        self._loop = None
+        self._stopped = None
+
+    async def serve(self) -> None:
+        """Listen until `stop` is called."""
+        self._claim_socket()
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+
+        server = await asyncio.start_unix_server(
+            self._handle_connection, path=str(self.socket_path), limit=MAX_REQUEST_BYTES
+        )
+        os.chmod(self.socket_path, 0o600)
+        try:
+            async with server:
+                await self._stopped.wait()
+        finally:
+            self._executor.shutdown(wait=True)
+            self.socket_path.unlink(missing_ok=True)
+
+    def stop(self) -> None:
+        """Stop accepting requests and shut down. Safe to call from any thread."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stopped.set)
+
+    def _claim_socket(self) -> None:
+        """Remove a stale socket file, or fail if another server owns it."""
+        if not self.socket_path.exists():
+            self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(str(self.socket_path))
+        except OSError:
+            self.socket_path.unlink()
+        else:
+            raise RuntimeError(f"A search server is already listening on {self.socket_path}")
+        finally:
+            probe.close()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Line over MAX_REQUEST_BYTES; the stream can't be resynchronized
+                    writer.write(encode_message({"error": "Request too large"}))
+                    break
+                if not line:
+                    break
+                response = await self._dispatch(line)
+                try:
+                    data = encode_message(response)
+                except TypeError as e:
+                    data = encode_message({"error": f"TypeError: {e}"})
+                writer.write(data)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, line: bytes) -> Dict:
+        """Run one request and build its response."""
+        started = time.perf_counter()
+        self.requests += 1
+        try:
+            request = json.loads(line)
+            method = request.get("method")
+            params = request.get("params") or {}
+
+            if method == "ping":
+                return {"result": "pong"}
+            if method == "server_stats":
+                return {"result": self.stats()}
+            if method not in METHODS:
+                raise ValueError(f"Unknown method: {method}")
+            for name in VECTOR_PARAMS:
+                if params.get(name) is not None:
+                    params[name] = np.asarray(params[name], dtype=np.float32)
+
+            call = partial(getattr(self.registry, method), **params)
+            result = await asyncio.get_running_loop().run_in_executor(self._executor, call)
+            return {"result": result}
+        except Exception as e:
+            self.errors += 1
+            return {"error": f"{type(e).__name__}: {e}"}
+        finally:
+            self.busy_seconds += time.perf_counter() - started
+
+    def stats(self) -> Dict:
+        """Get request counts and timings since startup."""
+        return {
+            "uptime_seconds": time.time() - self.started_at,
+            "requests": self.requests,
+            "errors": self.errors,
+            "mean_ms": self.busy_seconds * 1000 / self.requests if self.requests else 0.0,
+            "query_cache": self.registry.query_cache_stats()
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve registry searches from a long-lived process"
+    )
+    parser.add_argument(
+        "--socket",
+        type=Path,
+        default=SEARCH_SOCKET_PATH,
+        help="Unix socket path to listen on"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DB_POOL_MAX_SIZE,
+        help="Registry calls run concurrently (match the connection pool size)"
+    )
+    args = parser.parse_args()
+
+    print("Connecting to database...")
+    registry = open_registry()
+
+    server = SearchServer(registry, socket_path=args.socket, workers=args.workers)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, server.stop)
+        await server.serve()
+
+    print(f"Serving on {args.socket} (Ctrl+C to stop)")
+    try:
+        asyncio.run(run())
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        return 1
+
+    print(f"Stopped after {server.requests} requests")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
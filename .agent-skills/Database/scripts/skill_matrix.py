@@ -0,0 +1,86 @@
+"""
+In-memory matrix of skill embeddings for related-skill scoring.
+
+The skill set is small (tens to thousands of rows), so `SkillRegistry`
+keeps every skill embedding in one L2-normalized float32 matrix and
+scores documents against it without a database round-trip: one
+matrix-vector product per document, or one matrix-matrix product for a
+batch, with an `argpartition` top-k. Scores are exact cosine
+similarities, whatever the ANN index settings.
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize each row of a 2-D array; zero rows are left as they are."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1)
+
+
+class SkillMatrix:
+    """
+    Skill IDs, names and normalized embeddings, row-aligned.
+
+        matrix = SkillMatrix.from_rows(rows)    # rows: id, name, embedding
+        matrix.related(embeddings, threshold=0.7, limit=5)
+
+    Immutable once built; the registry swaps in a new one when skills change.
+    """
+
+    def __init__(self, ids: Sequence[str], names: Sequence[str], embeddings: np.ndarray):
+        self.ids = list(ids)
+        self.names = list(names)
+        self.embeddings = normalize_rows(embeddings)
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Dict], dimension: int) -> "SkillMatrix":
+        """Build from rows with `id`, `name` and `embedding` (as returned with pgvector registered)."""
+        embeddings = np.empty((len(rows), dimension), dtype=np.float32)
+        for i, r in enumerate(rows):
+            embeddings[i] = r["embedding"]
+        return cls([str(r["id"]) for r in rows], [r["name"] for r in rows], embeddings)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def related(
+        self,
+        embeddings: np.ndarray,
+        threshold: float = 0.7,
+        limit: Optional[int] = None
+    ) -> List[List[Dict]]:
+        """
+        Score each embedding (one per row) against every skill.
+
+        Returns, per embedding, the skills with similarity above
+        `threshold`, best first, at most `limit` of them (all if None), as
+        `{"skill_id", "skill_name", "similarity"}` dicts like
+        `find_related_skills`.
+        """
+        queries = normalize_rows(np.atleast_2d(embeddings))
+        if not self.ids or (limit is not None and limit < 1):
+            return [[] for _ in queries]
+
+        scores = queries @ self.embeddings.T
+        if limit is not None and limit < len(self.ids):
+            top = np.argpartition(-scores, limit - 1, axis=1)[:, :limit]
+        else:
+            top = np.broadcast_to(np.arange(len(self.ids)), scores.shape)
+
+        results = []
+        for row_scores, row_top in zip(scores, top):
+            row_top = row_top[row_scores[row_top] > threshold]
+            row_top = row_top[np.argsort(-row_scores[row_top], kind="stable")]
+            results.append([
+                {
+                    "skill_id": self.ids[i],
+                    "skill_name": self.names[i],
+                    "similarity": float(row_scores[i])
+                }
+                for i in row_top
+            ])
+        return results
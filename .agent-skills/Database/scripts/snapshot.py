@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Export and import the whole registry, embeddings included.
+
+Usage:
+    python -m scripts.snapshot export .cache/snapshot        # Dump to a directory
+    python -m scripts.snapshot import .cache/snapshot        # Merge into this database
+    python -m scripts.snapshot import .cache/snapshot --replace  # Wipe, then load
+
+A snapshot is a directory with one Postgres binary COPY file per table
+(`skills.copy`, `documents.copy`, ...) and a `manifest.json` recording
+the column lists, row counts, embedding model and dimension. Vectors are
+copied in pgvector's binary format, so moving a registry between
+databases (local Docker -> Supabase, or seeding a test database) never
+calls the embedding API.
+
+Export reads every table in one REPEATABLE READ transaction, so the
+snapshot is consistent. Import runs in one transaction: merging upserts
+by primary key (a row with the same skill name or document path but a
+different ID is replaced), while `--replace` truncates the registry,
+drops the vector indexes, loads with plain COPY and rebuilds the indexes.
+Postgres only; the embedded backend has no COPY.
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List
+
+from psycopg2 import sql
+
+from .config import DATABASE_URL, EMBEDDING_MODEL, EMBEDDING_DIMENSION
+from .db import transaction
+from .embedded_registry import sqlite_path_from_url
+from .vector_index import VECTOR_INDEXES
+
+
+SNAPSHOT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+
+# Load order: rows before the rows that reference them
+SNAPSHOT_TABLES = (
+    "skills",
+    "documents",
+    "document_chunks",
+    "skill_sources",
+    "skill_versions",
+    "skill_references",
+)
+
+_PRIMARY_KEYS = {
+    "skills": ("id",),
+    "documents": ("id",),
+    "document_chunks": ("id",),
+    "skill_sources": ("skill_id", "document_id"),
+    "skill_versions": ("id",),
+    "skill_references": ("id",),
+}
+
+# A target row with the same natural key but a different ID is replaced
+_NATURAL_KEYS = {
+    "skills": "name",
+    "documents": "path",
+}
+
+
+def _check_postgres() -> None:
+    if sqlite_path_from_url(DATABASE_URL) is not None:
+        raise ValueError("Snapshots use Postgres COPY; the embedded backend is not supported")
+
+
+def _copy_columns(cur, table: str) -> List[str]:
+    """Columns COPY can read and write: all but generated ones."""
+    cur.execute(
+        """
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = %s AND is_generated = 'NEVER'
+        ORDER BY ordinal_position
+        """,
+        (table,)
+    )
+    return [r["column_name"] for r in cur.fetchall()]
+
+
+def _copy_statement(table: str, columns: List[str], direction: str) -> sql.Composed:
+    return sql.SQL("COPY {} ({}) {} WITH (FORMAT binary)").format(
+        sql.Identifier(table),
+        sql.SQL(", ").join(map(sql.Identifier, columns)),
+        sql.SQL(direction)
+    )
+
+
+def read_manifest(directory: Path) -> Dict:
+    """Load and validate a snapshot's manifest."""
+    path = Path(directory) / MANIFEST_FILE
+    try:
+        manifest = json.loads(path.read_text())
+    except FileNotFoundError:
+        raise ValueError(f"No snapshot at {directory} (missing {MANIFEST_FILE})")
+    if manifest.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version: {manifest.get('version')}")
+    return manifest
+
+
+def export_registry(directory: Path) -> Dict:
+    """
+    Write every registry table to `directory` with binary COPY.
+
+    The manifest is written last, so an interrupted export is never
+    mistaken for a complete snapshot. Returns the manifest.
+    """
+    _check_postgres()
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / MANIFEST_FILE).unlink(missing_ok=True)
+
+    tables = {}
+    with transaction() as cur:
+        cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+        for table in SNAPSHOT_TABLES:
+            columns = _copy_columns(cur, table)
+            file = directory / f"{table}.copy"
+            with open(file, "wb") as f:
+                cur.copy_expert(_copy_statement(table, columns, "TO STDOUT").as_string(cur), f)
+            cur.execute(sql.SQL("SELECT COUNT(*) AS count FROM {}").format(sql.Identifier(table)))
+            tables[table] = {
+                "columns": columns,
+                "rows": cur.fetchone()["count"],
+                "bytes": file.stat().st_size
+            }
+
+    manifest = {
+        "version": SNAPSHOT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "embedding_model": EMBEDDING_MODEL,
+        "embedding_dimension": EMBEDDING_DIMENSION,
+        "tables": tables
+    }
+    (directory / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+def import_registry(directory: Path, replace: bool = False) -> Dict[str, int]:
+    """
+    Load a snapshot into the database in one transaction.
+
+    Merges into the existing registry, or with `replace` empties it
+    first. Raises ValueError if the snapshot was embedded with another
+    dimension or has columns this database lacks (run the migrations).
+
+    Returns rows loaded per table.
+    """
+    _check_postgres()
+    directory = Path(directory)
+    manifest = read_manifest(directory)
+    if manifest["embedding_dimension"] != EMBEDDING_DIMENSION:
+        raise ValueError(
+            f"Snapshot has {manifest['embedding_dimension']}-dimensional embeddings, "
+            f"but EMBEDDING_DIMENSION is {EMBEDDING_DIMENSION}"
+        )
+    if manifest["embedding_model"] != EMBEDDING_MODEL:
+        print(f"Warning: snapshot was embedded with {manifest['embedding_model']}, "
+              f"this registry uses {EMBEDDING_MODEL}")
+
+    loaded = {}
+    with transaction() as cur:
+        for table in SNAPSHOT_TABLES:
+            missing = set(manifest["tables"][table]["columns"]) - set(_copy_columns(cur, table))
+            if missing:
+                raise ValueError(f"{table} has no column(s) {', '.join(sorted(missing))}; run the migrations")
+
+        if replace:
+            indexes = _drop_vector_indexes(cur)
+            cur.execute(sql.SQL("TRUNCATE {}").format(
+                sql.SQL(", ").join(map(sql.Identifier, SNAPSHOT_TABLES))
+            ))
+            for table in SNAPSHOT_TABLES:
+                loaded[table] = _copy_in(cur, directory, table, table, manifest)
+            for definition in indexes:
+                cur.execute(definition)
+        else:
+            for table in SNAPSHOT_TABLES:
+                stage = f"_import_{table}"
+                cur.execute(sql.SQL("CREATE TEMP TABLE {} (LIKE {}) ON COMMIT DROP").format(
+                    sql.Identifier(stage), sql.Identifier(table)
+                ))
+                loaded[table] = _copy_in(cur, directory, table, stage, manifest)
+            for table in SNAPSHOT_TABLES:
+                _merge(cur, table, manifest["tables"][table]["columns"])
+
+    return loaded
+
+
+def _copy_in(cur, directory: Path, table: str, target: str, manifest: Dict) -> int:
+    """COPY one snapshot file into `target`; returns the rows it holds."""
+    info = manifest["tables"][table]
+    with open(directory / f"{table}.copy", "rb") as f:
+        cur.copy_expert(_copy_statement(target, info["columns"], "FROM STDIN").as_string(cur), f)
+    return info["rows"]
+
+
+def _drop_vector_indexes(cur) -> List[str]:
+    """Drop the ANN indexes before a bulk load; returns their definitions to rebuild."""
+    cur.execute(
+        "SELECT indexname, indexdef FROM pg_indexes "
+        "WHERE schemaname = current_schema() AND indexname = ANY(%s)",
+        (list(VECTOR_INDEXES.values()),)
+    )
+    rows = cur.fetchall()
+    for r in rows:
+        cur.execute(sql.SQL("DROP INDEX {}").format(sql.Identifier(r["indexname"])))
+    return [r["indexdef"] for r in rows]
+
+
+def _merge(cur, table: str, columns: List[str]) -> None:
+    """Upsert a staged table into the registry."""
+    stage = sql.Identifier(f"_import_{table}")
+    target = sql.Identifier(table)
+    keys = _PRIMARY_KEYS[table]
+
+    natural_key = _NATURAL_KEYS.get(table)
+    if natural_key:
+        cur.execute(sql.SQL(
+            "DELETE FROM {target} t USING {stage} s WHERE t.{key} = s.{key} AND t.id <> s.id"
+        ).format(target=target, stage=stage, key=sql.Identifier(natural_key)))
+    if table == "document_chunks":
+        # Chunks of an imported document are replaced wholesale
+        cur.execute(
+            "DELETE FROM document_chunks WHERE document_id IN (SELECT id FROM _import_documents)"
+        )
+
+    updates = [c for c in columns if c not in keys]
+    conflict = sql.SQL("DO UPDATE SET {}").format(sql.SQL(", ").join(
+        sql.SQL("{0} = EXCLUDED.{0}").format(sql.Identifier(c)) for c in updates
+    )) if updates else sql.SQL("DO NOTHING")
+    column_list = sql.SQL(", ").join(map(sql.Identifier, columns))
+    cur.execute(sql.SQL(
+        "INSERT INTO {target} ({columns}) SELECT {columns} FROM {stage} "
+        "ON CONFLICT ({keys}) {conflict}"
+    ).format(
+        target=target,
+        columns=column_list,
+        stage=stage,
+        keys=sql.SQL(", ").join(map(sql.Identifier, keys)),
+        conflict=conflict
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export or import the registry with binary COPY"
+    )
+    subparsers = parser.add_subparsers(dest="command", help="Command to run")
+
+    export_parser = subparsers.add_parser("export", help="Write a snapshot directory")
+    export_parser.add_argument("directory", type=Path, help="Snapshot directory")
+
+    import_parser = subparsers.add_parser("import", help="Load a snapshot directory")
+    import_parser.add_argument("directory", type=Path, help="Snapshot directory")
+    import_parser.add_argument(
+        "--replace",
+        action="store_true",
+        help="Delete every skill and document first instead of merging"
+    )
+
+    args = parser.parse_args()
+
+    if not args.command:
+        parser.print_help()
+        return 1
+
+    started = time.perf_counter()
+    try:
+        if args.command == "export":
+            manifest = export_registry(args.directory)
+            counts = {t: info["rows"] for t, info in manifest["tables"].items()}
+            size = sum(info["bytes"] for info in manifest["tables"].values())
+            print(f"Exported to {args.directory} ({size / 1e6:.1f} MB)")
+        else:
+            counts = import_registry(args.directory, replace=args.replace)
+            print(f"Imported {args.directory}" + (" (replaced)" if args.replace else ""))
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+    elapsed = time.perf_counter() - started
+
+    for table, rows in counts.items():
+        print(f"  {table}: {rows} rows")
+    total = sum(counts.values())
+    print(f"{total} rows in {elapsed:.2f}s ({total / elapsed if elapsed > 0 else 0:.0f} rows/sec)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,24 +2,49 @@
 """
 Test embedding generation and semantic search.
 
-Requires OPENAI_API_KEY to be set.
+Requires OPENAI_API_KEY to be set, unless EMBEDDING_MODEL selects a
+local provider (e.g. EMBEDDING_MODEL=local-hashing).
 """
 
 import sys
 import os
+import asyncio
+import json
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from scripts.registry import SkillRegistry
-from scripts.embeddings import generate_embedding, count_tokens
+from scripts.agent_integration import AgentKnowledgeInterface
+from scripts.embeddings import (
+    generate_embedding,
+    count_tokens,
+    content_hash,
+    chunk_text,
+    pool_embeddings,
+)
+from scripts.embedding_cache import EmbeddingCache
+from scripts.embedding_batcher import EmbeddingBatcher, pack_batches
+from scripts.embedding_providers import HashingProvider, OpenAIProvider, get_embedding_provider
+from scripts.db import execute_query
 from scripts.config import OPENAI_API_KEY
 
+# Local providers need no API key
+NEEDS_API_KEY = get_embedding_provider().remote and not OPENAI_API_KEY
+
 
 def test_embedding_generation():
     """Test basic embedding generation."""
     print("Testing embedding generation...")
     
-    if not OPENAI_API_KEY:
+    if NEEDS_API_KEY:
         print("  [FAIL] OPENAI_API_KEY not set")
         return False
     
@@ -27,9 +52,9 @@ def test_embedding_generation():
         text = "This is a test document about agent tools and context engineering."
         embedding = generate_embedding(text)
         
-        assert isinstance(embedding, list)
-        assert len(embedding) == 1536  # text-embedding-3-small dimension
-        assert all(isinstance(x, float) for x in embedding)
+        assert isinstance(embedding, np.ndarray)
+        assert embedding.shape == (1536,)  # text-embedding-3-small dimension
+        assert embedding.dtype == np.float32
         
         print(f"  [PASS] Generated embedding: {len(embedding)} dimensions")
         print(f"  [PASS] First 5 values: {embedding[:5]}")
@@ -62,11 +87,273 @@ def test_token_counting():
         return False
 
 
+def test_chunking():
+    """Test token-offset chunking with overlap."""
+    print("\nTesting chunking...")
+    
+    try:
+        paragraph = "Context engineering is the art and science of managing context windows. " * 20
+        text = "\n\n".join(f"## Section {i}\n\n{paragraph}" for i in range(50))
+        
+        assert chunk_text("Short text.") == ["Short text."]
+        
+        chunks = chunk_text(text, max_tokens=500, overlap=50)
+        assert len(chunks) > 1
+        assert all(count_tokens(c) <= 500 for c in chunks)
+        print(f"  [PASS] Split {count_tokens(text)} tokens into {len(chunks)} chunks of <= 500")
+        
+        assert all(c.endswith("\n\n") for c in chunks[:-1])
+        print("  [PASS] Chunks end on paragraph boundaries")
+        
+        # The tail of each chunk reappears at the head of the next one
+        assert all(chunks[i + 1][:40] in chunks[i] for i in range(len(chunks) - 1))
+        print("  [PASS] Consecutive chunks overlap")
+        
+        # CJK and emoji take several tokens per character; no chunk edge may split one
+        wide = "日本語のテキストを分割します😀🚀" * 400
+        wide_chunks = chunk_text(wide, max_tokens=97, overlap=13)
+        assert len(wide_chunks) > 1
+        assert not any("\ufffd" in c for c in wide_chunks)
+        assert all(c in wide for c in wide_chunks)
+        print(f"  [PASS] {len(wide_chunks)} multi-byte chunks split between characters")
+        
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Chunking failed: {e}")
+        return False
+
+
+def test_embedding_pooling():
+    """Test vectorized pooling of chunk embeddings."""
+    print("\nTesting embedding pooling...")
+    
+    try:
+        chunks = np.array([
+            [1.0, 0.0],   # text 0
+            [0.0, 1.0],   # text 1, chunk 1
+            [0.0, 3.0],   # text 1, chunk 2
+        ], dtype=np.float32)
+        
+        pooled = pool_embeddings(chunks, [0, 1], normalize=False)
+        assert pooled.dtype == np.float32
+        assert np.allclose(pooled, [[1.0, 0.0], [0.0, 2.0]])
+        print("  [PASS] Unweighted mean per text")
+        
+        pooled = pool_embeddings(chunks, [0, 1], weights=[1, 1, 3], normalize=False)
+        assert np.allclose(pooled[1], [0.0, 2.5])
+        print("  [PASS] Token-count weighted mean")
+        
+        pooled = pool_embeddings(chunks, [0, 1])
+        assert np.allclose(np.linalg.norm(pooled, axis=1), 1.0)
+        print("  [PASS] L2 re-normalization")
+        
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Embedding pooling failed: {e}")
+        return False
+
+
+def test_embedding_cache():
+    """Test the on-disk embedding cache (no API key required)."""
+    print("\nTesting embedding cache...")
+    
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = EmbeddingCache(Path(tmp) / "embeddings.sqlite", max_entries=2)
+            model, dim = "test-model", 3
+            h1, h2, h3 = (content_hash(t) for t in ("one", "two", "three"))
+            
+            assert cache.get_many(model, dim, [h1]) == [None]
+            cache.put_many(model, dim, [(h1, [0.5, 0.25, 1.0]), (h2, [1.0, 0.0, 0.0])])
+            assert cache.get_many(model, dim, [h1])[0].tolist() == [0.5, 0.25, 1.0]
+            assert cache.get_many("other-model", dim, [h1]) == [None]
+            print("  [PASS] Entries are keyed by model, dimension and content hash")
+            
+            # h2 is now least recently used and should be evicted
+            cache.put_many(model, dim, [(h3, [0.0, 1.0, 0.0])])
+            assert cache.get_many(model, dim, [h1, h2, h3])[1] is None
+            print("  [PASS] Least recently used entry evicted at max_entries")
+            
+            stats = cache.stats()
+            assert stats["entries"] == 2
+            assert stats["hits"] == 3 and stats["misses"] == 3
+            print(f"  [PASS] Stats: {stats}")
+        
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Embedding cache failed: {e}")
+        return False
+
+
+def test_local_embedding_provider():
+    """Test the offline hashed n-gram provider (no API key required)."""
+    print("\nTesting local embedding provider...")
+    
+    try:
+        provider = HashingProvider(dimension=256)
+        texts = [
+            "database connection pooling",
+            "connection pool for the database",
+            "chocolate cake recipe",
+        ]
+        vectors = provider.embed(texts)
+        assert vectors.shape == (3, 256) and vectors.dtype == np.float32
+        assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0, atol=1e-5)
+        assert np.array_equal(provider.embed(texts[:1])[0], vectors[0])
+        print("  [PASS] Deterministic, unit-length float32 vectors")
+        
+        similarity = vectors @ vectors.T
+        assert similarity[0, 1] > similarity[0, 2]
+        print(f"  [PASS] Related texts score higher ({similarity[0, 1]:.2f} vs {similarity[0, 2]:.2f})")
+        
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Local embedding provider failed: {e}")
+        return False
+
+
+@contextmanager
+def fake_openai_server(failures=()):
+    """
+    Local OpenAI-compatible /v1/embeddings endpoint.
+    
+    The first requests fail with the HTTP statuses in `failures`. Yields
+    the server state: successful requests' inputs, statuses sent and the
+    peak number of requests in flight.
+    """
+    state = {"failures": list(failures), "requests": [], "statuses": [], "in_flight": 0, "peak": 0}
+    lock = threading.Lock()
+    
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            with lock:
+                status = state["failures"].pop(0) if state["failures"] else 200
+                state["statuses"].append(status)
+                state["in_flight"] += 1
+                state["peak"] = max(state["peak"], state["in_flight"])
+            time.sleep(0.05)  # Long enough for concurrent requests to overlap
+            with lock:
+                state["in_flight"] -= 1
+                if status == 200:
+                    state["requests"].append(body["input"])
+            
+            if status == 200:
+                payload = {
+                    "object": "list",
+                    "model": body["model"],
+                    "data": [
+                        {"object": "embedding", "index": i, "embedding": fake_vector(text)}
+                        for i, text in enumerate(body["input"])
+                    ],
+                    "usage": {"prompt_tokens": 0, "total_tokens": 0}
+                }
+            else:
+                payload = {"error": {"message": f"status {status}", "type": "test", "code": None}}
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            if status == 429:
+                self.send_header("Retry-After", "0")
+            self.end_headers()
+            self.wfile.write(data)
+        
+        def log_message(self, *args):
+            pass
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    state["url"] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    try:
+        yield state
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def fake_vector(text):
+    return [float(len(text)), float(sum(map(ord, text)) % 97), 1.0, 0.0]
+
+
+def test_embedding_batcher():
+    """Test request packing, dedupe, concurrency and retries against a fake endpoint."""
+    print("\nTesting embedding batcher...")
+    
+    try:
+        assert pack_batches([5, 5, 5, 20, 1], token_budget=10, max_inputs=8) == [[0, 1], [2], [3], [4]]
+        assert pack_batches([1, 1, 1], token_budget=10, max_inputs=2) == [[0, 1], [2]]
+        print("  [PASS] Batches packed by token budget and input count")
+        
+        def no_counting(text):
+            raise AssertionError("known token counts should not be recounted")
+        
+        batcher = EmbeddingBatcher(None, no_counting, token_budget=10, max_inputs=8)
+        unique, inverse, tokens, batches = batcher.plan(["a", "b", "a", "c"], [5, 5, 5, 20])
+        assert unique == ["a", "b", "c"] and inverse == [0, 1, 0, 2]
+        assert tokens == [5, 5, 20] and batches == [[0, 1], [2]]
+        print("  [PASS] Known token counts reused without tokenizing")
+    except Exception as e:
+        print(f"  [FAIL] Batch packing failed: {e}")
+        return False
+    
+    try:
+        import openai  # noqa: F401
+    except ImportError:
+        print("  [SKIP] openai package not installed")
+        return True
+    
+    texts = [f"Document {i} about agent tool design and context windows." for i in range(24)]
+    texts += texts[:8]  # Duplicates are embedded once
+    expected = np.array([fake_vector(t) for t in texts], dtype=np.float32)
+    count_words = lambda text: len(text.split())  # Any token counter will do
+    budget = 4 * count_words(texts[0])
+    
+    try:
+        for mode in ("sync", "async"):
+            with fake_openai_server(failures=[429, 503]) as server:
+                provider = OpenAIProvider("text-embedding-3-small", 4, api_key="test", base_url=server["url"])
+                stats = {}
+                batcher = EmbeddingBatcher(
+                    provider, count_words, token_budget=budget, concurrency=3,
+                    backoff_base=0.01, stats=stats
+                )
+                if mode == "sync":
+                    vectors = batcher.embed(texts)
+                else:
+                    vectors = asyncio.run(batcher.aembed(texts))
+                
+                assert np.array_equal(vectors, expected), "vectors returned out of order"
+                sent = [text for request in server["requests"] for text in request]
+                assert sorted(sent) == sorted(set(texts)), "each distinct text should be sent once"
+                assert all(sum(map(count_words, r)) <= budget for r in server["requests"])
+                assert stats["retries"] == 2 and stats["duplicates"] == 8
+                assert 1 < server["peak"] <= 3, f"peak concurrency {server['peak']}"
+            print(f"  [PASS] {mode}: {stats['requests']} requests for {len(texts)} texts, "
+                  f"{stats['retries']} retried (429, 503), up to {server['peak']} in flight")
+        
+        with fake_openai_server(failures=[400]) as server:
+            provider = OpenAIProvider("text-embedding-3-small", 4, api_key="test", base_url=server["url"])
+            try:
+                EmbeddingBatcher(provider, count_words, backoff_base=0.01).embed(texts[:1])
+                raise AssertionError("400 should not be retried")
+            except openai.BadRequestError:
+                pass
+            assert server["statuses"] == [400]
+        print("  [PASS] Client errors fail without retrying")
+        
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Embedding batcher failed: {e}")
+        return False
+
+
 def test_semantic_search_with_embeddings():
     """Test semantic search with real embeddings."""
     print("\nTesting semantic search with embeddings...")
     
-    if not OPENAI_API_KEY:
+    if NEEDS_API_KEY:
         print("  [SKIP] OPENAI_API_KEY not set")
         return True
     
@@ -150,11 +437,56 @@ def test_semantic_search_with_embeddings():
         return False
 
 
+def test_unified_search():
+    """Test single-query search across skills and documents."""
+    print("\nTesting unified search...")
+    
+    if NEEDS_API_KEY:
+        print("  [SKIP] OPENAI_API_KEY not set")
+        return True
+    
+    registry = SkillRegistry()
+    doc_path = "docs/test-unified-search.md"
+    
+    try:
+        registry.upsert_skill(
+            name="test-unified-search",
+            description="Designing tools for AI agents",
+            content="# Tool Design\n\nHow to design effective tools for agents.",
+            path="skills/test-unified-search/SKILL.md"
+        )
+        registry.upsert_document(
+            title="Agent tool design notes",
+            content="# Agent Tools\n\nNotes on designing tool interfaces for agents.",
+            path=doc_path
+        )
+        
+        results = registry.search("designing agent tools", threshold=0.3, limit=5)
+        assert any(r["name"] == "test-unified-search" for r in results["skills"])
+        assert any(r["path"] == doc_path for r in results["documents"])
+        print(f"  [PASS] Found {len(results['skills'])} skills and "
+              f"{len(results['documents'])} documents in one query")
+        
+        only_skills = registry.search("designing agent tools", search_type="skills",
+                                      threshold=0.3, skill_limit=1)
+        assert len(only_skills["skills"]) == 1 and not only_skills["documents"]
+        print("  [PASS] Per-type filtering and limits apply")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  [FAIL] Unified search failed: {e}")
+        return False
+    finally:
+        registry.delete_skill("test-unified-search")
+        execute_query("DELETE FROM documents WHERE path = %s", (doc_path,), fetch=False)
+
+
 def test_find_related_skills():
     """Test finding related skills based on content."""
     print("\nTesting find related skills...")
     
-    if not OPENAI_API_KEY:
+    if NEEDS_API_KEY:
         print("  [SKIP] OPENAI_API_KEY not set")
         return True
     
@@ -198,26 +530,82 @@ def test_find_related_skills():
         return False
 
 
+def test_analyze_documents():
+    """Test single and batch document analysis agree."""
+    print("\nTesting analyze documents...")
+    
+    if NEEDS_API_KEY:
+        print("  [SKIP] OPENAI_API_KEY not set")
+        return True
+    
+    interface = AgentKnowledgeInterface()
+    registry = interface.registry
+    paths = [f"docs/test-analyze-{i}.md" for i in range(3)]
+    documents = [
+        {"content": "# Tool Design\n\nDesigning tool interfaces and error messages for agents.", "path": paths[0]},
+        {"content": "# Context Windows\n\nKeeping long agent sessions inside the context window.", "path": paths[1]},
+        {"content": "# Tool Errors\n\nReturning actionable errors from agent tools.", "path": paths[2]},
+    ]
+    
+    try:
+        registry.upsert_skill(
+            name="test-analyze-tools",
+            description="Building tools for AI agents",
+            content="# Agent Tools\n\nLearn to design effective tool APIs for agents.",
+            path="skills/test-analyze-tools/SKILL.md"
+        )
+        
+        batch = interface.analyze_documents(documents, similarity_threshold=0.1)
+        assert batch["documents"] == 3 and batch["items_per_sec"] > 0
+        for doc, result in zip(documents, batch["results"]):
+            assert result["document_id"] == str(registry.get_document(doc["path"])["id"])
+            single = interface.analyze_document(doc["content"], doc["path"], similarity_threshold=0.1)
+            assert single["action"] == result["action"]
+            assert [s["skill_id"] for s in single["related_skills"]] == [s["skill_id"] for s in result["related_skills"]]
+        print(f"  [PASS] Batch results match analyze_document ({batch['items_per_sec']:.1f} docs/sec)")
+        
+        assert interface.analyze_documents([])["results"] == []
+        print("  [PASS] Empty batch")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Analyze documents failed: {e}")
+        return False
+    finally:
+        registry.delete_documents(paths)
+        registry.delete_skill("test-analyze-tools")
+
+
 def main():
     print("=" * 60)
     print("Embedding & Semantic Search Test Suite")
     print("=" * 60)
     print()
     
-    if not OPENAI_API_KEY:
+    if NEEDS_API_KEY:
         print("[ERROR] OPENAI_API_KEY not set in environment or .env file")
-        print("Please set it to run these tests.")
+        print("Please set it, or set EMBEDDING_MODEL=local-hashing, to run these tests.")
         return 1
     
-    print(f"API Key: {OPENAI_API_KEY[:10]}...{OPENAI_API_KEY[-10:]}")
+    provider = get_embedding_provider()
+    if provider.remote:
+        print(f"API Key: {OPENAI_API_KEY[:10]}...{OPENAI_API_KEY[-10:]}")
+    else:
+        print(f"Embedding provider: {provider.model} (local)")
     print()
     
     results = []
     
     results.append(("Embedding Generation", test_embedding_generation()))
     results.append(("Token Counting", test_token_counting()))
+    results.append(("Chunking", test_chunking()))
+    results.append(("Embedding Pooling", test_embedding_pooling()))
+    results.append(("Embedding Cache", test_embedding_cache()))
+    results.append(("Local Embedding Provider", test_local_embedding_provider()))
+    results.append(("Embedding Batcher", test_embedding_batcher()))
     results.append(("Semantic Search", test_semantic_search_with_embeddings()))
+    results.append(("Unified Search", test_unified_search()))
     results.append(("Find Related Skills", test_find_related_skills()))
+    results.append(("Analyze Documents", test_analyze_documents()))
     
     # Summary
     print()
@@ -13,9 +13,12 @@ import os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import tempfile
 from pathlib import Path
 from scripts.registry import SkillRegistry, parse_skill_frontmatter, extract_title_from_markdown
 from scripts.config import SKILLS_DIR, DOCS_DIR
+from scripts.embeddings import content_hash
+from scripts.index_manifest import IndexManifest
 
 
 def test_index_real_skills():
@@ -164,6 +167,234 @@ def test_skill_detail():
     return False
 
 
+def test_index_manifest():
+    """Test change, deletion and rename detection with the index manifest."""
+    print("\nTesting index manifest...")
+    
+    registry = SkillRegistry()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        (root / "docs").mkdir()
+        for name in ("a", "b", "c"):
+            (root / "docs" / f"test-manifest-{name}.md").write_text(f"# {name}\n\nManifest test {name}\n")
+        
+        manifest = IndexManifest(root / "manifest.json", target="test", root=root)
+        scan = manifest.scan(sorted((root / "docs").glob("*.md")), "docs/")
+        if len(scan.changed) != 3 or scan.unchanged or scan.missing:
+            print(f"  [FAIL] First scan should report 3 new files, got {scan}")
+            return False
+        
+        for key, stat in scan.changed:
+            content = (root / key).read_text()
+            doc_id = registry.upsert_document(
+                title=key, content=content, path=key, generate_embedding_flag=False
+            )
+            manifest.record(key, stat, content_hash(content), doc_id)
+        manifest.save()
+        print("  [PASS] New files reported as changed")
+        
+        # Reload from disk; nothing has changed
+        manifest = IndexManifest(root / "manifest.json", target="test", root=root)
+        scan = manifest.scan(sorted((root / "docs").glob("*.md")), "docs/")
+        if len(scan.unchanged) != 3 or scan.changed:
+            print(f"  [FAIL] Unchanged files not skipped: {scan}")
+            return False
+        print("  [PASS] Unchanged files skipped by mtime and size")
+        
+        (root / "docs" / "test-manifest-a.md").write_text("# a\n\nEdited\n")
+        (root / "docs" / "test-manifest-b.md").rename(root / "docs" / "test-manifest-moved.md")
+        (root / "docs" / "test-manifest-c.md").unlink()
+        scan = manifest.scan(sorted((root / "docs").glob("*.md")), "docs/")
+        changed = {key for key, _ in scan.changed}
+        if changed != {"docs/test-manifest-a.md", "docs/test-manifest-moved.md"}:
+            print(f"  [FAIL] Wrong changed set: {changed}")
+            return False
+        if set(scan.missing) != {"docs/test-manifest-b.md", "docs/test-manifest-c.md"}:
+            print(f"  [FAIL] Wrong missing set: {set(scan.missing)}")
+            return False
+        moved_hash = content_hash((root / "docs" / "test-manifest-moved.md").read_text())
+        if scan.missing["docs/test-manifest-b.md"]["hash"] != moved_hash:
+            print("  [FAIL] Moved file should match its old entry by hash")
+            return False
+        print("  [PASS] Edits, moves and deletions detected")
+        
+        moved_id = scan.missing["docs/test-manifest-b.md"]["id"]
+        registry.rename_documents({"docs/test-manifest-b.md": "docs/test-manifest-moved.md"})
+        registry.delete_documents(["docs/test-manifest-c.md"])
+        moved = registry.get_document("docs/test-manifest-moved.md")
+        if moved is None or str(moved["id"]) != moved_id:
+            print("  [FAIL] Renamed document should keep its ID")
+            return False
+        
+        ids = [entry["id"] for entry in manifest.entries.values()]
+        if len(registry.existing_ids([], ids)) != 2:
+            print("  [FAIL] Deleted document still reported as existing")
+            return False
+        print("  [PASS] Batched rename and delete applied")
+        
+        # Swapped paths must not trip the unique path constraint
+        a_id = str(registry.get_document("docs/test-manifest-a.md")["id"])
+        registry.rename_documents({
+            "docs/test-manifest-a.md": "docs/test-manifest-moved.md",
+            "docs/test-manifest-moved.md": "docs/test-manifest-a.md"
+        })
+        if (str(registry.get_document("docs/test-manifest-moved.md")["id"]) != a_id
+                or str(registry.get_document("docs/test-manifest-a.md")["id"]) != moved_id):
+            print("  [FAIL] Swapped renames should exchange the two rows' paths")
+            return False
+        print("  [PASS] Swapped renames applied")
+        
+        if len(IndexManifest(root / "manifest.json", target="other", root=root)):
+            print("  [FAIL] Manifest for another target should load empty")
+            return False
+        print("  [PASS] Manifest bound to its target")
+        
+        registry.delete_documents(["docs/test-manifest-a.md", "docs/test-manifest-moved.md"])
+    
+    return True
+
+
+def test_plan_index():
+    """Test which files plan_index reads, moves and deletes (no database required)."""
+    print("\nTesting index planning...")
+    
+    from scripts import index
+    
+    saved = index.SKILLS_DIR, index.DOCS_DIR, index.PROJECT_ROOT
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        index.SKILLS_DIR, index.DOCS_DIR, index.PROJECT_ROOT = root / "skills", root / "docs", root
+        try:
+            for name in ("alpha", "beta"):
+                (root / "skills" / name).mkdir(parents=True)
+                (root / "skills" / name / "SKILL.md").write_text(f"---\nname: {name}\n---\n# {name}\n")
+            (root / "docs").mkdir()
+            for name in ("keep", "move-me", "delete-me"):
+                (root / "docs" / f"{name}.md").write_text(f"# {name}\n\nPlan test {name}\n")
+            for name in ("copy-1", "copy-2"):
+                (root / "docs" / f"{name}.md").write_text("# Copy\n\nSame content twice\n")
+            
+            def record(plan):
+                skill_ids = {s["name"]: f"skill-{s['name']}" for s in plan.skills}
+                doc_ids = {d["path"]: f"doc-{d['path']}" for d in plan.documents}
+                index.record_plan(manifest, plan, skill_ids, doc_ids)
+            
+            manifest = IndexManifest(root / "manifest.json", target="test", root=root)
+            plan = index.plan_index(manifest)
+            assert sorted(s["name"] for s in plan.skills) == ["alpha", "beta"]
+            assert len(plan.documents) == 5 and not plan.renames and plan.skipped == 0
+            record(plan)
+            print("  [PASS] First run reads every file")
+            
+            alpha = root / "skills" / "alpha" / "SKILL.md"
+            os.utime(alpha, ns=(alpha.stat().st_atime_ns, alpha.stat().st_mtime_ns + 10**9))
+            (root / "skills" / "beta" / "SKILL.md").write_text("---\nname: beta\n---\n# beta\n\nEdited\n")
+            (root / "docs" / "move-me.md").rename(root / "docs" / "moved.md")
+            for name in ("delete-me", "copy-1", "copy-2"):
+                (root / "docs" / f"{name}.md").unlink()
+            
+            plan = index.plan_index(manifest)
+            assert [s["name"] for s in plan.skills] == ["beta"], "only the edited skill is dirty"
+            assert plan.documents == [] and plan.deleted_skills == []
+            assert plan.renames == {"docs/move-me.md": "docs/moved.md"}
+            assert sorted(plan.deleted_documents) == ["docs/copy-1.md", "docs/copy-2.md", "docs/delete-me.md"]
+            assert plan.skipped == 2  # alpha (touched only) and keep.md
+            assert set(manifest.entries) == {
+                "skills/alpha/SKILL.md", "skills/beta/SKILL.md", "docs/keep.md", "docs/moved.md"
+            }
+            record(plan)
+            print("  [PASS] Edit, touch, move and deletions (including identical files) planned")
+            
+            (root / "docs" / "copy-3.md").write_text("# Copy\n\nSame content twice\n")
+            (root / "docs" / "copy-4.md").write_text("# Copy\n\nSame content twice\n")
+            record(index.plan_index(manifest))
+            (root / "docs" / "copy-3.md").rename(root / "docs" / "copy-5.md")
+            (root / "docs" / "copy-4.md").unlink()
+            plan = index.plan_index(manifest)
+            assert list(plan.renames.values()) == ["docs/copy-5.md"] and len(plan.deleted_documents) == 1
+            assert set(plan.renames) | set(plan.deleted_documents) == {"docs/copy-3.md", "docs/copy-4.md"}
+            print("  [PASS] One of several identical vanished files moves, the rest are deleted")
+            
+            plan = index.plan_index(manifest, force=True)
+            assert sorted(s["name"] for s in plan.skills) == ["alpha", "beta"]
+            assert sorted(d["path"] for d in plan.documents) == ["docs/copy-5.md", "docs/keep.md", "docs/moved.md"]
+            assert not plan.renames and not plan.deleted_documents and plan.skipped == 0
+            print("  [PASS] force reads every file")
+            return True
+        except Exception as e:
+            print(f"  [FAIL] Index planning failed: {e!r}")
+            return False
+        finally:
+            index.SKILLS_DIR, index.DOCS_DIR, index.PROJECT_ROOT = saved
+
+
+def test_registry_session():
+    """Test commit intervals and rollback of an indexing session."""
+    print("\nTesting registry session...")
+    
+    from scripts.db import get_connection
+    
+    registry = SkillRegistry()
+    paths = [f"docs/test-session-{i}.md" for i in range(5)]
+    
+    def committed():
+        """Paths visible to another connection, i.e. committed."""
+        conn = get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT path FROM documents WHERE path = ANY(%s)", (paths,))
+                return {r[0] for r in cur.fetchall()}
+        finally:
+            conn.close()
+    
+    def write(path):
+        registry.upsert_document(
+            title=path, content=f"Session test {path}", path=path, generate_embedding_flag=False
+        )
+    
+    try:
+        with registry.session(commit_every=2) as session:
+            for path in paths[:3]:
+                with session.unit():
+                    write(path)
+            if committed() != set(paths[:2]):
+                print(f"  [FAIL] Expected the first 2 units committed, got {committed()}")
+                return False
+            print("  [PASS] Units committed every 2")
+            
+            try:
+                with session.unit():
+                    write(paths[3])
+                    raise RuntimeError("unit failed")
+            except RuntimeError:
+                pass
+            with session.unit():
+                write(paths[4])
+        
+        if committed() != set(paths) - {paths[3]} or session.failed != 1:
+            print(f"  [FAIL] Failed unit should roll back alone, got {committed()}")
+            return False
+        print("  [PASS] Failed unit rolled back, later units kept")
+        
+        registry.delete_documents(paths)
+        try:
+            with registry.session() as session:
+                for path in paths:
+                    with session.unit():
+                        write(path)
+                raise RuntimeError("run failed")
+        except RuntimeError:
+            pass
+        if committed():
+            print("  [FAIL] Failed run should leave nothing behind")
+            return False
+        print("  [PASS] Failed run rolled back atomically")
+        return True
+    finally:
+        registry.delete_documents(paths)
+
+
 def cleanup():
     """Clean up test data."""
     print("\nCleaning up test data...")
@@ -197,6 +428,9 @@ def main():
     results.append(("Index Documents", test_index_real_documents()))
     results.append(("Query Data", test_query_indexed_data()))
     results.append(("Skill Detail", test_skill_detail()))
+    results.append(("Index Manifest", test_index_manifest()))
+    results.append(("Index Planning", test_plan_index()))
+    results.append(("Registry Session", test_registry_session()))
     
     # Summary
     print()
@@ -7,19 +7,45 @@ Tests:
 2. Skill CRUD operations
 3. Document CRUD operations
 4. Skill-Document linking
-5. Semantic search (requires OPENAI_API_KEY)
+5. Semantic search (requires OPENAI_API_KEY or EMBEDDING_MODEL=local-hashing)
 6. Version tracking
+7. Search server round trips
 """
 
 import sys
 import os
+import asyncio
+import inspect
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from scripts.db import execute_query, get_cursor
-from scripts.registry import SkillRegistry, parse_skill_frontmatter, extract_title_from_markdown
-from scripts.config import OPENAI_API_KEY
+import numpy as np
+
+from scripts.db import execute_query, get_cursor, get_pool, pooled_connection
+from scripts.registry import (
+    SkillRegistry,
+    parse_skill_frontmatter,
+    extract_title_from_markdown,
+    SEARCH_SKILLS_SQL,
+    SEARCH_DOCUMENTS_SQL,
+    RELATED_SKILLS_SQL,
+    _nearest_sql,
+    _ann_settings,
+)
+from scripts.config import OPENAI_API_KEY, EMBEDDING_DIMENSION, HNSW_MAX_EF_SEARCH, DB_POOL_MAX_SIZE
+from scripts.embedding_providers import get_embedding_provider
+from scripts.vector_index import index_status, recommended_lists, index_expression
+from scripts.embedded_registry import EmbeddedSkillRegistry, VectorStore
+from scripts.search_server import SearchServer
+from scripts.search_client import SearchClient, SearchServerError, server_available
+from scripts.async_registry import AsyncSkillRegistry, to_asyncpg
+from scripts.snapshot import export_registry, import_registry
 
 
 def test_database_connection():
@@ -35,6 +61,42 @@ def test_database_connection():
         return False
 
 
+def test_connection_pool():
+    """Test pooled connections are reused within and across calls."""
+    print("Testing connection pool...")
+    try:
+        with pooled_connection() as outer:
+            with get_cursor() as cur:
+                cur.execute("SELECT pg_backend_pid() AS pid")
+                inner_pid = cur.fetchone()["pid"]
+            assert outer.get_backend_pid() == inner_pid
+        print("  [PASS] Nested cursors share the thread's connection")
+        
+        first = execute_query("SELECT pg_backend_pid() AS pid")[0]["pid"]
+        second = execute_query("SELECT pg_backend_pid() AS pid")[0]["pid"]
+        assert first == second
+        print("  [PASS] Sequential queries reuse a pooled connection")
+        
+        # More threads than connections: checkouts wait instead of failing
+        with ThreadPoolExecutor(max_workers=DB_POOL_MAX_SIZE * 3) as executor:
+            list(executor.map(lambda _: execute_query("SELECT pg_sleep(0.05)"), range(DB_POOL_MAX_SIZE * 6)))
+        assert len(get_pool()._last_used) <= DB_POOL_MAX_SIZE
+        print("  [PASS] Threads beyond the pool size wait for a connection")
+        
+        try:
+            with get_cursor(commit=False):
+                with get_cursor(commit=True):
+                    pass
+            raise AssertionError("nested commit=True under a rolling-back block was allowed")
+        except RuntimeError:
+            pass
+        print("  [PASS] Nested commit under a rolling-back block raises")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Connection pool failed: {e}")
+        return False
+
+
 def test_pgvector_extension():
     """Test pgvector extension is available."""
     print("Testing pgvector extension...")
@@ -71,6 +133,238 @@ def test_tables_exist():
     return all_exist
 
 
+def test_vector_indexes():
+    """Test embedding indexes exist and ivfflat sizing."""
+    print("Testing vector indexes...")
+    try:
+        for entry in index_status():
+            assert entry["definition"] is not None, f"{entry['index']} missing"
+            print(f"  [PASS] {entry['index']}: {entry['definition'].split(' USING ')[1]}")
+        
+        assert recommended_lists(0) == 1
+        assert recommended_lists(250_000) == 250
+        assert recommended_lists(4_000_000) == 2000
+        print("  [PASS] ivfflat lists sized from row count")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Vector index check failed: {e}")
+        return False
+
+
+def test_search_uses_vector_index():
+    """Test the search SQL is planned as an ANN index scan."""
+    print("Testing search query plans...")
+    vector = np.random.default_rng(0).standard_normal(EMBEDDING_DIMENSION).astype(np.float32)
+    vector /= np.linalg.norm(vector)
+    params = {"embedding": vector, "threshold": 0.5, "limit": 10, "candidates": 20}
+    
+    try:
+        for name, query, index in [
+            ("skills", SEARCH_SKILLS_SQL, "idx_skills_embedding"),
+            ("documents", SEARCH_DOCUMENTS_SQL, "idx_documents_embedding"),
+        ]:
+            with get_cursor(commit=False) as cur:
+                # Small test tables would otherwise get a cheaper seq scan
+                cur.execute("SET LOCAL enable_seqscan = off")
+                cur.execute("EXPLAIN " + query, params)
+                plan = "\n".join(row["QUERY PLAN"] for row in cur.fetchall())
+            assert index in plan, f"{name} search does not use {index}:\n{plan}"
+            print(f"  [PASS] {name} search scans {index}")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Query plan check failed: {e}")
+        return False
+
+
+def test_quantized_search():
+    """Test quantized and truncated index scans re-rank to the exact nearest rows."""
+    print("Testing quantized and truncated vector indexes...")
+    dim = 64
+    rng = np.random.default_rng(1)
+    query = rng.standard_normal(dim).astype(np.float32)
+    query /= np.linalg.norm(query)
+    # Rows at increasing distances from the query, so the true order is clear
+    rows = [query + rng.standard_normal(dim).astype(np.float32) * (0.05 + i * 0.02) for i in range(200)]
+    params = {"embedding": query, "limit": 5}
+    
+    try:
+        for label, quantization, truncate in [
+            ("halfvec", "halfvec", 0),
+            ("binary", "binary", 0),
+            ("first 16-d", "none", 16),
+        ]:
+            expression, opclass = index_expression(quantization, dim, truncate)
+            with get_cursor(commit=False) as cur:
+                # Temp table and index disappear with the rolled back transaction
+                cur.execute(f"CREATE TEMP TABLE test_quantized (id INT PRIMARY KEY, embedding vector({dim}))")
+                for i, vector in enumerate(rows):
+                    cur.execute("INSERT INTO test_quantized VALUES (%s, %s)", (i, vector / np.linalg.norm(vector)))
+                cur.execute(_nearest_sql("test_quantized", "id", "limit", "none", dimension=dim, truncate=0), params)
+                exact = [r["id"] for r in cur.fetchall()]
+                
+                cur.execute(f"CREATE INDEX ON test_quantized USING hnsw ({expression} {opclass})")
+                cur.execute("SET LOCAL enable_seqscan = off")
+                query_sql = _nearest_sql(
+                    "test_quantized", "id", "limit", quantization, rerank=4, dimension=dim, truncate=truncate
+                )
+                cur.execute("EXPLAIN " + query_sql, params)
+                plan = "\n".join(row["QUERY PLAN"] for row in cur.fetchall())
+                assert "Index Scan" in plan, f"{label} search does not use its index:\n{plan}"
+                cur.execute(query_sql, params)
+                found = [r["id"] for r in cur.fetchall()]
+            assert found == exact, f"{label}: {found} != exact {exact}"
+            print(f"  [PASS] {label} index scan re-ranked to the exact top {len(exact)}")
+        
+        # limit * overfetch * rerank far above the 1000 pgvector accepts
+        ef_search, _ = _ann_settings(None, None, 300 * 2 * 4)
+        assert ef_search == HNSW_MAX_EF_SEARCH
+        expression, opclass = index_expression("halfvec", dim, 0)
+        with get_cursor(commit=False) as cur:
+            cur.execute(f"CREATE TEMP TABLE test_quantized (id INT PRIMARY KEY, embedding vector({dim}))")
+            for i, vector in enumerate(rows):
+                cur.execute("INSERT INTO test_quantized VALUES (%s, %s)", (i, vector / np.linalg.norm(vector)))
+            cur.execute(f"CREATE INDEX ON test_quantized USING hnsw ({expression} {opclass})")
+            cur.execute("SET LOCAL enable_seqscan = off")
+            cur.execute("SELECT set_config('hnsw.ef_search', %s, true)", (str(ef_search),))
+            cur.execute(
+                _nearest_sql("test_quantized", "id", "limit", "halfvec", rerank=4, dimension=dim, truncate=0),
+                {"embedding": query, "limit": 300}
+            )
+            assert len(cur.fetchall()) == len(rows)
+        print("  [PASS] Large-limit quantized search clamps ef_search and the shortlist")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Quantized search failed: {e}")
+        return False
+
+
+def test_result_cache():
+    """Test search results are cached until the registry generation changes."""
+    print("Testing search result cache...")
+    registry = SkillRegistry(result_cache_check=0)  # Read the database generation on every search
+    vector = np.random.default_rng(2).standard_normal(EMBEDDING_DIMENSION).astype(np.float32)
+    vector /= np.linalg.norm(vector)
+    params = {"embedding": vector, "threshold": 0.9, "limit": 10, "candidates": 20}
+    
+    def search():
+        return {r["name"] for r in registry._vector_query(SEARCH_SKILLS_SQL, params, candidates=20)}
+    
+    def insert_externally(name):
+        # A write that bypasses this registry, as another process would make
+        execute_query(
+            "INSERT INTO skills (name, description, content, path, embedding) "
+            "VALUES (%s, 'Result cache test', %s, %s, %s::vector)",
+            (name, name, f"skills/{name}/SKILL.md", vector),
+            fetch=False
+        )
+    
+    try:
+        insert_externally("test-cache-a")
+        assert search() == {"test-cache-a"}
+        started = time.perf_counter()
+        assert search() == {"test-cache-a"}
+        hit_us = (time.perf_counter() - started) * 1e6
+        assert registry.result_cache_stats()["hits"] == 1
+        print(f"  [PASS] Repeated search served from the cache ({hit_us:.0f} µs)")
+        
+        registry._vector_query(SEARCH_SKILLS_SQL, params, candidates=20)[0]["name"] = "mutated"
+        assert search() == {"test-cache-a"}
+        print("  [PASS] Callers get copies of cached rows")
+        
+        registry.delete_skill("test-cache-a")
+        assert search() == set()
+        print("  [PASS] Registry writes invalidate cached results")
+        
+        insert_externally("test-cache-b")
+        assert search() == {"test-cache-b"}
+        print("  [PASS] Writes from other connections invalidate cached results")
+        
+        generation = registry._local_generation
+        assert not registry.delete_skill("test-cache-missing")
+        assert registry._local_generation == generation
+        print("  [PASS] Writes that change nothing keep cached results")
+        
+        with registry.transaction():
+            registry.delete_skill("test-cache-b")
+            assert registry._local_generation == generation
+            assert search() == set()  # The writer sees its own delete, uncached
+            elsewhere = []
+            reader = threading.Thread(target=lambda: elsewhere.append(search()))
+            reader.start()
+            reader.join()
+            assert elsewhere == [{"test-cache-b"}]
+        assert registry._local_generation != generation
+        assert search() == set()
+        print("  [PASS] Uncommitted writes are not cached; the commit invalidates")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Result cache failed: {e}")
+        return False
+    finally:
+        registry.delete_skills(["test-cache-a", "test-cache-b"])
+
+
+def test_skill_matrix():
+    """Test in-memory related-skill scoring matches the SQL query."""
+    print("Testing skill matrix...")
+    registry = SkillRegistry(result_cache_size=0, result_cache_check=0)
+    sql_registry = SkillRegistry(result_cache_size=0, skill_matrix_max_size=0)
+    rng = np.random.default_rng(3)
+    base = rng.standard_normal(EMBEDDING_DIMENSION).astype(np.float32)
+    names = [f"test-matrix-{i}" for i in range(5)]
+    
+    def related(embeddings, limit=None):
+        return registry._current_skill_matrix().related(embeddings, threshold=0.5, limit=limit)
+    
+    def related_sql(embedding, limit=None):
+        return sql_registry._vector_query(RELATED_SKILLS_SQL, {
+            "embedding": embedding,
+            "threshold": 0.5,
+            "limit": limit,
+            "candidates": limit
+        })
+    
+    try:
+        for i, name in enumerate(names):
+            # Decreasingly similar to `base`
+            vector = base + 0.3 * i * rng.standard_normal(EMBEDDING_DIMENSION).astype(np.float32)
+            execute_query(
+                "INSERT INTO skills (name, description, content, path, embedding) "
+                "VALUES (%s, 'Skill matrix test', %s, %s, %s::vector)",
+                (name, name, f"skills/{name}/SKILL.md", vector),
+                fetch=False
+            )
+    
+        queries = np.stack([base, -base, rng.standard_normal(EMBEDDING_DIMENSION).astype(np.float32)])
+        for limit in (None, 2):
+            batch = related(queries, limit)
+            for query, rows in zip(queries, batch):
+                expected = related_sql(query, limit)
+                assert [r["skill_id"] for r in rows] == [r["skill_id"] for r in expected]
+                assert np.allclose([r["similarity"] for r in rows], [r["similarity"] for r in expected], atol=1e-5)
+        assert [r["skill_name"] for r in related(base, limit=3)[0]] == names[:3]
+        print("  [PASS] Matrix scores and top-k match the SQL query, single and batched")
+    
+        registry.delete_skill(names[0])
+        assert names[0] not in {r["skill_name"] for r in related(base)[0]}
+        print("  [PASS] Registry writes reload the matrix")
+    
+        execute_query("DELETE FROM skills WHERE name = %s", (names[1],), fetch=False)
+        assert names[1] not in {r["skill_name"] for r in related(base)[0]}
+        print("  [PASS] Writes from other connections reload the matrix")
+    
+        rows = execute_query("SELECT COUNT(*) AS count FROM skills WHERE embedding IS NOT NULL")
+        limited = SkillRegistry(skill_matrix_max_size=rows[0]["count"] - 1)
+        assert limited._current_skill_matrix() is None
+        print("  [PASS] Registries over the size limit fall back to SQL")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Skill matrix failed: {e}")
+        return False
+    finally:
+        registry.delete_skills(names)
+
+
 def test_skill_crud():
     """Test skill create, read, update, delete operations."""
     print("Testing skill CRUD operations...")
@@ -130,6 +424,41 @@ def test_skill_crud():
         return False
 
 
+def test_skill_change_detection():
+    """Test unchanged skills are not rewritten unless forced."""
+    print("Testing skill change detection...")
+    registry = SkillRegistry()
+    
+    test_name = "test-skill-hash"
+    fields = dict(
+        name=test_name,
+        description="A test skill for change detection",
+        content="# Hash Test\n\nContent.",
+        path="skills/test-skill-hash/SKILL.md",
+        generate_embedding_flag=False
+    )
+    
+    try:
+        registry.upsert_skill(**fields)
+        first = registry.get_skill(test_name)["updated_at"]
+        
+        registry.upsert_skill(**fields)
+        assert registry.get_skill(test_name)["updated_at"] == first
+        print("  [PASS] Unchanged skill was not rewritten")
+        
+        registry.upsert_skill(**fields, force=True)
+        assert registry.get_skill(test_name)["updated_at"] > first
+        print("  [PASS] force=True rewrote the unchanged skill")
+        
+        registry.delete_skill(test_name)
+        return True
+        
+    except Exception as e:
+        print(f"  [FAIL] Skill change detection failed: {e}")
+        registry.delete_skill(test_name)
+        return False
+
+
 def test_document_crud():
     """Test document create, read, update, delete operations."""
     print("Testing document CRUD operations...")
@@ -344,6 +673,211 @@ Some content here.
         return False
 
 
+def test_embedded_registry():
+    """Test the SQLite + memory-mapped backend (no database required)."""
+    print("Testing embedded registry...")
+    rng = np.random.default_rng(0)
+    
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = VectorStore(Path(tmp) / "vectors.f32", 8)
+            vectors = rng.standard_normal((100, 8)).astype(np.float32)
+            for i, vector in enumerate(vectors):
+                store.put(f"item-{i}", vector)
+            store.commit()
+            
+            unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+            expected = np.argsort(-(unit @ unit[7]))[:5]
+            top = store.top_k(vectors[7], threshold=-1.0, limit=5)
+            assert [item_id for item_id, _ in top] == [f"item-{i}" for i in expected]
+            assert abs(top[0][1] - 1.0) < 1e-5
+            print("  [PASS] Exact top-k matches brute force")
+            
+            registry = EmbeddedSkillRegistry(Path(tmp) / "registry.db", dimension=8)
+            skill_id = registry.upsert_skill(
+                name="embedded-skill",
+                description="Stored in SQLite",
+                content="# Embedded",
+                path="skills/embedded-skill/SKILL.md",
+                generate_embedding_flag=False
+            )
+            doc_id = registry.upsert_document(
+                title="Embedded Doc",
+                content="Source",
+                path="docs/embedded.md",
+                generate_embedding_flag=False
+            )
+            registry.link_skill_to_document(skill_id, doc_id, 0.5)
+            registry.create_skill_version(skill_id, "1.0.0", "# Embedded")
+            registry.close()
+            
+            registry = EmbeddedSkillRegistry(Path(tmp) / "registry.db", dimension=8)
+            assert registry.get_skill("embedded-skill")["id"] == skill_id
+            assert registry.get_skill_sources(skill_id)[0]["relevance"] == 0.5
+            assert len(registry.get_skill_versions(skill_id)) == 1
+            print("  [PASS] Skills, documents, links and versions persist")
+            
+            try:
+                with registry.transaction():
+                    registry.delete_skill("embedded-skill")
+                    raise RuntimeError("abort")
+            except RuntimeError:
+                pass
+            assert registry.get_skill("embedded-skill") is not None
+            print("  [PASS] Transaction rollback")
+            
+            assert registry.delete_skill("embedded-skill")
+            stats = registry.get_stats()
+            assert stats["skills"] == 0 and stats["skill_document_links"] == 0
+            print("  [PASS] Delete cascades to links")
+            registry.close()
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Embedded registry failed: {e}")
+        return False
+
+
+def put_embedded_skills(registry, vectors):
+    """Write skills with the given embeddings (name -> vector) to an embedded registry."""
+    registry._write_rows("skills", "name", registry._SKILL_COLUMNS, [
+        {
+            "name": name,
+            "description": "Stored with an embedding",
+            "content": f"# {name}",
+            "path": f"skills/{name}/SKILL.md",
+            "version": "1.0.0",
+            "author": None,
+            "content_hash": name
+        }
+        for name in vectors
+    ], list(vectors.values()))
+
+
+def test_embedded_registry_processes():
+    """Test an embedded registry picks up another instance's commits."""
+    print("Testing embedded registry shared between instances...")
+    axes = np.eye(8, dtype=np.float32)
+    
+    def related(registry, vector):
+        return [r["skill_name"] for r in registry.find_related_skills("", threshold=0.5, embedding=vector)]
+    
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            writer = EmbeddedSkillRegistry(Path(tmp) / "registry.db", dimension=8)
+            reader = EmbeddedSkillRegistry(Path(tmp) / "registry.db", dimension=8)
+            assert related(reader, axes[0]) == []
+            
+            put_embedded_skills(writer, {"first": axes[0]})
+            assert related(reader, axes[0]) == ["first"]
+            print("  [PASS] Reader sees skills committed by another instance")
+            
+            writer.delete_skill("first")
+            put_embedded_skills(writer, {"second": axes[1]})  # Reuses the freed row
+            assert related(reader, axes[0]) == []
+            assert related(reader, axes[1]) == ["second"]
+            print("  [PASS] Reused vector rows are scored for their new owner")
+            
+            put_embedded_skills(writer, {f"bulk-{i}": axes[2] for i in range(100)})
+            assert reader.get_stats()["skills_with_embedding"] == 101
+            assert len(related(reader, axes[2])) == 100
+            print("  [PASS] Reader follows the vector file as it grows")
+            
+            writer.close()
+            reader.close()
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Shared embedded registry failed: {e}")
+        return False
+
+
+def test_search_server():
+    """Test registry calls through the resident search server."""
+    print("Testing search server...")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = EmbeddedSkillRegistry(Path(tmp) / "registry.db", dimension=8)
+        socket_path = Path(tmp) / "search.sock"
+        server = SearchServer(registry, socket_path=socket_path, workers=4)
+        thread = threading.Thread(target=asyncio.run, args=(server.serve(),), daemon=True)
+        thread.start()
+        
+        try:
+            deadline = time.monotonic() + 5
+            while not server_available(socket_path):
+                assert time.monotonic() < deadline, "server did not start"
+                time.sleep(0.05)
+            print("  [PASS] Server accepting connections")
+            
+            with SearchClient(socket_path) as client:
+                skill_id = client.call(
+                    "upsert_skill",
+                    name="served-skill",
+                    description="Written through the server",
+                    content="# Served",
+                    path="skills/served-skill/SKILL.md",
+                    generate_embedding_flag=False
+                )
+                assert client.call("get_skill", name="served-skill")["id"] == skill_id
+                assert client.call("get_stats")["skills"] == 1
+            print("  [PASS] Upsert and lookup over one connection")
+            
+            def lookup(_):
+                with SearchClient(socket_path) as client:
+                    return client.call("get_skill", name="served-skill")["name"]
+            
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                names = list(pool.map(lookup, range(32)))
+            assert names == ["served-skill"] * 32
+            print("  [PASS] 32 concurrent clients served")
+            
+            # Written by a separate instance, as an index.py run would be
+            indexer = EmbeddedSkillRegistry(Path(tmp) / "registry.db", dimension=8)
+            put_embedded_skills(indexer, {"vector-skill": np.eye(8, dtype=np.float32)[0]})
+            indexer.close()
+            received = []
+            find_batch = registry.find_related_skills_batch
+            
+            def recording_batch(contents, **params):
+                received.append(params["embeddings"])
+                return find_batch(contents, **params)
+            
+            registry.find_related_skills_batch = recording_batch
+            with SearchClient(socket_path) as client:
+                related = client.call(
+                    "find_related_skills", content="", threshold=0.5, embedding=[1.0] + [0.0] * 7
+                )
+                assert [r["skill_name"] for r in related] == ["vector-skill"]
+                batch = client.call(
+                    "find_related_skills_batch", contents=["", ""], threshold=0.5,
+                    embeddings=[[1.0] + [0.0] * 7, [0.0] * 7 + [1.0]]
+                )
+                assert [[r["skill_name"] for r in rows] for rows in batch] == [["vector-skill"], []]
+                assert received[0].dtype == np.float32 and received[0].shape == (2, 8)
+            print("  [PASS] Embeddings passed as JSON lists; other writers' skills served")
+            
+            with SearchClient(socket_path) as client:
+                try:
+                    client.call("delete_skill", name="served-skill")
+                    raise AssertionError("delete_skill should not be exposed")
+                except SearchServerError:
+                    pass
+                assert client.call("get_skill", name="served-skill") is not None
+            print("  [PASS] Unlisted methods rejected")
+        except Exception as e:
+            print(f"  [FAIL] Search server failed: {e}")
+            return False
+        finally:
+            server.stop()
+            thread.join(timeout=5)
+            registry.close()
+        
+        if socket_path.exists():
+            print("  [FAIL] Socket file left behind")
+            return False
+    
+    return True
+
+
 def test_stats():
     """Test stats retrieval."""
     print("Testing stats...")
@@ -362,10 +896,10 @@ def test_stats():
 
 
 def test_semantic_search():
-    """Test semantic search (requires OPENAI_API_KEY)."""
+    """Test semantic search (requires OPENAI_API_KEY or a local provider)."""
     print("Testing semantic search...")
     
-    if not OPENAI_API_KEY:
+    if get_embedding_provider().remote and not OPENAI_API_KEY:
         print("  [SKIP] OPENAI_API_KEY not set, skipping semantic search test")
         return True  # Not a failure, just skipped
     
@@ -389,6 +923,21 @@ def test_semantic_search():
             limit=5
         )
         
+        # Repeat with different case/spacing: served from the query cache
+        hits_before = registry.query_cache_stats()["hits"]
+        registry.search_skills("How do I build  tools for AI", threshold=0.5, limit=5)
+        assert registry.query_cache_stats()["hits"] == hits_before + 1
+        print(f"  [PASS] Repeated query reused cached embedding")
+        
+        cached = registry._embed_query("how do I build tools for AI")
+        assert not cached.flags.writeable, "cached embeddings must be read-only"
+        cache_before = registry.query_cache_stats()
+        registry.find_related_skills("Designing tools for AI agents", threshold=0.5)
+        registry.find_related_skills_batch(["Agent tools", "Context windows"], threshold=0.5)
+        cache_after = registry.query_cache_stats()
+        assert (cache_after["size"], cache_after["misses"]) == (cache_before["size"], cache_before["misses"])
+        print(f"  [PASS] Related-skill content bypasses the query cache")
+        
         assert len(results) > 0
         assert any(r["name"] == "test-search-skill" for r in results)
         top_result = results[0]
@@ -407,6 +956,240 @@ def test_semantic_search():
         return False
 
 
+def test_hybrid_search():
+    """Test hybrid search finds exact terms that vector search misses."""
+    print("Testing hybrid search...")
+    
+    if get_embedding_provider().remote and not OPENAI_API_KEY:
+        print("  [SKIP] OPENAI_API_KEY not set, skipping hybrid search test")
+        return True
+    
+    registry = SkillRegistry()
+    
+    try:
+        registry.upsert_skill(
+            name="test-hybrid-skill",
+            description="Troubleshooting connection errors",
+            content="# Errors\n\nRetry when ERR_POOL_EXHAUSTED_4711 is raised by the pool.",
+            path="skills/test-hybrid-skill/SKILL.md"
+        )
+        
+        results = registry.search_skills("ERR_POOL_EXHAUSTED_4711", limit=5, mode="hybrid")
+        assert results and results[0]["name"] == "test-hybrid-skill"
+        assert results[0]["score"] > 0
+        print(f"  [PASS] Exact error string ranked first (score {results[0]['score']:.4f})")
+        
+        registry.delete_skill("test-hybrid-skill")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Hybrid search failed: {e}")
+        registry.delete_skill("test-hybrid-skill")
+        return False
+
+
+def test_document_chunks():
+    """Test chunk-level document embeddings and incremental re-embedding."""
+    print("Testing document chunks...")
+    
+    if get_embedding_provider().remote and not OPENAI_API_KEY:
+        print("  [SKIP] OPENAI_API_KEY not set, skipping document chunk test")
+        return True
+    
+    registry = SkillRegistry()
+    path = "docs/test-chunks.md"
+    sections = [
+        f"## Section {i}\n\n" + f"Paragraph {i} discusses topic number {i} in detail. " * 40
+        for i in range(6)
+    ]
+    sections[3] = "## Section 3\n\n" + "Vector quantization shrinks embeddings for faster search. " * 30
+    
+    def chunk_ids(doc_id):
+        return {
+            r["content_hash"]: str(r["id"])
+            for r in execute_query(
+                "SELECT id, content_hash FROM document_chunks WHERE document_id = %s",
+                (doc_id,)
+            )
+        }
+    
+    try:
+        doc_id = registry.upsert_document(
+            title="Chunk Test", content="\n\n".join(sections), path=path
+        )
+        before = chunk_ids(doc_id)
+        assert len(before) > 1
+        print(f"  [PASS] Split into {len(before)} chunks")
+        
+        sections[5] = sections[5].replace("detail", "depth")
+        registry.upsert_document(title="Chunk Test", content="\n\n".join(sections), path=path)
+        after = chunk_ids(doc_id)
+        kept = set(before.items()) & set(after.items())
+        assert 0 < len(after) - len(kept) < len(after)
+        print(f"  [PASS] Edit re-embedded {len(after) - len(kept)} of {len(after)} chunks")
+        
+        results = registry.search_document_chunks("vector quantization", threshold=0.0, limit=5)
+        match = next(r for r in results if r["path"] == path)
+        assert "quantization" in match["excerpt"]
+        print(f"  [PASS] Best chunk {match['ordinal']} rolled up to its document")
+        
+        registry.delete_document(path)
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Document chunks failed: {e}")
+        registry.delete_document(path)
+        return False
+
+
+def test_async_registry():
+    """Test the asyncio registry against the sync one."""
+    print("Testing async registry...")
+    
+    sql, args = to_asyncpg(
+        "SELECT %(a)s::vector <=> %(a)s::vector WHERE 1 - %(t)s > 0 LIMIT %(n)s",
+        {"a": np.zeros(3), "t": 0.5, "n": 5, "unused": "x"}
+    )
+    if sql != "SELECT $1::vector <=> $1::vector WHERE 1 - $2::float8 > 0 LIMIT $3::bigint" or len(args) != 3:
+        print(f"  [FAIL] Placeholder rewrite: {sql}")
+        return False
+    print("  [PASS] psycopg2 placeholders rewritten for asyncpg")
+    
+    for method in ("upsert_skill", "upsert_document", "embed_documents", "find_related_skills", "search"):
+        sync_params = inspect.signature(getattr(SkillRegistry, method)).parameters
+        async_params = inspect.signature(getattr(AsyncSkillRegistry, method)).parameters
+        if list(sync_params) != list(async_params):
+            print(f"  [FAIL] {method} arguments differ: {list(sync_params)} vs {list(async_params)}")
+            return False
+    print("  [PASS] Async methods take the same arguments")
+    
+    try:
+        import asyncpg  # noqa: F401
+    except ImportError:
+        print("  [SKIP] asyncpg not installed, skipping async registry test")
+        return True
+    if get_embedding_provider().remote and not OPENAI_API_KEY:
+        print("  [SKIP] OPENAI_API_KEY not set, skipping async registry test")
+        return True
+    
+    registry = SkillRegistry()
+    
+    async def run():
+        async with await AsyncSkillRegistry.connect() as async_registry:
+            skill_id = await async_registry.upsert_skill(
+                name="test-async-skill",
+                description="Async registry test skill",
+                content="# Async\n\nAwaiting vector searches on an event loop.",
+                path="skills/test-async-skill/SKILL.md"
+            )
+            assert skill_id == str(registry.get_skill("test-async-skill")["id"])
+            print("  [PASS] Upsert visible to the sync registry")
+            
+            query = "awaiting vector searches"
+            expected = registry.search(query, threshold=0.0, limit=5)
+            results = await asyncio.gather(*(
+                async_registry.search(query, threshold=0.0, limit=5) for _ in range(8)
+            ))
+            for result in results:
+                assert [r["id"] for r in result["skills"]] == [r["id"] for r in expected["skills"]]
+                assert [r["id"] for r in result["documents"]] == [r["id"] for r in expected["documents"]]
+            print(f"  [PASS] {len(results)} concurrent searches match the sync results")
+            
+            hybrid = await async_registry.search_skills(query, limit=5, mode="hybrid")
+            assert hybrid[0]["name"] == "test-async-skill" and hybrid[0]["score"] > 0
+            print("  [PASS] Hybrid search")
+            
+            try:
+                async with async_registry.transaction():
+                    await async_registry.delete_skill("test-async-skill")
+                    raise RuntimeError("rollback")
+            except RuntimeError:
+                pass
+            assert await async_registry.get_skill("test-async-skill") is not None
+            print("  [PASS] Transaction rolled back")
+            
+            document = {"title": "Async Doc", "content": "Related to awaiting vector searches."}
+            embedding = (await async_registry.embed_documents([document]))[0]
+            assert np.allclose(embedding, registry.embed_documents([document])[0], atol=1e-5)
+            await async_registry.upsert_document(
+                path="docs/test-async-doc.md", embedding=embedding, **document
+            )
+            stored = execute_query(
+                "SELECT embedding FROM documents WHERE path = 'docs/test-async-doc.md'"
+            )[0]["embedding"]
+            assert np.allclose(stored, embedding, atol=1e-5)
+            related = await async_registry.find_related_skills("", threshold=0.0, limit=3, embedding=embedding)
+            expected = registry.find_related_skills("", threshold=0.0, limit=3, embedding=embedding)
+            assert [r["skill_id"] for r in related] == [r["skill_id"] for r in expected]
+            print("  [PASS] Precomputed document embeddings shared with the sync registry")
+            
+            assert await async_registry.delete_skill("test-async-skill")
+            assert registry.get_skill("test-async-skill") is None
+    
+    try:
+        asyncio.run(run())
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Async registry failed: {e}")
+        registry.delete_skill("test-async-skill")
+        return False
+    finally:
+        registry.delete_document("docs/test-async-doc.md")
+
+
+def test_snapshot():
+    """Test binary COPY export and import, embeddings included."""
+    print("Testing snapshot export/import...")
+    
+    registry = SkillRegistry()
+    vector = np.random.default_rng(0).standard_normal(EMBEDDING_DIMENSION).astype(np.float32)
+    
+    def stored_embedding(table, row_id):
+        rows = execute_query(f"SELECT embedding FROM {table} WHERE id = %s", (row_id,))
+        return np.asarray(rows[0]["embedding"]) if rows else None
+    
+    try:
+        skill_id = registry.upsert_skill(
+            name="test-snapshot-skill", description="Snapshot test", content="# Snapshot",
+            path="skills/test-snapshot-skill/SKILL.md", generate_embedding_flag=False
+        )
+        doc_id = registry.upsert_document(
+            title="Snapshot Doc", content="Snapshot document", path="docs/test-snapshot.md",
+            generate_embedding_flag=False
+        )
+        with get_cursor() as cur:
+            cur.execute("UPDATE skills SET embedding = %s WHERE id = %s", (vector, skill_id))
+        registry.link_skill_to_document(skill_id, doc_id, relevance=0.5)
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            manifest = export_registry(Path(tmp))
+            assert manifest["tables"]["skills"]["rows"] >= 1
+            assert "search_tsv" not in manifest["tables"]["skills"]["columns"]
+            print(f"  [PASS] Exported {sum(t['rows'] for t in manifest['tables'].values())} rows")
+            
+            registry.delete_skill("test-snapshot-skill")
+            registry.delete_document("docs/test-snapshot.md")
+            # A different row under the same name is replaced by the snapshot's
+            registry.upsert_skill(
+                name="test-snapshot-skill", description="Newer", content="# Other",
+                path="skills/test-snapshot-skill/SKILL.md", generate_embedding_flag=False
+            )
+            
+            import_registry(Path(tmp))
+        
+        skill = registry.get_skill("test-snapshot-skill")
+        assert str(skill["id"]) == skill_id and skill["description"] == "Snapshot test"
+        assert np.allclose(stored_embedding("skills", skill_id), vector)
+        assert [str(d["id"]) for d in registry.get_skill_sources(skill_id)] == [doc_id]
+        print("  [PASS] Rows, IDs, embeddings and links restored without re-embedding")
+        
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Snapshot failed: {e}")
+        return False
+    finally:
+        registry.delete_skill("test-snapshot-skill")
+        registry.delete_document("docs/test-snapshot.md")
+
+
 def main():
     print("=" * 60)
     print("Semantic Knowledge Registry - Test Suite")
@@ -417,16 +1200,30 @@ def main():
     
     # Run tests
     results.append(("Database Connection", test_database_connection()))
+    results.append(("Connection Pool", test_connection_pool()))
     results.append(("pgvector Extension", test_pgvector_extension()))
     results.append(("Tables Exist", test_tables_exist()))
+    results.append(("Vector Indexes", test_vector_indexes()))
+    results.append(("Search Query Plans", test_search_uses_vector_index()))
+    results.append(("Quantized Search", test_quantized_search()))
+    results.append(("Result Cache", test_result_cache()))
+    results.append(("Skill Matrix", test_skill_matrix()))
     results.append(("Frontmatter Parsing", test_frontmatter_parsing()))
     results.append(("Title Extraction", test_title_extraction()))
     results.append(("Skill CRUD", test_skill_crud()))
+    results.append(("Skill Change Detection", test_skill_change_detection()))
     results.append(("Document CRUD", test_document_crud()))
     results.append(("Skill-Document Linking", test_skill_document_linking()))
     results.append(("Version Tracking", test_version_tracking()))
     results.append(("Stats", test_stats()))
+    results.append(("Embedded Registry", test_embedded_registry()))
+    results.append(("Embedded Registry Sharing", test_embedded_registry_processes()))
+    results.append(("Search Server", test_search_server()))
     results.append(("Semantic Search", test_semantic_search()))
+    results.append(("Hybrid Search", test_hybrid_search()))
+    results.append(("Document Chunks", test_document_chunks()))
+    results.append(("Async Registry", test_async_registry()))
+    results.append(("Snapshot", test_snapshot()))
     
     # Summary
     print()
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Build and maintain the vector (ANN) indexes.
+
+Usage:
+    # Show current index definitions and row counts
+    python scripts/vector_index.py status
+
+    # Build HNSW indexes (default m=16, ef_construction=64)
+    python scripts/vector_index.py hnsw
+    python scripts/vector_index.py hnsw --m 32 --ef-construction 128 --table documents
+
+    # Rebuild ivfflat indexes with lists sized from the current row count
+    # (run after bulk loads)
+    python scripts/vector_index.py ivfflat
+    python scripts/vector_index.py ivfflat --lists 200 --table skills
+
+    # Index quantized vectors instead (set VECTOR_QUANTIZATION to match)
+    python scripts/vector_index.py hnsw --quantization halfvec
+    python scripts/vector_index.py hnsw --quantization binary
+
+    # Index a 256-d prefix of each embedding (set VECTOR_INDEX_DIMENSION to match)
+    python scripts/vector_index.py hnsw --index-dimension 256
+"""
+
+import sys
+import argparse
+import math
+from typing import Dict, List, Optional, Tuple
+
+from psycopg2 import sql
+
+from .config import (
+    HNSW_M,
+    HNSW_EF_CONSTRUCTION,
+    EMBEDDING_DIMENSION,
+    VECTOR_QUANTIZATION,
+    VECTOR_INDEX_DIMENSION,
+)
+from .db import get_cursor, execute_query
+
+
+# Table -> name of its embedding index
+VECTOR_INDEXES = {
+    "skills": "idx_skills_embedding",
+    "documents": "idx_documents_embedding",
+    "document_chunks": "idx_document_chunks_embedding",
+}
+
+
+# Quantization -> (indexed expression, operator class, distance operator),
+# with `{vector}` the vector being quantized and `{dim}` its dimension.
+# The full-precision `embedding` column stays as it is; only the index
+# holds the smaller vectors, and the ORDER BY in the search SQL must repeat
+# the indexed expression for the index to be used.
+QUANTIZATIONS = {
+    "none": ("{vector}", "vector_cosine_ops", "<=>"),
+    "halfvec": ("{vector}::halfvec({dim})", "halfvec_cosine_ops", "<=>"),
+    "binary": ("binary_quantize({vector})::bit({dim})", "bit_hamming_ops", "<~>"),
+}
+
+
+def _quantization(quantization: str) -> Tuple[str, str, str]:
+    try:
+        return QUANTIZATIONS[quantization]
+    except KeyError:
+        raise ValueError(
+            f"Unknown vector quantization: {quantization} (expected one of {', '.join(QUANTIZATIONS)})"
+        )
+
+
+def _indexed_vector(vector: str, dimension: int, truncate: int) -> Tuple[str, int]:
+    """
+    The leading `truncate` dimensions of `vector` (all of them when 0).
+
+    Matryoshka-trained models (text-embedding-3-*) put the most
+    information in the first dimensions, so a prefix is a usable shorter
+    embedding; cosine distance ignores the prefix's norm.
+    """
+    if not truncate:
+        return vector, dimension
+    if not 0 < truncate < dimension:
+        raise ValueError(f"Index dimension {truncate} must be between 1 and {dimension - 1}")
+    return f"subvector({vector}, 1, {truncate})::vector({truncate})", truncate
+
+
+def index_expression(
+    quantization: str = VECTOR_QUANTIZATION,
+    dimension: int = EMBEDDING_DIMENSION,
+    truncate: int = VECTOR_INDEX_DIMENSION
+) -> Tuple[str, str]:
+    """The (expression, operator class) an embedding index is built on."""
+    expression, opclass, _ = _quantization(quantization)
+    vector, dim = _indexed_vector("embedding", dimension, truncate)
+    expression = expression.format(vector=vector, dim=dim)
+    return (expression if expression == "embedding" else f"({expression})"), opclass
+
+
+def scan_order(
+    quantization: str = VECTOR_QUANTIZATION,
+    dimension: int = EMBEDDING_DIMENSION,
+    truncate: int = VECTOR_INDEX_DIMENSION,
+    query: str = "%(embedding)s"
+) -> str:
+    """ORDER BY expression that an index from `index_expression` can serve."""
+    expression, _, operator = _quantization(quantization)
+    indexed, _ = index_expression(quantization, dimension, truncate)
+    vector, dim = _indexed_vector(f"{query}::vector", dimension, truncate)
+    return f"{indexed} {operator} {expression.format(vector=vector, dim=dim)}"
+
+
+def recommended_lists(rows: int) -> int:
+    """
+    ivfflat list count for a table size.
+
+    Follows the pgvector guidance: rows / 1000 up to 1M rows,
+    sqrt(rows) above that.
+    """
+    if rows <= 1_000_000:
+        return max(1, rows // 1000)
+    return int(math.sqrt(rows))
+
+
+def count_embedded_rows(table: str) -> int:
+    """Count rows that have an embedding."""
+    return execute_query(
+        sql.SQL("SELECT COUNT(*) AS count FROM {} WHERE embedding IS NOT NULL").format(
+            sql.Identifier(table)
+        )
+    )[0]["count"]
+
+
+def build_hnsw_index(
+    table: str,
+    m: int = HNSW_M,
+    ef_construction: int = HNSW_EF_CONSTRUCTION,
+    quantization: str = VECTOR_QUANTIZATION,
+    truncate: int = VECTOR_INDEX_DIMENSION
+) -> None:
+    """
+    Replace the table's embedding index with an HNSW index.
+
+    The index holds the `quantization` of the embeddings' first
+    `truncate` dimensions (all when 0).
+    """
+    expression, opclass = index_expression(quantization, truncate=truncate)
+    with get_cursor() as cur:
+        cur.execute(
+            sql.SQL(
+                "DROP INDEX IF EXISTS {index}; "
+                "CREATE INDEX {index} ON {table} "
+                "USING hnsw ({expression} {opclass}) "
+                "WITH (m = %s, ef_construction = %s)"
+            ).format(
+                index=sql.Identifier(VECTOR_INDEXES[table]),
+                table=sql.Identifier(table),
+                expression=sql.SQL(expression),
+                opclass=sql.SQL(opclass)
+            ),
+            (m, ef_construction)
+        )
+
+
+def build_ivfflat_index(
+    table: str,
+    lists: Optional[int] = None,
+    quantization: str = VECTOR_QUANTIZATION,
+    truncate: int = VECTOR_INDEX_DIMENSION
+) -> int:
+    """
+    Replace the table's embedding index with an ivfflat index.
+
+    ivfflat clusters the rows present at build time, so rebuild after
+    bulk loads. `lists` defaults to `recommended_lists` for the current
+    row count.
+
+    Returns the number of lists used.
+    """
+    if lists is None:
+        lists = recommended_lists(count_embedded_rows(table))
+
+    expression, opclass = index_expression(quantization, truncate=truncate)
+    with get_cursor() as cur:
+        cur.execute(
+            sql.SQL(
+                "DROP INDEX IF EXISTS {index}; "
+                "CREATE INDEX {index} ON {table} "
+                "USING ivfflat ({expression} {opclass}) "
+                "WITH (lists = %s)"
+            ).format(
+                index=sql.Identifier(VECTOR_INDEXES[table]),
+                table=sql.Identifier(table),
+                expression=sql.SQL(expression),
+                opclass=sql.SQL(opclass)
+            ),
+            (lists,)
+        )
+
+    return lists
+
+
+def index_status() -> List[Dict]:
+    """Get the definition and row count for each embedding index."""
+    status = []
+    for table, index in VECTOR_INDEXES.items():
+        result = execute_query(
+            "SELECT indexdef FROM pg_indexes WHERE tablename = %s AND indexname = %s",
+            (table, index)
+        )
+        status.append({
+            "table": table,
+            "index": index,
+            "definition": result[0]["indexdef"] if result else None,
+            "rows": count_embedded_rows(table)
+        })
+    return status
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build and maintain the vector indexes"
+    )
+
+    subparsers = parser.add_subparsers(dest="action", help="Action to perform")
+
+    subparsers.add_parser("status", help="Show index definitions and row counts")
+
+    hnsw_parser = subparsers.add_parser("hnsw", help="Build HNSW indexes")
+    hnsw_parser.add_argument("--m", type=int, default=HNSW_M, help="Max connections per layer")
+    hnsw_parser.add_argument("--ef-construction", type=int, default=HNSW_EF_CONSTRUCTION,
+                             help="Candidate list size while building")
+
+    ivfflat_parser = subparsers.add_parser("ivfflat", help="Rebuild ivfflat indexes")
+    ivfflat_parser.add_argument("--lists", type=int, default=None,
+                                help="Number of lists (default: sized from row count)")
+
+    for sub in (hnsw_parser, ivfflat_parser):
+        sub.add_argument("--table", choices=list(VECTOR_INDEXES) + ["all"], default="all",
+                         help="Table to index")
+        sub.add_argument("--quantization", choices=list(QUANTIZATIONS), default=VECTOR_QUANTIZATION,
+                         help="Index full vectors, halfvec or binary-quantized vectors")
+        sub.add_argument("--index-dimension", type=int, default=VECTOR_INDEX_DIMENSION,
+                         help="Index only the first N dimensions (0 = all)")
+
+    args = parser.parse_args()
+
+    if not args.action:
+        parser.print_help()
+        return 1
+
+    if args.action == "status":
+        for entry in index_status():
+            print(f"{entry['table']} ({entry['rows']} rows with embeddings)")
+            print(f"  {entry['definition'] or 'No embedding index'}")
+        return 0
+
+    tables = list(VECTOR_INDEXES) if args.table == "all" else [args.table]
+
+    for table in tables:
+        if args.action == "hnsw":
+            print(f"Building HNSW index on {table} (m={args.m}, ef_construction={args.ef_construction}, "
+                  f"quantization={args.quantization}, dimensions={args.index_dimension or 'all'})...")
+            build_hnsw_index(table, m=args.m, ef_construction=args.ef_construction,
+                             quantization=args.quantization, truncate=args.index_dimension)
+        else:
+            print(f"Rebuilding ivfflat index on {table} (quantization={args.quantization}, "
+                  f"dimensions={args.index_dimension or 'all'})...")
+            lists = build_ivfflat_index(table, lists=args.lists, quantization=args.quantization,
+                                        truncate=args.index_dimension)
+            print(f"  lists = {lists}, suggested probes = {max(1, int(math.sqrt(lists)))}")
+        print(f"✓ {VECTOR_INDEXES[table]}")
+
+    if args.quantization != VECTOR_QUANTIZATION:
+        print(f"\nSet VECTOR_QUANTIZATION={args.quantization} so searches use the new indexes")
+    if args.index_dimension != VECTOR_INDEX_DIMENSION:
+        print(f"\nSet VECTOR_INDEX_DIMENSION={args.index_dimension} so searches use the new indexes")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())